@@ -0,0 +1,304 @@
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from .config import DEFAULT_SCAN_OPTIONS, get_autotune_config, get_config_path, get_pipeline_config, load_config
+from .engine import BatchEngine, list_images
+
+logger = logging.getLogger(__name__)
+
+# 自动调优写入配置文件 pipeline 段的参数
+TUNED_KEYS = ('executor', 'recognize_workers', 'decode_scale', 'tesseract_passes')
+
+# 吞吐量相差不超过此比例时，选择占用更少的设置
+THROUGHPUT_TOLERANCE = 0.05
+
+def _proc_rss(pid: int) -> int:
+    """读取 /proc 中进程的常驻内存（字节）"""
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def _proc_children(pid: int) -> List[int]:
+    """读取 /proc 中进程的全部子进程"""
+    children = []
+    task_dir = f'/proc/{pid}/task'
+    for tid in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, tid, 'children')) as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return children
+
+def process_tree_rss() -> int:
+    """
+    当前进程及全部子进程（多进程执行器、Tesseract）的常驻内存之和
+    Returns:
+        int: 字节数，无法获取（未安装 psutil 且不是 Linux）时返回0
+    """
+    try:
+        import psutil
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+    except ImportError:
+        pass
+
+    if not sys.platform.startswith('linux'):
+        return 0
+
+    total = 0
+    pending = [os.getpid()]
+    while pending:
+        pid = pending.pop()
+        try:
+            total += _proc_rss(pid)
+            pending.extend(_proc_children(pid))
+        except OSError:
+            continue
+    return total
+
+class RssSampler:
+    """后台定时采样进程树内存，记录峰值"""
+
+    def __init__(self, interval: float = 0.05):
+        """
+        Args:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self.peak_bytes = max(self.peak_bytes, process_tree_rss())
+            if self._stop_event.wait(self.interval):
+                break
+
+    def __enter__(self) -> 'RssSampler':
+        self._thread = threading.Thread(target=self._run, name="autotune-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop_event.set()
+        self._thread.join()
+
+class Trial:
+    """一组候选设置在样本上的实测结果"""
+
+    __slots__ = ('settings', 'images', 'hits', 'elapsed', 'peak_rss')
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.images = 0
+        self.hits = 0
+        self.elapsed = 0.0
+        self.peak_rss = 0
+
+    @property
+    def throughput(self) -> float:
+        """每秒处理的图片数"""
+        return self.images / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """识别成功的比例"""
+        return self.hits / self.images if self.images else 0.0
+
+    @property
+    def peak_rss_mb(self) -> float:
+        return self.peak_rss / (1024 * 1024)
+
+    def describe(self) -> str:
+        settings = ', '.join(f"{key}={value}" for key, value in self.settings.items())
+        rss = f"{self.peak_rss_mb:.0f}MB" if self.peak_rss else "未知"
+        return (f"{settings}: {self.throughput:.2f} 张/秒, 识别率 {self.hit_rate:.1%}, "
+                f"内存峰值 {rss}")
+
+class Autotuner:
+    """
+    在源文件夹的样本上实测候选设置，选出吞吐量最高且识别率不下降的配置。
+    先比较解码比例和Tesseract配置数（影响识别率），再在选定的识别设置上比较执行器和并发数。
+    """
+
+    def __init__(self, source_folder: str, options: Dict[str, Any] = None, config: Dict[str, Any] = None):
+        """
+        Args:
+            source_folder: 待处理的源文件夹
+            options: 识别选项，为None时使用默认选项；调优时不调用腾讯云OCR
+            config: 配置内容，为None时从配置文件读取
+        """
+        self.source_folder = source_folder
+        self.config = load_config() if config is None else config
+        self.autotune_config = get_autotune_config(self.config)
+        self.options = dict(DEFAULT_SCAN_OPTIONS)
+        self.options.update(options or {})
+        self.options['use_tencent'] = False
+        self.trials = []
+
+    def sample(self, size: int = None) -> List[str]:
+        """
+        从源文件夹均匀抽取样本
+        Args:
+            size: 样本数，为None时读取配置
+        Returns:
+            list: 图片路径
+        """
+        size = size or self.autotune_config['sample_size']
+        paths = list_images(self.source_folder)
+        if len(paths) <= size:
+            return paths
+        step = len(paths) / size
+        return [paths[int(i * step)] for i in range(size)]
+
+    def run_trial(self, settings: Dict[str, Any], paths: List[str]) -> Optional[Trial]:
+        """
+        用一组设置处理样本并计时
+        Args:
+            settings: 覆盖 pipeline 段的参数
+            paths: 样本图片
+        Returns:
+            Trial: 实测结果，设置无法运行时返回None
+        """
+        from .scanner import WaybillScanner
+
+        config = copy.deepcopy(self.config)
+        config.setdefault('pipeline', {}).update(settings)
+
+        trial = Trial(settings)
+        scanner = WaybillScanner(config=config)
+        scanner.start_batch()
+        engine = BatchEngine(scanner, self.options, config=config)
+
+        try:
+            with RssSampler() as sampler:
+                start = time.perf_counter()
+                for result in engine.iter_results(paths):
+                    trial.images += 1
+                    if result.waybill:
+                        trial.hits += 1
+                trial.elapsed = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"调优测试 {settings} 失败: {str(e)}")
+            return None
+        trial.peak_rss = sampler.peak_bytes
+        if not trial.peak_rss:
+            logger.warning("无法测量调优测试的内存峰值（未安装 psutil 且不是 Linux）")
+
+        logger.info(f"调优测试 {trial.describe()}")
+        self.trials.append(trial)
+        return trial
+
+    def _best(self, trials: List[Trial]) -> Optional[Trial]:
+        """
+        挑选最优结果：识别率不低于最好结果减容差、内存不超上限，其中吞吐量最高；
+        吞吐量相近时取候选列表中靠前的设置
+        """
+        if not trials:
+            return None
+        max_rss = self.autotune_config['max_rss_mb'] * 1024 * 1024
+        if max_rss and not all(t.peak_rss for t in trials):
+            logger.warning("无法测量内存占用（请安装 psutil），内存上限 max_rss_mb 对这些设置不生效")
+        within_memory = [t for t in trials if not max_rss or not t.peak_rss or t.peak_rss <= max_rss]
+        if not within_memory:
+            logger.warning("全部候选设置都超出内存上限，忽略内存限制")
+            within_memory = trials
+
+        best_hit_rate = max(t.hit_rate for t in within_memory)
+        eligible = [t for t in within_memory
+                    if t.hit_rate >= best_hit_rate - self.autotune_config['hit_rate_tolerance']]
+        fastest = max(t.throughput for t in eligible)
+        for trial in eligible:
+            if trial.throughput >= fastest * (1 - THROUGHPUT_TOLERANCE):
+                return trial
+
+    def worker_candidates(self) -> List[int]:
+        """候选的识别并发数"""
+        cpus = os.cpu_count() or 2
+        return sorted({1, max(1, cpus // 2), max(1, cpus - 1), cpus})
+
+    def tune(self, sample_size: int = None) -> Optional[Dict[str, Any]]:
+        """
+        执行调优
+        Args:
+            sample_size: 样本数，为None时读取配置
+        Returns:
+            dict: 最优的 pipeline 参数，源文件夹中没有图片时返回None
+        """
+        paths = self.sample(sample_size)
+        if not paths:
+            logger.warning(f"源文件夹中没有图片: {self.source_folder}")
+            return None
+
+        # 先读一遍样本，避免第一组测试承担冷缓存的读盘时间
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    f.read()
+            except OSError:
+                continue
+
+        logger.info(f"开始自动调优，样本 {len(paths)} 张")
+        current = get_pipeline_config(self.config)
+
+        # 第一轮：识别设置（解码比例、Tesseract配置数），执行器和并发数保持当前配置
+        passes = self.autotune_config['tesseract_passes'] if self.options.get('scan_text') else [current['tesseract_passes']]
+        recognition_trials = []
+        for decode_scale in self.autotune_config['decode_scales']:
+            for tesseract_passes in passes:
+                recognition_trials.append(self.run_trial({
+                    'decode_scale': decode_scale,
+                    'tesseract_passes': tesseract_passes
+                }, paths))
+        best = self._best([t for t in recognition_trials if t is not None])
+        if best is None:
+            logger.error("全部识别设置测试失败，未能完成调优")
+            return None
+
+        # 第二轮：执行器和并发数，从少到多
+        parallel_trials = []
+        for executor in self.autotune_config['executors']:
+            for workers in self.worker_candidates():
+                settings = dict(best.settings)
+                settings.update({'executor': executor, 'recognize_workers': workers})
+                parallel_trials.append(self.run_trial(settings, paths))
+        best = self._best([t for t in parallel_trials if t is not None] or [best])
+
+        logger.info(f"自动调优完成，最优设置 {best.describe()}")
+        return {key: best.settings[key] for key in TUNED_KEYS if key in best.settings}
+
+def save_tuning(settings: Dict[str, Any], config_path: str = None) -> str:
+    """
+    把调优结果合并写入配置文件的 pipeline 段，其余配置保持不变
+    Args:
+        settings: 调优得到的参数
+        config_path: 配置文件路径，为None时使用当前配置文件
+    Returns:
+        str: 写入的配置文件路径
+    """
+    config_path = config_path or get_config_path()
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+    config.setdefault('pipeline', {}).update(settings)
+
+    # 先写临时文件再替换，避免中断时损坏配置文件
+    temp_path = config_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+    os.replace(temp_path, config_path)
+    return config_path
@@ -0,0 +1,210 @@
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Any, FrozenSet, List, Optional
+import cv2
+import numpy as np
+from ..config import get_barcode_config
+from ..ocr import Candidate
+
+logger = logging.getLogger(__name__)
+
+# 码制类别，由识别选项中的 scan_barcode / scan_qrcode 决定
+SYMBOLOGY_LINEAR = 'linear'   # 一维条码
+SYMBOLOGY_QRCODE = 'qrcode'   # 二维码
+
+def symbologies_from_options(options: Dict[str, Any]) -> FrozenSet[str]:
+    """
+    根据识别选项得出需要解码的码制
+    Args:
+        options: 识别选项
+    Returns:
+        frozenset: 码制类别，两项都未勾选时为空
+    """
+    symbologies = set()
+    if options.get('scan_barcode'):
+        symbologies.add(SYMBOLOGY_LINEAR)
+    if options.get('scan_qrcode'):
+        symbologies.add(SYMBOLOGY_QRCODE)
+    return frozenset(symbologies)
+
+class BarcodeEngine(ABC):
+    """条码解码引擎基类，记录调用次数、解出次数和耗时"""
+
+    # 引擎名称，用于配置和统计
+    name = ''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    @abstractmethod
+    def decode(self, gray: np.ndarray, symbologies: FrozenSet[str]) -> List[Candidate]:
+        """
+        解码图像中的条码
+        Args:
+            gray: 灰度图像
+            symbologies: 需要解码的码制类别
+        Returns:
+            list: Candidate列表，条码自带校验，置信度记为1
+        """
+        pass
+
+    def timed_decode(self, gray: np.ndarray, symbologies: FrozenSet[str]) -> List[Candidate]:
+        """解码并记录耗时"""
+        start = time.perf_counter()
+        try:
+            return self.decode(gray, symbologies)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.seconds += elapsed
+
+    def record_hit(self) -> None:
+        """记录一次解出合规结果"""
+        with self._lock:
+            self.hits += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        调用统计
+        Returns:
+            dict: calls / hits / avg_ms
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'hits': self.hits,
+                'avg_ms': round(self.seconds / self.calls * 1000, 1) if self.calls else 0.0
+            }
+
+    def reset_stats(self) -> None:
+        """清零统计"""
+        with self._lock:
+            self.calls = 0
+            self.hits = 0
+            self.seconds = 0.0
+
+def create_barcode_engine(name: str) -> BarcodeEngine:
+    """
+    按名称创建条码引擎
+    Args:
+        name: zbar / opencv
+    Returns:
+        BarcodeEngine: 条码引擎
+    """
+    if name == 'zbar':
+        from .zbar import ZBarEngine
+        return ZBarEngine()
+    if name == 'opencv':
+        from .opencv import OpenCVBarcodeEngine
+        return OpenCVBarcodeEngine()
+    raise ValueError(f"未知的条码引擎: {name}")
+
+class BarcodeReader:
+    """
+    按配置顺序调用条码引擎，出现可直接采用的结果即停止；
+    首轮全部失败时交给重试阶梯变换图像后再解码；
+    二维码内容是URL或结构化文本时，由内容解析器取出其中的运单号作为附加候选
+    """
+
+    def __init__(self, engines: List[BarcodeEngine], ladder=None, payload=None):
+        """
+        Args:
+            engines: 依次尝试的条码引擎
+            ladder: 可选的重试阶梯（RetryLadder）
+            payload: 可选的二维码内容解析器（PayloadParser）
+        """
+        self.engines = engines
+        self.ladder = ladder
+        self.payload = payload
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any] = None) -> 'BarcodeReader':
+        """根据配置文件 barcode 段创建，无法加载的引擎会被跳过"""
+        from .ladder import RetryLadder
+        from .payload import PayloadParser
+
+        barcode_config = get_barcode_config(config)
+        engines = []
+        for name in barcode_config['engines']:
+            try:
+                engines.append(create_barcode_engine(name))
+            except Exception as e:
+                logger.warning(f"条码引擎 {name} 初始化失败: {str(e)}")
+
+        ladder = None
+        if barcode_config['retry_steps']:
+            ladder = RetryLadder(barcode_config['retry_steps'], barcode_config['retry_budget_ms'],
+                                 barcode_config['retry_max_side'])
+        payload = PayloadParser.from_specs(barcode_config['payload_extractors'])
+        return cls(engines, ladder, payload)
+
+    def read(self, image: np.ndarray, options: Dict[str, Any],
+             accept: Optional[Callable[[Candidate], bool]] = None) -> List[Candidate]:
+        """
+        解码图像中的条码
+        Args:
+            image: BGR或灰度图像
+            options: 识别选项，scan_barcode / scan_qrcode 决定解码的码制
+            accept: 可选的判定函数，解出满足条件的候选即停止；为None时解出任意条码即停止
+        Returns:
+            list: Candidate列表
+        """
+        symbologies = symbologies_from_options(options)
+        if not symbologies:
+            return []
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        candidates, accepted = self._decode(gray, symbologies, accept)
+        if accepted or self.ladder is None:
+            return candidates
+
+        def attempt(transformed):
+            found, ok = self._decode(transformed, symbologies, accept)
+            for candidate in found:
+                # 变换后的坐标与原图不对应
+                candidate.box = None
+            candidates.extend(found)
+            return ok
+
+        self.ladder.run(gray, attempt)
+        return candidates
+
+    def _decode(self, gray: np.ndarray, symbologies: FrozenSet[str],
+                accept: Optional[Callable[[Candidate], bool]]):
+        """
+        依次调用各引擎
+        Returns:
+            (候选列表, 是否已得到可采用的结果)
+        """
+        candidates = []
+        for engine in self.engines:
+            try:
+                found = engine.timed_decode(gray, symbologies)
+            except Exception as e:
+                logger.error(f"条码引擎 {engine.name} 解码失败: {str(e)}")
+                continue
+            if self.payload is not None:
+                found = self.payload.expand(found)
+            candidates.extend(found)
+            if found and (accept is None or any(accept(c) for c in found)):
+                engine.record_hit()
+                return candidates, True
+        return candidates, False
+
+    def stats(self) -> Dict[str, Any]:
+        """各引擎的调用统计，以及重试阶梯各步骤的累计统计"""
+        stats = {engine.name: engine.stats() for engine in self.engines}
+        if self.ladder is not None:
+            stats['retry'] = self.ladder.stats()
+        return stats
+
+    def reset_stats(self) -> None:
+        """开始新批次时清零引擎统计，重试阶梯的统计跨批次保留，用于排序"""
+        for engine in self.engines:
+            engine.reset_stats()
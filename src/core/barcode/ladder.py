@@ -0,0 +1,168 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 放大前图像长边的上限，超过时跳过放大，避免产生过大的图像
+MAX_UPSCALE_SIDE = 2000
+
+_SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+
+def _otsu(gray):
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+def _adaptive(gray):
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+def _half(gray):
+    return cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+
+def _double(gray):
+    if max(gray.shape[:2]) > MAX_UPSCALE_SIDE:
+        return None
+    return cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+def _rotate90(gray):
+    return cv2.rotate(gray, cv2.ROTATE_90_CLOCKWISE)
+
+def _rotate270(gray):
+    return cv2.rotate(gray, cv2.ROTATE_90_COUNTERCLOCKWISE)
+
+def _sharpen(gray):
+    return cv2.filter2D(gray, -1, _SHARPEN_KERNEL)
+
+# 可用的重试步骤：名称 -> 图像变换（返回None表示该图不适用）
+RETRY_STEPS = {
+    'otsu': _otsu,
+    'adaptive': _adaptive,
+    'half': _half,
+    'double': _double,
+    'rotate90': _rotate90,
+    'rotate270': _rotate270,
+    'sharpen': _sharpen
+}
+
+class _StepStats:
+    """单个重试步骤的累计统计"""
+    __slots__ = ('name', 'transform', 'attempts', 'successes', 'seconds')
+
+    def __init__(self, name, transform):
+        self.name = name
+        self.transform = transform
+        self.attempts = 0
+        self.successes = 0
+        self.seconds = 0.0
+
+    def cost_per_success(self) -> float:
+        """
+        期望的每次成功耗时（秒），用平滑后的成功率估计，
+        未尝试过的步骤排在前面，保证每个步骤都有机会被测量
+        """
+        if not self.attempts:
+            return 0.0
+        avg_cost = self.seconds / self.attempts
+        success_rate = (self.successes + 1) / (self.attempts + 2)
+        return avg_cost / success_rate
+
+    def average_cost(self) -> float:
+        """每次尝试的平均耗时（秒），未尝试过时为0"""
+        return self.seconds / self.attempts if self.attempts else 0.0
+
+class RetryLadder:
+    """
+    条码重试阶梯
+    首轮解码失败后依次尝试二值化、缩放、旋转、锐化等变换，
+    步骤按实测的“每次成功耗时”从低到高排序，解出合规结果即停止。
+    各步骤在缩小后的图像上进行，单张图片的总耗时受预算限制，
+    实测平均耗时超过剩余预算的步骤不再开始，避免单个步骤拖过预算。
+    """
+
+    def __init__(self, steps: List[str] = None, budget_ms: float = 100, max_side: int = 2000):
+        """
+        Args:
+            steps: 启用的步骤名称，为None时启用全部
+            budget_ms: 单张图片重试的总耗时上限（毫秒），0 表示不限制
+            max_side: 重试前把图像长边缩小到此值以内（像素），0 表示不缩小
+        """
+        names = steps if steps is not None else list(RETRY_STEPS)
+        unknown = [name for name in names if name not in RETRY_STEPS]
+        if unknown:
+            raise ValueError(f"未知的条码重试步骤: {', '.join(unknown)}")
+
+        self.steps = [_StepStats(name, RETRY_STEPS[name]) for name in names]
+        self.budget = budget_ms / 1000
+        self.max_side = int(max_side or 0)
+        self._lock = threading.Lock()
+
+    def ordered_steps(self) -> List[_StepStats]:
+        """按每次成功耗时排序的步骤"""
+        with self._lock:
+            return sorted(self.steps, key=lambda step: step.cost_per_success())
+
+    def run(self, gray: np.ndarray, decode: Callable[[np.ndarray], bool]) -> Optional[str]:
+        """
+        依次尝试各步骤
+        Args:
+            gray: 灰度图像
+            decode: 对变换后的图像解码，解出合规结果时返回True
+        Returns:
+            str: 成功的步骤名称，全部失败返回None
+        """
+        start = time.perf_counter()
+        height, width = gray.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                              interpolation=cv2.INTER_AREA)
+
+        for step in self.ordered_steps():
+            if self.budget:
+                remaining = self.budget - (time.perf_counter() - start)
+                if remaining <= 0:
+                    logger.debug("条码重试超出时间预算")
+                    break
+                # 未测量过的步骤照常尝试，以便得到耗时
+                with self._lock:
+                    cost = step.average_cost()
+                if cost > remaining:
+                    logger.debug("条码重试步骤 %s 平均耗时 %.1fms 超出剩余预算，跳过", step.name, cost * 1000)
+                    continue
+
+            step_start = time.perf_counter()
+            transformed = step.transform(gray)
+            if transformed is None:
+                continue
+            success = decode(transformed)
+            elapsed = time.perf_counter() - step_start
+
+            with self._lock:
+                step.attempts += 1
+                step.seconds += elapsed
+                if success:
+                    step.successes += 1
+
+            if success:
+                logger.debug("条码重试步骤 %s 解出结果（%.1fms）", step.name, elapsed * 1000)
+                return step.name
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        各步骤的累计统计，按当前尝试顺序排列
+        Returns:
+            dict: 步骤名称 -> attempts / successes / avg_ms
+        """
+        steps = self.ordered_steps()
+        with self._lock:
+            return {
+                step.name: {
+                    'attempts': step.attempts,
+                    'successes': step.successes,
+                    'avg_ms': round(step.seconds / step.attempts * 1000, 1) if step.attempts else 0.0
+                }
+                for step in steps
+            }
@@ -0,0 +1,57 @@
+import logging
+import threading
+import cv2
+import numpy as np
+from . import BarcodeEngine, SYMBOLOGY_LINEAR, SYMBOLOGY_QRCODE
+from ..ocr import Candidate
+
+logger = logging.getLogger(__name__)
+
+class OpenCVBarcodeEngine(BarcodeEngine):
+    """
+    基于OpenCV的条码引擎：一维码使用 cv2.barcode.BarcodeDetector，
+    二维码使用 cv2.QRCodeDetector（需要 OpenCV 4.8 及以上）
+    """
+
+    name = 'opencv'
+
+    def __init__(self):
+        super().__init__()
+        if not hasattr(cv2, 'barcode'):
+            raise RuntimeError(f"当前OpenCV版本不支持条码识别: {cv2.__version__}")
+        # 检测器实例不保证线程安全，每个线程各用一份
+        self._local = threading.local()
+
+    def _detectors(self):
+        local = self._local
+        if not hasattr(local, 'barcode'):
+            local.barcode = cv2.barcode.BarcodeDetector()
+            local.qrcode = cv2.QRCodeDetector()
+        return local.barcode, local.qrcode
+
+    def decode(self, gray, symbologies):
+        barcode_detector, qrcode_detector = self._detectors()
+        candidates = []
+        if SYMBOLOGY_LINEAR in symbologies:
+            candidates.extend(self._decode_with(barcode_detector, gray))
+        if SYMBOLOGY_QRCODE in symbologies:
+            candidates.extend(self._decode_with(qrcode_detector, gray))
+        return candidates
+
+    @staticmethod
+    def _decode_with(detector, gray):
+        ok, texts, points, _ = detector.detectAndDecodeMulti(gray)
+        if not ok:
+            return []
+
+        candidates = []
+        for i, text in enumerate(texts):
+            # 检测到但未能解码的码返回空字符串
+            if not text:
+                continue
+            box = None
+            if points is not None and i < len(points):
+                box = tuple(int(v) for v in cv2.boundingRect(np.asarray(points[i], dtype=np.float32)))
+            candidates.append(Candidate(text, 1.0, box, 'barcode'))
+            logger.debug("OpenCV条码识别结果: %s", text)
+        return candidates
@@ -0,0 +1,222 @@
+import re
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit, parse_qsl
+from ..ocr import Candidate
+
+logger = logging.getLogger(__name__)
+
+# URL参数和JSON字段中运单号常用的名称（比较时不区分大小写）
+DEFAULT_WAYBILL_KEYS = ['waybill', 'waybillno', 'waybill_no', 'mailno', 'mail_no', 'billno', 'bill_no',
+                        'trackingno', 'tracking_no', 'expressno', 'logisticno', 'ydh', 'no']
+
+def _is_plain(text: str) -> bool:
+    """内容只有字母数字，已可直接按规则判定，无需解析"""
+    return re.fullmatch(r'[0-9A-Za-z]+', text) is not None
+
+class PayloadExtractor(ABC):
+    """从二维码内容中取出运单号的提取器基类"""
+
+    # 提取器类型，对应配置中的 type
+    type = ''
+
+    def __init__(self, spec: Dict[str, Any]):
+        """
+        Args:
+            spec: 配置项，name 为名称（承运商），其余参数见各子类
+        """
+        self.name = spec.get('name') or self.type
+
+    @abstractmethod
+    def extract(self, payload: str) -> List[str]:
+        """
+        Args:
+            payload: 二维码解码得到的完整文本
+        Returns:
+            list: 可能的运单号，按可信程度排列
+        """
+        pass
+
+class UrlParamExtractor(PayloadExtractor):
+    """URL 查询参数（含 # 之后的参数），如 https://m.example.com/t?mailNo=SF1234567890123"""
+
+    type = 'url'
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.keys = [key.lower() for key in spec.get('keys', DEFAULT_WAYBILL_KEYS)]
+        # 为True时参数都没有命中则取路径的最后一段，如 https://example.com/w/YS12345678
+        self.path = bool(spec.get('path', False))
+
+    def extract(self, payload):
+        if '://' not in payload and '?' not in payload:
+            return []
+        try:
+            parts = urlsplit(payload.strip())
+        except ValueError:
+            return []
+        # 单页应用常把参数放在 # 之后，如 /#/track?no=...
+        query = parts.query
+        if '?' in parts.fragment:
+            query += '&' + parts.fragment.split('?', 1)[1]
+        params = {}
+        for key, value in parse_qsl(query, keep_blank_values=False):
+            params.setdefault(key.lower(), value)
+
+        found = [params[key] for key in self.keys if key in params]
+        if not found and self.path:
+            segment = parts.path.rstrip('/').rsplit('/', 1)[-1]
+            if segment:
+                found.append(segment)
+        return found
+
+class JsonKeyExtractor(PayloadExtractor):
+    """JSON 中的字段，在任意层级查找，如 {"type":"ys","data":{"waybillNo":"YS12345678"}}"""
+
+    type = 'json'
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.keys = [key.lower() for key in spec.get('keys', DEFAULT_WAYBILL_KEYS)]
+
+    def extract(self, payload):
+        text = payload.strip()
+        if not text.startswith(('{', '[')):
+            return []
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return []
+
+        values = {}
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    if isinstance(value, (dict, list)):
+                        stack.append(value)
+                    elif value is not None:
+                        values.setdefault(str(key).lower(), str(value))
+            elif isinstance(node, list):
+                stack.extend(node)
+        return [values[key] for key in self.keys if key in values]
+
+class RegexExtractor(PayloadExtractor):
+    """正则表达式，取命名分组 waybill，没有时取第一个分组或整个匹配"""
+
+    type = 'regex'
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.pattern = re.compile(spec['pattern'])
+
+    def extract(self, payload):
+        found = []
+        for match in self.pattern.finditer(payload):
+            if 'waybill' in self.pattern.groupindex:
+                found.append(match.group('waybill'))
+            elif self.pattern.groups:
+                found.append(match.group(1))
+            else:
+                found.append(match.group())
+        return [text for text in found if text]
+
+class FieldsExtractor(PayloadExtractor):
+    """分隔符分隔的字段，如 "YS|12345678|上海|..."；不指定序号时每个字段都作为候选"""
+
+    type = 'fields'
+
+    def __init__(self, spec: Dict[str, Any]):
+        super().__init__(spec)
+        self.separator = spec.get('separator', '|')
+        self.index = spec.get('index')
+
+    def extract(self, payload):
+        if self.separator not in payload:
+            return []
+        fields = [field.strip() for field in payload.split(self.separator)]
+        if self.index is None:
+            return [field for field in fields if field]
+        try:
+            return [fields[int(self.index)]] if fields[int(self.index)] else []
+        except IndexError:
+            return []
+
+# 可用的提取器类型
+PAYLOAD_EXTRACTORS = {cls.type: cls for cls in (UrlParamExtractor, JsonKeyExtractor, RegexExtractor, FieldsExtractor)}
+
+class PayloadParser:
+    """
+    二维码内容解析：很多承运商的二维码是URL或结构化内容，整段文本不符合运单号规则；
+    依次用配置的提取器取出其中的运单号，作为同一条码的附加候选交给评分器判定
+    """
+
+    def __init__(self, extractors: List[PayloadExtractor]):
+        """
+        Args:
+            extractors: 依次尝试的提取器，靠前的候选在同等置信度下优先
+        """
+        self.extractors = extractors
+
+    @classmethod
+    def from_specs(cls, specs: List[Dict[str, Any]]) -> Optional['PayloadParser']:
+        """
+        根据配置创建，无效的配置项会被跳过
+        Args:
+            specs: 条码配置中的 payload_extractors
+        Returns:
+            PayloadParser: 解析器，没有有效的提取器时返回None
+        """
+        extractors = []
+        for spec in specs or []:
+            extractor_class = PAYLOAD_EXTRACTORS.get(spec.get('type'))
+            if extractor_class is None:
+                logger.warning(f"未知的二维码内容提取器: {spec.get('type')}")
+                continue
+            try:
+                extractors.append(extractor_class(spec))
+            except Exception as e:
+                logger.warning(f"二维码内容提取器 {spec.get('name') or spec.get('type')} 配置无效: {str(e)}")
+        return cls(extractors) if extractors else None
+
+    def extract(self, payload: str) -> List[str]:
+        """
+        从二维码内容中取出可能的运单号
+        Args:
+            payload: 二维码解码得到的完整文本
+        Returns:
+            list: 去重后的候选文本，内容本身已是运单号形式时为空
+        """
+        if not payload or _is_plain(payload):
+            return []
+        found = []
+        for extractor in self.extractors:
+            try:
+                values = extractor.extract(payload)
+            except Exception as e:
+                logger.error(f"二维码内容提取器 {extractor.name} 解析失败: {str(e)}")
+                continue
+            for value in values:
+                value = value.strip()
+                if value and value not in found:
+                    found.append(value)
+                    logger.debug("二维码内容 %s 经 %s 提取出 %s", payload, extractor.name, value)
+        return found
+
+    def expand(self, candidates: List[Candidate]) -> List[Candidate]:
+        """
+        在每个条码候选之后追加从其内容中提取的候选（置信度、位置和引擎与原候选相同）
+        Args:
+            candidates: 条码引擎解出的候选
+        Returns:
+            list: 扩充后的候选列表
+        """
+        expanded = []
+        for candidate in candidates:
+            expanded.append(candidate)
+            for text in self.extract(candidate.text):
+                expanded.append(Candidate(text, candidate.confidence, candidate.box, candidate.engine))
+        return expanded
@@ -0,0 +1,38 @@
+import logging
+from pyzbar.pyzbar import decode, ZBarSymbol
+from . import BarcodeEngine, SYMBOLOGY_LINEAR, SYMBOLOGY_QRCODE
+from ..ocr import Candidate
+
+logger = logging.getLogger(__name__)
+
+# 快递面单常见的一维码制
+LINEAR_SYMBOLS = [
+    ZBarSymbol.CODE128,
+    ZBarSymbol.CODE39,
+    ZBarSymbol.CODE93,
+    ZBarSymbol.I25,
+    ZBarSymbol.CODABAR,
+    ZBarSymbol.EAN13,
+    ZBarSymbol.EAN8,
+    ZBarSymbol.UPCA,
+    ZBarSymbol.UPCE
+]
+
+class ZBarEngine(BarcodeEngine):
+    """基于pyzbar（ZBar）的条码引擎，一维码和二维码都支持"""
+
+    name = 'zbar'
+
+    def decode(self, gray, symbologies):
+        symbols = []
+        if SYMBOLOGY_LINEAR in symbologies:
+            symbols.extend(LINEAR_SYMBOLS)
+        if SYMBOLOGY_QRCODE in symbologies:
+            symbols.append(ZBarSymbol.QRCODE)
+
+        candidates = []
+        for code in decode(gray, symbols=symbols):
+            text = code.data.decode('utf-8', errors='replace')
+            candidates.append(Candidate(text, 1.0, tuple(code.rect), 'barcode'))
+            logger.debug("ZBar识别结果: %s (%s)", text, code.type)
+        return candidates
@@ -0,0 +1,430 @@
+import os
+import sys
+import json
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# 流水线默认参数
+DEFAULT_PIPELINE_CONFIG = {
+    'executor': 'threads',      # 执行器：serial / threads / processes
+    'read_workers': 2,          # 读取/解码线程数
+    'recognize_workers': 0,     # 识别线程数，0 表示按CPU核心数自动选择
+    'output_workers': 1,        # 输出（重命名）线程数
+    'queue_size': 4,            # 每个阶段队列的最大长度
+    'memory_limit_mb': 1024,    # 已解码图像占用内存上限（MB）
+    'decode_scale': 1.0,        # 解码时缩小的比例：1 / 0.5 / 0.25 / 0.125
+    'tesseract_passes': 0,      # 常规档位依次尝试的Tesseract配置数，0 表示全部
+    'shared_frames': True,      # 多进程执行器：主进程解码后经共享内存交给识别进程，不序列化像素
+    'frame_slot_mb': 64,        # 共享帧槽大小（MB），解码后超过的图片由识别进程自行读取
+    'tesseract_batch': 0        # 指定识别区域时每个识别线程一次拼接识别的图片数，0/1 表示逐张识别
+}
+
+# 自动调优默认参数
+DEFAULT_AUTOTUNE_CONFIG = {
+    'sample_size': 24,                      # 从源文件夹均匀抽取的图片数
+    'decode_scales': [1.0, 0.5],            # 候选解码比例
+    'tesseract_passes': [1, 2, 3],          # 候选Tesseract配置数
+    'executors': ['threads', 'processes'],  # 候选执行器
+    'hit_rate_tolerance': 0.02,             # 识别率比最好结果低不超过此值时视为同等
+    'max_rss_mb': 0                         # 内存峰值上限（MB），超出的设置不采用，0 表示不限制
+}
+
+# 抽样预估默认参数
+DEFAULT_ESTIMATE_CONFIG = {
+    'sample_size': 60,          # 按文件类型和大小分层随机抽取的图片数
+    'time_budget': 30,          # 预估最长耗时（秒），到时只统计已完成的图片，0 表示不限制
+    'seed': None                # 随机种子，固定后每次抽到相同的样本
+}
+
+# 输出文件夹默认参数
+DEFAULT_OUTPUT_CONFIG = {
+    'shard': 'none',            # success 分片方式：none / date / prefix / hash / carrier
+    'date_format': '%Y-%m',     # 按日期分片时的子文件夹名
+    'prefix_length': 4,         # 按前缀分片时取运单号前几位
+    'hash_buckets': 256,        # 按哈希分片时的桶数
+    'carriers': {}              # 按承运商分片时运单号前缀到承运商名称的映射，如 {"YS": "永顺"}
+}
+
+# 归档压缩默认参数
+DEFAULT_TRANSCODE_CONFIG = {
+    'enabled': False,           # 成功的回单移入 success 后重新编码
+    'format': 'jpeg',           # 输出格式：jpeg / webp
+    'max_side': 2000,           # 长边上限（像素），0 表示不缩小
+    'quality': 80,              # 编码质量（1~100）
+    'grayscale': False,         # 是否转为灰度
+    'keep_original': False,     # 是否把原图保留在目标文件夹的 originals 中
+    'workers': 2                # 后台转码线程数
+}
+
+# 回单索引默认参数
+DEFAULT_INDEX_CONFIG = {
+    'enabled': True,
+    'path': 'waybill_index.db', # 相对路径位于配置文件所在目录
+    'hash_content': True        # 记录文件内容的SHA-1
+}
+
+# 多台电脑共同处理共享源文件夹的默认参数
+DEFAULT_WORKSHARE_CONFIG = {
+    'node': '',                 # 节点名，为空时使用计算机名；同一台电脑运行多个实例时需分别设置
+    'claim_batch': 8,           # 每次从源文件夹认领的图片数
+    'lease_seconds': 120,       # 心跳超过此时间未更新视为节点已退出，其图片由其他节点接管
+    'heartbeat_seconds': 15     # 心跳间隔
+}
+
+# 腾讯云OCR默认参数（密钥之外的调用管控设置）
+DEFAULT_TENCENT_CONFIG = {
+    'enabled': False,
+    'secret_id': '',
+    'secret_key': '',
+    'tiers': ['GeneralAccurateOCR'],  # 依次尝试的接口，可在前面加入 GeneralFastOCR / GeneralBasicOCR
+    'timeout': 10,                    # 请求超时（秒）
+    'batch_budget': 0,                # 每批次调用上限，0 表示不限制
+    'daily_budget': 0,                # 每日调用上限，0 表示不限制
+    'latency_slo_ms': 3000,           # 延迟目标，超出视为慢调用
+    'failure_threshold': 3,           # 连续失败多少次后熔断
+    'cooldown_seconds': 60            # 熔断后多久重新探测
+}
+
+# 默认识别选项，与主界面默认值一致
+DEFAULT_SCAN_OPTIONS = {
+    'scan_text': True,
+    'use_tencent': False,
+    'scan_barcode': True,
+    'scan_qrcode': True,
+    'min_length': 8,
+    'max_length': 12,
+    'prefix': 'YS',
+    'suffix': '',
+    'charset': '',              # 允许的字符，为空时不限制
+    'region': None,
+    'triage': False,            # 识别前做图像质量预检，明显无法识别的图片移入 rejected
+    'accept_confidence': 0.85,  # 高于此置信度直接采用，不再调用更昂贵的识别阶段
+    'min_confidence': 0.0,      # 低于此置信度的候选不采用
+    'rule_profiles': None,      # 多承运商规则列表，设置后代替上面的单一规则，结果按承运商分文件夹
+    'manifest': None            # 预期运单清单文件（CSV/文本），命中清单的候选直接采用并生成对账报告
+}
+
+# 预期运单清单默认参数
+DEFAULT_MANIFEST_CONFIG = {
+    'column': '',               # CSV中运单号的列名，为空时自动识别（运单号/单号/waybill…），都没有时取第一列
+    'max_distance': 1,          # 近似匹配允许的编辑距离（O/0、I/1、S/5 等易混淆字符不计）
+    'min_fuzzy_length': 6       # 短于此长度的文本不做近似匹配
+}
+
+# 多承运商运单号规则，按顺序优先；folder 为 success 下的子文件夹，缺省时使用 name
+DEFAULT_RULES_CONFIG = {
+    'profiles': [
+        {'name': 'SF', 'prefix': 'SF', 'min_length': 14, 'max_length': 15},
+        {'name': 'JD', 'prefix': 'JD', 'min_length': 14, 'max_length': 16},
+        {'name': 'YTO', 'prefix': 'YT', 'min_length': 15, 'max_length': 15},
+        {'name': 'YS', 'prefix': 'YS', 'min_length': 8, 'max_length': 12}
+    ]
+}
+
+# 条码识别默认参数
+DEFAULT_BARCODE_CONFIG = {
+    'engines': ['zbar'],        # 依次尝试的条码引擎：zbar / opencv，前一个解出合规结果即停止
+    # 首轮失败后的重试步骤，按实测每次成功耗时排序，为空时不重试
+    'retry_steps': ['otsu', 'adaptive', 'half', 'double', 'rotate90', 'rotate270', 'sharpen'],
+    'retry_budget_ms': 100,     # 单张图片重试总耗时上限（毫秒），0 表示不限制
+    'retry_max_side': 2000,     # 重试前把图像长边缩小到此值以内（像素），0 表示不缩小
+    # 二维码内容提取器（url / json / regex / fields），依次从URL参数、JSON字段等取出运单号，为空时不解析
+    'payload_extractors': [
+        {'type': 'url'},
+        {'type': 'json'}
+    ]
+}
+
+# 图像质量预检默认阈值
+DEFAULT_TRIAGE_CONFIG = {
+    'min_side': 300,            # 原图短边最小像素
+    'min_brightness': 25,       # 最低平均亮度（0~255）
+    'min_contrast': 12,         # 最低对比度（第95与第5百分位亮度差）
+    'min_ink': 0.003,           # 最低墨迹覆盖率
+    'min_sharpness': 15,        # 最低清晰度（缩略图拉普拉斯方差）
+    'thumb_size': 512,          # 缩略图长边（按比例缩小）
+    'chunk_size': 32            # 每批向量化计算的图片数
+}
+
+# 日志默认参数
+DEFAULT_LOGGING_CONFIG = {
+    'level': 'INFO',                # 日志级别，排查问题时可改为 DEBUG
+    'file': 'logs/waybill.log',     # 相对路径以配置文件所在目录为准
+    'format': 'json',               # json：每行一条结构化记录；text：普通文本
+    'max_bytes': 10 * 1024 * 1024,  # 单个日志文件大小上限
+    'backup_count': 5               # 保留的历史日志文件数
+}
+
+# 守护进程默认参数
+DEFAULT_DAEMON_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'unix_socket': '',          # 非空时改为监听该Unix套接字
+    'pool_size': 0,             # 常驻扫描器数量，0 表示与识别线程数一致
+    'options': {}               # 覆盖默认识别选项
+}
+
+def get_app_dir() -> str:
+    """获取程序所在目录"""
+    if getattr(sys, 'frozen', False):
+        # 如果是打包后的可执行文件
+        return os.path.dirname(sys.executable)
+    # 如果是开发环境
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def get_config_path() -> str:
+    """
+    获取配置文件路径
+    Returns:
+        str: 程序目录的config.json，不存在时回退到用户目录的waybill_config.json
+    """
+    config_path = os.path.join(get_app_dir(), 'config.json')
+
+    # 如果程序目录的配置文件不存在或无法访问，尝试用户目录
+    if not os.path.exists(config_path):
+        user_config_path = os.path.join(os.path.expanduser('~'), 'waybill_config.json')
+        if os.path.exists(user_config_path):
+            config_path = user_config_path
+
+    return config_path
+
+def load_config() -> Dict[str, Any]:
+    """
+    读取配置文件
+    Returns:
+        dict: 配置内容，文件不存在或读取失败时返回空字典
+    """
+    config_path = get_config_path()
+    if not os.path.exists(config_path):
+        return {}
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"读取配置文件失败: {str(e)}")
+        return {}
+
+def get_pipeline_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取流水线参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 流水线参数
+    """
+    if config is None:
+        config = load_config()
+
+    pipeline_config = dict(DEFAULT_PIPELINE_CONFIG)
+    pipeline_config.update(config.get('pipeline', {}))
+
+    if not pipeline_config['recognize_workers']:
+        pipeline_config['recognize_workers'] = max(1, (os.cpu_count() or 2) - 1)
+
+    return pipeline_config
+
+def get_daemon_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取守护进程参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 守护进程参数
+    """
+    if config is None:
+        config = load_config()
+
+    daemon_config = dict(DEFAULT_DAEMON_CONFIG)
+    daemon_config.update(config.get('daemon', {}))
+
+    if not daemon_config['pool_size']:
+        daemon_config['pool_size'] = get_pipeline_config(config)['recognize_workers']
+
+    options = dict(DEFAULT_SCAN_OPTIONS)
+    options.update(daemon_config.get('options') or {})
+    daemon_config['options'] = options
+
+    return daemon_config
+
+def get_tencent_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取腾讯云OCR参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 腾讯云OCR参数
+    """
+    if config is None:
+        config = load_config()
+
+    tencent_config = dict(DEFAULT_TENCENT_CONFIG)
+    tencent_config.update(config.get('tencent_ocr', {}))
+    return tencent_config
+
+def get_triage_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取图像质量预检阈值，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 预检阈值
+    """
+    if config is None:
+        config = load_config()
+
+    triage_config = dict(DEFAULT_TRIAGE_CONFIG)
+    triage_config.update(config.get('triage', {}))
+    return triage_config
+
+def get_barcode_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取条码识别参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 条码识别参数
+    """
+    if config is None:
+        config = load_config()
+
+    barcode_config = dict(DEFAULT_BARCODE_CONFIG)
+    barcode_config.update(config.get('barcode', {}))
+    return barcode_config
+
+def get_logging_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取日志参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 日志参数
+    """
+    if config is None:
+        config = load_config()
+
+    logging_config = dict(DEFAULT_LOGGING_CONFIG)
+    logging_config.update(config.get('logging', {}))
+    return logging_config
+
+def get_autotune_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取自动调优参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 自动调优参数
+    """
+    if config is None:
+        config = load_config()
+
+    autotune_config = dict(DEFAULT_AUTOTUNE_CONFIG)
+    autotune_config.update(config.get('autotune', {}))
+    return autotune_config
+
+def get_estimate_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取抽样预估参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 抽样预估参数
+    """
+    if config is None:
+        config = load_config()
+
+    estimate_config = dict(DEFAULT_ESTIMATE_CONFIG)
+    estimate_config.update(config.get('estimate', {}))
+    return estimate_config
+
+def get_workshare_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取多机协同参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 多机协同参数
+    """
+    if config is None:
+        config = load_config()
+
+    workshare_config = dict(DEFAULT_WORKSHARE_CONFIG)
+    workshare_config.update(config.get('workshare', {}))
+    return workshare_config
+
+def get_output_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取输出文件夹参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 输出参数
+    """
+    if config is None:
+        config = load_config()
+
+    output_config = dict(DEFAULT_OUTPUT_CONFIG)
+    output_config.update(config.get('output', {}))
+    return output_config
+
+def get_transcode_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取归档压缩参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 归档压缩参数
+    """
+    if config is None:
+        config = load_config()
+
+    transcode_config = dict(DEFAULT_TRANSCODE_CONFIG)
+    transcode_config.update(config.get('transcode', {}))
+    return transcode_config
+
+def get_index_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取回单索引参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 回单索引参数
+    """
+    if config is None:
+        config = load_config()
+
+    index_config = dict(DEFAULT_INDEX_CONFIG)
+    index_config.update(config.get('index', {}))
+    return index_config
+
+def get_rules_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取多承运商运单号规则，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 规则参数
+    """
+    if config is None:
+        config = load_config()
+
+    rules_config = dict(DEFAULT_RULES_CONFIG)
+    rules_config.update(config.get('rules', {}))
+    return rules_config
+
+def get_manifest_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    获取预期运单清单参数，缺省项使用默认值
+    Args:
+        config: 已读取的配置，为None时从配置文件读取
+    Returns:
+        dict: 清单参数
+    """
+    if config is None:
+        config = load_config()
+
+    manifest_config = dict(DEFAULT_MANIFEST_CONFIG)
+    manifest_config.update(config.get('manifest', {}))
+    return manifest_config
@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+import socketserver
+from base64 import b64decode
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, Any, Iterator, List, Optional
+from .config import get_daemon_config, load_config
+from .engine import BatchEngine, list_images
+from .scanner import WaybillScanner
+from .waybill_index import WaybillIndex, LOOKUP_EXACT
+
+logger = logging.getLogger(__name__)
+
+class ScannerPool:
+    """常驻扫描器池，引擎只在启动时初始化一次"""
+
+    def __init__(self, size: int, config: Dict[str, Any] = None):
+        """
+        初始化扫描器池
+        Args:
+            size: 常驻扫描器数量，即可同时识别的图片数
+            config: 扫描器使用的配置内容，为None时从配置文件读取
+        """
+        self.size = max(1, int(size))
+        self._scanners = [WaybillScanner(config=config) for _ in range(self.size)]
+        self._idle = queue.Queue()
+        for scanner in self._scanners:
+            self._idle.put(scanner)
+        logger.info(f"扫描器池初始化完成，共 {self.size} 个扫描器")
+
+    def start_batch(self) -> None:
+        """开始新批次：重置各扫描器的引擎统计和共享的腾讯云OCR批次计数"""
+        for scanner in self._scanners:
+            scanner.start_batch()
+
+    @contextmanager
+    def acquire(self) -> Iterator[WaybillScanner]:
+        """借出一个空闲扫描器，用完自动归还"""
+        scanner = self._idle.get()
+        try:
+            yield scanner
+        finally:
+            self._idle.put(scanner)
+
+    def load_image(self, image_path: str, options: Dict = None):
+        """读取并解码图片（解码不占用识别引擎）"""
+        return self._scanners[0].load_image(image_path, options)
+
+    def decode_image(self, data: bytes, options: Dict = None):
+        """解码内存中的图片数据"""
+        return self._scanners[0].processor.decode_image(data, options)
+
+    def scan_image(self, image, options: Dict) -> Optional[str]:
+        """使用空闲扫描器识别已解码的图片"""
+        with self.acquire() as scanner:
+            return scanner.scan_image(image, options)
+
+    def scan_image_detailed(self, image, options: Dict):
+        """使用空闲扫描器识别已解码的图片，返回识别结论"""
+        with self.acquire() as scanner:
+            return scanner.scan_image_detailed(image, options)
+
+    def scan_images_detailed(self, images: List, options: Dict):
+        """使用空闲扫描器一次识别多张已解码的图片"""
+        with self.acquire() as scanner:
+            return scanner.scan_images_detailed(images, options)
+
+class ScannerDaemon:
+    """扫描守护进程：常驻引擎池并通过本地HTTP/Unix套接字接收任务"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        初始化守护进程
+        Args:
+            config: 配置内容，为None时从配置文件读取
+        """
+        if config is None:
+            config = load_config()
+        self.config = config
+        self.daemon_config = get_daemon_config(config)
+        self.default_options = self.daemon_config['options']
+        self.pool = ScannerPool(self.daemon_config['pool_size'], config)
+        # 正在进行的批次数，全部结束后下一个批次才重置批次计数
+        self._active_batches = 0
+        self._batch_lock = threading.Lock()
+        self.index = WaybillIndex.open_default(config)
+        self.server = None
+
+    def merge_options(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """在默认识别选项上合并请求中的选项"""
+        options = dict(self.default_options)
+        options.update(request.get('options') or {})
+        return options
+
+    def scan_single(self, request: Dict[str, Any], data: bytes = None) -> Dict[str, Any]:
+        """
+        识别单张图片
+        Args:
+            request: 请求参数，包含 path 或 image_base64，可选 options
+            data: 直接上传的图片字节，优先于 request 中的图片
+        Returns:
+            dict: 识别结果
+        """
+        start = time.perf_counter()
+        options = self.merge_options(request)
+        path = request.get('path')
+
+        try:
+            if data is not None:
+                image = self.pool.decode_image(data, options)
+            elif request.get('image_base64'):
+                image = self.pool.decode_image(b64decode(request['image_base64']), options)
+            elif path:
+                image = self.pool.load_image(path, options)
+            else:
+                raise ValueError("请求中缺少图片（path 或 image_base64）")
+
+            waybill_number = self.pool.scan_image(image, options)
+            error = None
+        except Exception as e:
+            waybill_number = None
+            error = str(e)
+
+        return {
+            'path': path,
+            'waybill': waybill_number,
+            'error': error,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    def collect_paths(self, request: Dict[str, Any]) -> List[str]:
+        """从批量请求中取出图片路径列表（paths 或 folder）"""
+        if request.get('paths'):
+            return list(request['paths'])
+
+        folder = request.get('folder')
+        if not folder:
+            raise ValueError("请求中缺少 paths 或 folder")
+
+        return list_images(folder)
+
+    def iter_batch(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        批量识别，按完成顺序逐个返回结果
+        Args:
+            request: 请求参数，包含 paths 或 folder，可选 options
+        Returns:
+            Iterator[dict]: 每张图片的识别结果
+        """
+        # 先校验请求，避免流式响应发出后才报错
+        paths = self.collect_paths(request)
+        engine = BatchEngine(self.pool, self.merge_options(request), 'threads', self.config)
+        return self._run_batch(engine, paths)
+
+    def _run_batch(self, engine: BatchEngine, paths: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        执行批次；没有其他批次在进行时才重置批次调用上限和鉴权停用，
+        同时进行的批次共用一份批次预算，新请求不会让进行中的批次重新计数
+        """
+        with self._batch_lock:
+            if not self._active_batches:
+                self.pool.start_batch()
+            self._active_batches += 1
+        try:
+            for result in engine.iter_results(paths):
+                yield result.to_dict()
+        finally:
+            with self._batch_lock:
+                self._active_batches -= 1
+
+    def lookup(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        查找回单
+        Args:
+            query: URL查询参数，q 为运单号或前缀，mode 为 exact / prefix / fuzzy，limit 为最多条数
+        Returns:
+            dict: 查找结果
+        """
+        if self.index is None:
+            raise ValueError("回单索引未启用")
+        text = (query.get('q') or [''])[0]
+        if not text:
+            raise ValueError("请求中缺少 q")
+        mode = (query.get('mode') or [LOOKUP_EXACT])[0]
+        limit = int((query.get('limit') or [50])[0])
+        return {'query': text, 'mode': mode, 'results': self.index.lookup(text, mode, limit)}
+
+    def serve_forever(self) -> None:
+        """启动服务并阻塞，直到 shutdown 被调用"""
+        unix_socket = self.daemon_config['unix_socket']
+        if unix_socket:
+            if not hasattr(socket, 'AF_UNIX'):
+                raise RuntimeError("当前系统不支持Unix套接字，请改用HTTP端口")
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            self.server = _ThreadingUnixHTTPServer(unix_socket, _DaemonRequestHandler)
+            address = unix_socket
+        else:
+            self.server = ThreadingHTTPServer(
+                (self.daemon_config['host'], int(self.daemon_config['port'])),
+                _DaemonRequestHandler
+            )
+            address = f"http://{self.daemon_config['host']}:{self.daemon_config['port']}"
+
+        self.server.daemon_threads = True
+        self.server.scanner_daemon = self
+        logger.info(f"扫描守护进程已启动: {address}")
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if unix_socket and os.path.exists(unix_socket):
+                os.remove(unix_socket)
+
+    def shutdown(self) -> None:
+        """停止服务"""
+        if self.server is not None:
+            self.server.shutdown()
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """监听Unix套接字的多线程HTTP服务"""
+        daemon_threads = True
+
+class _DaemonRequestHandler(BaseHTTPRequestHandler):
+    """
+    守护进程请求处理
+    GET  /health  运行状态
+    GET  /waybill 查找回单，?q=运单号&mode=exact|prefix|fuzzy&limit=50
+    POST /scan    单张识别，JSON请求体或直接上传图片字节
+    POST /batch   批量识别，全部完成后一次返回
+    POST /stream  批量识别，按完成顺序逐行返回JSON（chunked）
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix套接字没有客户端地址
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'local'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok', 'pool_size': self.server.scanner_daemon.pool.size})
+        elif url.path == '/waybill':
+            try:
+                self._send_json(200, self.server.scanner_daemon.lookup(parse_qs(url.query)))
+            except Exception as e:
+                self._send_json(400, {'error': str(e)})
+        else:
+            self._send_json(404, {'error': f"未知接口: {self.path}"})
+
+    def do_POST(self):
+        daemon = self.server.scanner_daemon
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            content_type = self.headers.get('Content-Type', '')
+
+            if self.path == '/scan' and not content_type.startswith('application/json'):
+                # 直接上传的图片字节
+                self._send_json(200, daemon.scan_single({}, data=body))
+                return
+
+            request = json.loads(body.decode('utf-8')) if body else {}
+
+            if self.path == '/scan':
+                self._send_json(200, daemon.scan_single(request))
+            elif self.path == '/batch':
+                self._send_json(200, {'results': list(daemon.iter_batch(request))})
+            elif self.path == '/stream':
+                self._send_stream(daemon.iter_batch(request))
+            else:
+                self._send_json(404, {'error': f"未知接口: {self.path}"})
+
+        except Exception as e:
+            logger.error(f"处理请求 {self.path} 失败: {str(e)}")
+            self._send_json(400, {'error': str(e)})
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, results: Iterator[Dict[str, Any]]) -> None:
+        """
+        逐行发送结果；响应头发出后出错时以最后一行 {"error": ...} 结束流，
+        客户端断开时停止发送，不再写入其他响应
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        try:
+            try:
+                for result in results:
+                    self._send_chunk(result)
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                logger.error(f"处理请求 {self.path} 失败: {str(e)}")
+                self._send_chunk({'error': str(e)})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.warning(f"客户端已断开，停止发送 {self.path} 的结果")
+            self.close_connection = True
+        finally:
+            # 停止迭代时引擎不再送入新的图片
+            close = getattr(results, 'close', None)
+            if close is not None:
+                close()
+
+    def _send_chunk(self, payload: Dict[str, Any]) -> None:
+        line = (json.dumps(payload, ensure_ascii=False) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(line):X}\r\n".encode('ascii') + line + b"\r\n")
+        self.wfile.flush()
+
+def run_daemon(port: int = None) -> int:
+    """
+    以守护进程模式运行
+    Args:
+        port: 覆盖配置中的HTTP端口
+    Returns:
+        int: 退出码
+    """
+    config = load_config()
+    if port:
+        config.setdefault('daemon', {})['port'] = port
+
+    daemon = ScannerDaemon(config)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("扫描守护进程已停止")
+    return 0
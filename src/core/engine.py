@@ -0,0 +1,769 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor as _ProcessPool, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, Iterable, Iterator, AsyncIterator, Optional, Tuple, Union
+from .config import get_pipeline_config
+from .fileops import move_exclusive, numbered_path, reserve
+from .framepool import FramePool, FrameHandle, attach_frame
+from .log import image_logger
+from .manifest import get_manifest, reconciliation_path, write_reconciliation, RECEIVED, MISSING, UNEXPECTED
+from .ocr import Candidate
+from .pipeline import StagedPipeline
+from .recognition_store import RecognitionStore
+from .report import BatchReport, STATUS_SUCCESS, STATUS_FAIL, STATUS_REJECTED
+from .rules import RuleSet
+from .scoring import Recognition
+from .sharding import ShardLayout
+from .transcode import Transcoder
+from .waybill_index import WaybillIndex
+from .triage import ImageTriage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+def list_images(folder: str) -> list:
+    """
+    列出文件夹中的图片
+    Args:
+        folder: 文件夹路径
+    Returns:
+        list: 图片完整路径列表
+    """
+    return [
+        os.path.join(folder, f) for f in os.listdir(folder)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+def iter_source(source: Union[str, Iterable[str]]) -> Iterable[str]:
+    """
+    将输入源统一为图片路径序列
+    Args:
+        source: 文件夹路径、文件路径列表，或持续产出路径的迭代器（流）
+    Returns:
+        Iterable[str]: 图片路径
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.isdir(source):
+            return list_images(source)
+        return [source]
+    return source
+
+class ImageResult:
+    """单张图片的处理结果"""
+    __slots__ = ('index', 'path', 'waybill', 'recognition', 'error', 'rejection', 'timings',
+                 'status', 'output_path', 'reason')
+
+    def __init__(self, index: int, path: str, recognition: Optional[Recognition] = None,
+                 error: Optional[str] = None, timings: Dict[str, float] = None,
+                 rejection: Optional[str] = None):
+        self.index = index
+        self.path = path
+        self.recognition = recognition
+        self.waybill = recognition.waybill if recognition else None
+        self.error = error
+        # 预检拒绝原因，拒绝的图片不经过识别
+        self.rejection = rejection
+        self.timings = timings if timings is not None else {}
+        # 以下由 BatchOutput 填写
+        self.status = ''
+        self.output_path: Optional[str] = None
+        self.reason = ''
+
+    @property
+    def filename(self) -> str:
+        """原文件名"""
+        return os.path.basename(self.path)
+
+    @property
+    def elapsed(self) -> float:
+        """各阶段总耗时（秒）"""
+        return sum(self.timings.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        recognition = self.recognition
+        return {
+            'path': self.path,
+            'waybill': self.waybill,
+            'stage': recognition.stage if recognition else '',
+            'confidence': round(recognition.confidence, 4) if recognition and self.waybill else None,
+            'profile': recognition.profile if recognition else '',
+            'error': self.error,
+            'rejection': self.rejection,
+            'status': self.status,
+            'output': self.output_path,
+            'timings_ms': {k: round(v * 1000, 1) for k, v in self.timings.items()}
+        }
+
+class Executor(ABC):
+    """执行器：决定识别以何种方式并行"""
+
+    @abstractmethod
+    def run(self, scanner, options: Dict[str, Any], paths: Iterable[str],
+            handle_result: Callable[[ImageResult], None]) -> None:
+        """
+        处理全部图片，阻塞直到结束
+        Args:
+            scanner: WaybillScanner（或具有相同接口的扫描器池）
+            options: 识别选项
+            paths: 图片路径序列
+            handle_result: 每张图片完成后调用
+        """
+        pass
+
+class SerialExecutor(Executor):
+    """单线程依次处理"""
+
+    def run(self, scanner, options, paths, handle_result):
+        for index, path in enumerate(paths):
+            timings = {}
+            start = time.perf_counter()
+            try:
+                image = scanner.load_image(path, options)
+            except Exception as e:
+                handle_result(ImageResult(index, path, error=str(e), timings={'read': time.perf_counter() - start}))
+                continue
+            timings['read'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            recognition = scanner.scan_image_detailed(image, options)
+            timings['recognize'] = time.perf_counter() - start
+            del image
+
+            handle_result(ImageResult(index, path, recognition, timings=timings))
+
+class ThreadExecutor(Executor):
+    """多线程分阶段流水线（读取/解码、识别、输出各自有界）"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Args:
+            config: 配置内容，为None时从配置文件读取 pipeline 段
+        """
+        self.config = config
+
+    def run(self, scanner, options, paths, handle_result):
+        def on_item(item):
+            result = ImageResult(item.index, item.path, item.recognition, item.error, item.timings)
+            handle_result(result)
+
+        pipeline = StagedPipeline.from_config(scanner, options, self.config)
+        pipeline.run(paths, on_item)
+
+# 进程执行器中每个子进程常驻的扫描器
+_process_scanner = None
+
+def _init_process_worker(config: Dict[str, Any] = None):
+    """子进程初始化：创建一次扫描器，之后的任务复用"""
+    global _process_scanner
+    from .scanner import WaybillScanner
+    _process_scanner = WaybillScanner(config=config)
+    _process_scanner.start_batch()
+
+def _process_one(path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """在子进程中处理一张图片，只返回可序列化的结果，不回传图像"""
+    timings = {}
+    start = time.perf_counter()
+    try:
+        image = _process_scanner.load_image(path, options)
+    except Exception as e:
+        return {'error': str(e), 'timings': {'read': time.perf_counter() - start}}
+    timings['read'] = time.perf_counter() - start
+    return _recognize(image, options, timings)
+
+def _process_frame(handle: FrameHandle, options: Dict[str, Any], read_time: float) -> Dict[str, Any]:
+    """在子进程中识别主进程已解码、放在共享内存中的图像"""
+    image = attach_frame(handle)
+    try:
+        return _recognize(image, options, {'read': read_time})
+    finally:
+        # 返回后槽位会被复用，不保留对共享内存的引用
+        del image
+
+def _recognize(image, options: Dict[str, Any], timings: Dict[str, float]) -> Dict[str, Any]:
+    """识别已解码的图像，结果转换为可序列化的字典"""
+    start = time.perf_counter()
+    recognition = _process_scanner.scan_image_detailed(image, options)
+    timings['recognize'] = time.perf_counter() - start
+
+    return {
+        'waybill': recognition.waybill,
+        'confidence': recognition.confidence,
+        'stage': recognition.stage,
+        'profile': recognition.profile,
+        'candidates': [c.to_dict() for c in recognition.candidates],
+        'timings': timings
+    }
+
+class ProcessExecutor(Executor):
+    """
+    多进程处理，每个子进程常驻一个扫描器，绕开GIL。
+    启用共享帧时由主进程的解码线程读取图片，写入共享内存帧池，子进程按句柄映射后识别，
+    像素不经过序列化；未启用或共享内存不可用时由子进程自行读取图片
+    """
+
+    def __init__(self, workers: int = 0, max_inflight: int = 0, config: Dict[str, Any] = None):
+        """
+        Args:
+            workers: 子进程数，0 表示按CPU核心数
+            max_inflight: 同时提交的任务上限，0 表示子进程数的2倍；启用共享帧时也是帧池的槽数
+            config: 子进程创建扫描器使用的配置，为None时从配置文件读取
+        """
+        pipeline_config = get_pipeline_config(config)
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_inflight = max_inflight or self.workers * 2
+        self.config = config
+        self.shared_frames = pipeline_config['shared_frames']
+        self.frame_slot_bytes = int(pipeline_config['frame_slot_mb'] * 1024 * 1024)
+        self.read_workers = max(1, pipeline_config['read_workers'])
+
+    def run(self, scanner, options, paths, handle_result):
+        frames = None
+        if self.shared_frames:
+            try:
+                frames = FramePool(self.max_inflight, self.frame_slot_bytes)
+            except Exception as e:
+                logger.warning(f"创建共享帧池失败，改由子进程读取图片: {str(e)}")
+
+        # 子进程自行创建扫描器，传入的 scanner 只在主进程中解码
+        try:
+            with _ProcessPool(max_workers=self.workers, initializer=_init_process_worker,
+                              initargs=(self.config,)) as pool:
+                if frames is None:
+                    self._run_paths(pool, options, paths, handle_result)
+                else:
+                    self._run_frames(pool, frames, scanner, options, paths, handle_result)
+        finally:
+            if frames is not None:
+                frames.close()
+
+    def _run_paths(self, pool, options, paths, handle_result):
+        """子进程自行读取并识别"""
+        pending = {}
+
+        def drain():
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, path = pending.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    handle_result(ImageResult(index, path, error=str(e)))
+                    continue
+                handle_result(self._to_result(index, path, data))
+
+        for index, path in enumerate(paths):
+            # 限制在途任务数（背压）
+            if len(pending) >= self.max_inflight:
+                drain()
+            pending[pool.submit(_process_one, path, options)] = (index, path)
+
+        while pending:
+            drain()
+
+    def _run_frames(self, pool, frames, scanner, options, paths, handle_result):
+        """主进程解码写入帧池，子进程映射共享内存识别；识别完成后归还槽位"""
+        # 解码任务和识别任务：future -> (序号, 路径, 槽号)
+        decoding = {}
+        recognizing = {}
+
+        def decode(slot, path):
+            start = time.perf_counter()
+            image = scanner.load_image(path, options)
+            # 超过槽大小的图片交给子进程自行读取
+            handle = frames.write(slot, image) if frames.fits(image) else None
+            return handle, time.perf_counter() - start
+
+        def drain():
+            done, _ = wait(list(decoding) + list(recognizing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in decoding:
+                    index, path, slot = decoding.pop(future)
+                    try:
+                        handle, read_time = future.result()
+                    except Exception as e:
+                        frames.release(slot)
+                        handle_result(ImageResult(index, path, error=str(e)))
+                        continue
+                    if handle is None:
+                        frames.release(slot)
+                        recognizing[pool.submit(_process_one, path, options)] = (index, path, None)
+                    else:
+                        recognizing[pool.submit(_process_frame, handle, options, read_time)] = (index, path, slot)
+                    continue
+
+                index, path, slot = recognizing.pop(future)
+                if slot is not None:
+                    frames.release(slot)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    handle_result(ImageResult(index, path, error=str(e)))
+                    continue
+                handle_result(self._to_result(index, path, data))
+
+        with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix='frame-decode') as readers:
+            for index, path in enumerate(paths):
+                # 在途帧数不超过槽数（背压），槽位在识别完成后归还
+                while len(decoding) + len(recognizing) >= self.max_inflight:
+                    drain()
+                slot = frames.acquire()
+                decoding[readers.submit(decode, slot, path)] = (index, path, slot)
+
+            while decoding or recognizing:
+                drain()
+
+    @staticmethod
+    def _to_result(index: int, path: str, data: Dict[str, Any]) -> ImageResult:
+        if data.get('error'):
+            return ImageResult(index, path, error=data['error'], timings=data['timings'])
+        recognition = Recognition(
+            data['waybill'],
+            data['confidence'],
+            data['stage'],
+            [Candidate.from_dict(c) for c in data['candidates']],
+            data.get('profile', '')
+        )
+        return ImageResult(index, path, recognition, timings=data['timings'])
+
+def create_executor(name: str = None, config: Dict[str, Any] = None) -> Executor:
+    """
+    按名称创建执行器
+    Args:
+        name: serial / threads / processes，为None时读取配置 pipeline.executor
+        config: 配置内容
+    Returns:
+        Executor: 执行器
+    """
+    pipeline_config = get_pipeline_config(config)
+    name = name or pipeline_config.get('executor', 'threads')
+    if name == 'serial':
+        return SerialExecutor()
+    if name == 'threads':
+        return ThreadExecutor(config)
+    if name == 'processes':
+        return ProcessExecutor(pipeline_config['recognize_workers'], config=config)
+    raise ValueError(f"未知的执行器: {name}")
+
+class BatchOutput:
+    """
+    批处理输出：将成功的图片以运单号重命名移入success文件夹（可按配置分片到子文件夹），
+    同名时依次加 -2、-3 后缀，预检拒绝的图片移入rejected文件夹，
+    并写入处理明细和原始识别记录；启用归档压缩时成功的图片在后台重新编码
+    """
+
+    def __init__(self, target_folder: str, source_folder: str, options: Dict[str, Any],
+                 name_suffix: str = '', release: Callable[[str], str] = None):
+        """
+        Args:
+            target_folder: 目标文件夹
+            source_folder: 源文件夹（记录在识别记录中）
+            options: 识别选项（记录在识别记录中）
+            name_suffix: 处理明细和总结文件名的后缀，对同一目标文件夹再次处理时使用
+            release: 可选，处理失败的图片交由其处置（如多机协同时交还共享源文件夹），返回新路径
+        """
+        self.target_folder = target_folder
+        self.release = release
+        self.success_folder = os.path.join(target_folder, 'success')
+        self.rejected_folder = os.path.join(target_folder, 'rejected')
+        self._lock = threading.Lock()
+        self.waybill_count = {}
+        # 多承运商规则时按匹配的规则放入 success 下各自的子文件夹
+        self.rules = RuleSet.from_options(options)
+        self.profile_counts = {}
+        # 有预期运单清单时记录本批次收到的回单，结束后生成对账报告
+        self.name_suffix = name_suffix
+        self.manifest = get_manifest(options['manifest']) if options.get('manifest') else None
+        self.received = {}
+
+        # 确保目标文件夹和success子文件夹存在
+        os.makedirs(self.success_folder, exist_ok=True)
+        logger.info(f"创建目标文件夹结构: {target_folder}")
+
+        self.layout = ShardLayout.from_config(self.success_folder)
+        # 回单索引：记录每次成功的重命名，并全局分配重名序号；无法打开时退回按本次处理计数
+        self.index = WaybillIndex.open_default()
+        # 归档压缩：未启用时为None，图片原样移入
+        self.transcoder = Transcoder.from_config(target_folder)
+        if self.transcoder is not None:
+            self.transcoder.recover(self.success_folder)
+
+        self.report = BatchReport(target_folder, name_suffix=name_suffix)
+        self.store = RecognitionStore.create(target_folder, source_folder, self.success_folder, options,
+                                             name_suffix, output_layout=self.layout.to_dict())
+
+    @property
+    def success_count(self) -> int:
+        return self.report.counts[STATUS_SUCCESS]
+
+    @property
+    def fail_count(self) -> int:
+        return self.report.counts[STATUS_FAIL]
+
+    @property
+    def rejected_count(self) -> int:
+        return self.report.counts[STATUS_REJECTED]
+
+    def next_filename(self, waybill_number: str, ext: str, shard: str = '') -> Tuple[str, int]:
+        """
+        分配新文件名，同一运单号第二张起加序号后缀；
+        有回单索引时序号全局分配，否则从分片索引中已有的数量开始计数；
+        跳过分片中已有的文件名（此前批次或索引建立前的结果），避免覆盖
+        Returns:
+            tuple: (文件名, 序号)
+        """
+        folder = self.layout.folder(shard)
+        if self.index is not None:
+            while True:
+                count = self.index.allocate(waybill_number)
+                filename = f"{waybill_number}{ext}" if count == 1 else f"{waybill_number}-{count}{ext}"
+                if not os.path.exists(os.path.join(folder, filename)):
+                    return filename, count
+
+        with self._lock:
+            key = (shard, waybill_number)
+            count = self.waybill_count.get(key)
+            if count is None:
+                count = self.layout.count(shard, waybill_number)
+            while True:
+                count += 1
+                filename = f"{waybill_number}{ext}" if count == 1 else f"{waybill_number}-{count}{ext}"
+                if not os.path.exists(os.path.join(folder, filename)):
+                    break
+            self.waybill_count[key] = count
+        return filename, count
+
+    def handle(self, result: ImageResult) -> None:
+        """
+        输出一张图片的结果
+        Args:
+            result: 处理结果，会填写 status / output_path / reason
+        """
+        filename = result.filename
+        try:
+            if result.error is not None:
+                raise RuntimeError(result.error)
+
+            if result.rejection:
+                # 预检拒绝：保留原文件名移入rejected，重名时与success相同加 -2、-3 …
+                os.makedirs(self.rejected_folder, exist_ok=True)
+                stem, ext = os.path.splitext(filename)
+                count = 1
+                while True:
+                    target_path = numbered_path(self.rejected_folder, stem, ext, count)
+                    try:
+                        move_exclusive(result.path, target_path)
+                        break
+                    except FileExistsError:
+                        count += 1
+                result.output_path = target_path
+                result.status = STATUS_REJECTED
+                result.reason = result.rejection
+            elif result.waybill:
+                _, ext = os.path.splitext(filename)
+                if self.transcoder is not None:
+                    ext = self.transcoder.ext
+                shard = self.shard_for(result)
+                while True:
+                    new_filename, count = self.next_filename(result.waybill, ext, shard)
+                    target_path = os.path.join(self.layout.folder(shard), new_filename)
+
+                    # 移动并重命名文件，原子地占用目标名；其他电脑刚写入同名文件时（多机协同）换下一个序号
+                    try:
+                        if self.transcoder is not None:
+                            # 转码完成前先占用文件名，转码结果写完后替换
+                            reserve(target_path)
+                        else:
+                            move_exclusive(result.path, target_path)
+                        break
+                    except FileExistsError:
+                        continue
+                result.output_path = target_path
+                result.status = STATUS_SUCCESS
+                if self.transcoder is not None:
+                    # 分片索引、明细、识别记录和回单索引在转码完成、最终路径确定后写入
+                    self._transcode(result, shard, count)
+                    return
+                self.layout.record(shard, result.waybill, new_filename)
+                if self.index is not None:
+                    self._index_result(result, count, target_path)
+            else:
+                result.status = STATUS_FAIL
+                result.reason = "未识别到运单号"
+
+        except Exception as e:
+            result.status = STATUS_FAIL
+            result.output_path = None
+            result.reason = f"处理出错: {str(e)}"
+            logger.error(f"处理文件 {filename} 时出错: {str(e)}")
+
+        if result.status == STATUS_FAIL and self.release is not None and os.path.exists(result.path):
+            result.path = self.release(result.path)
+        self._record(result)
+
+    def _record(self, result: ImageResult) -> None:
+        """写入处理明细、逐图日志和原始识别记录，统计成功回单的承运商和清单到件"""
+        filename = result.filename
+        recognition = result.recognition
+        if result.status == STATUS_SUCCESS:
+            with self._lock:
+                if self.rules.multiple:
+                    profile = recognition.profile
+                    self.profile_counts[profile] = self.profile_counts.get(profile, 0) + 1
+                if self.manifest is not None:
+                    self.received.setdefault(result.waybill.upper(), []).append(result.output_path)
+        # 分片时明细中写相对 success 的路径
+        output_name = ''
+        if result.status == STATUS_SUCCESS:
+            output_name = os.path.relpath(result.output_path, self.success_folder)
+        elif result.output_path:
+            output_name = os.path.basename(result.output_path)
+        stage = recognition.stage if recognition else ''
+        confidence = recognition.confidence if recognition and result.waybill else None
+        self.report.write(
+            result.status,
+            filename,
+            output_name,
+            result.reason,
+            stage=stage,
+            confidence=confidence,
+            elapsed=result.elapsed
+        )
+
+        # 每张图片一条结构化日志，未启用时不构造字段
+        if image_logger.isEnabledFor(logging.INFO):
+            image_logger.info("%s %s -> %s", result.status, filename, output_name or result.reason, extra={
+                'file': filename,
+                'status': result.status,
+                'waybill': result.waybill,
+                'stage': stage,
+                'confidence': round(confidence, 4) if confidence is not None else None,
+                'elapsed_ms': round(result.elapsed * 1000, 1),
+                'timings_ms': {k: round(v * 1000, 1) for k, v in result.timings.items()},
+                'reason': result.reason
+            })
+
+        # 保存原始识别记录，规则调整后可重新判定（拒绝的图片没有识别结果，不记录）
+        if result.rejection:
+            return
+        try:
+            self.store.append(result.path, recognition, result.output_path)
+        except Exception as e:
+            logger.error(f"保存识别记录失败: {str(e)}")
+
+    def shard_for(self, result: ImageResult) -> str:
+        """成功图片相对 success 的子文件夹：承运商规则的文件夹，再按分片方式细分"""
+        shard = self.layout.shard_for(result.waybill)
+        folder = self.rules.folder_for(result.recognition.profile) if result.recognition else ''
+        if not folder:
+            return shard
+        return os.path.join(folder, shard) if shard else folder
+
+    def _transcode(self, result: ImageResult, shard: str, count: int) -> None:
+        """
+        提交归档压缩，转码完成后再写分片索引、明细、识别记录和回单索引（内容哈希对应压缩后的文件）；
+        转码失败时原图按原扩展名放回，各记录中只写放回后的路径
+        """
+        target_path = result.output_path
+
+        def on_done(final_path):
+            result.output_path = final_path
+            # 原图放回失败时仍在暂存区，不写入分片索引
+            if os.path.dirname(final_path) == os.path.dirname(target_path):
+                self.layout.record(shard, result.waybill, os.path.basename(final_path))
+            self._record(result)
+            if self.index is not None:
+                self._index_result(result, count, final_path)
+
+        try:
+            self.transcoder.submit(result.path, target_path, self.success_folder, on_done)
+        except Exception:
+            os.remove(target_path)
+            raise
+
+    def _index_result(self, result: ImageResult, count: int, path: str) -> None:
+        """把成功重命名的回单写入回单索引"""
+        recognition = result.recognition
+        try:
+            self.index.add(
+                result.waybill,
+                count,
+                path,
+                batch=os.path.basename(self.store.path),
+                stage=recognition.stage if recognition else None,
+                confidence=recognition.confidence if recognition else None
+            )
+        except Exception as e:
+            logger.error(f"写入回单索引失败: {str(e)}")
+
+    def close(self, extra_lines: Dict[str, Any] = None) -> None:
+        """
+        结束输出，由处理明细生成处理总结
+        Args:
+            extra_lines: 附加在总结统计信息后的内容
+        """
+        extra_lines = dict(extra_lines or {})
+        if self.transcoder is not None:
+            # 等待后台转码完成，转码结果写入明细、识别记录和回单索引后才能关闭它们
+            self.transcoder.close()
+            extra_lines['归档压缩'] = self.transcoder.summary()
+        self.store.close()
+        if self.manifest is not None:
+            # 此前批次收到的回单从回单索引中查找；报告写入失败（如正被Excel打开）不影响处理总结
+            try:
+                counts = write_reconciliation(
+                    reconciliation_path(self.target_folder, self.name_suffix),
+                    self.manifest, self.received, self.index
+                )
+                extra_lines['清单对账'] = (f"应到 {len(self.manifest)}，已到 {counts[RECEIVED]}，"
+                                        f"缺失 {counts[MISSING]}，清单外 {counts[UNEXPECTED]}")
+            except Exception as e:
+                logger.error(f"写入清单对账失败: {str(e)}")
+                extra_lines['清单对账'] = f"写入失败：{str(e)}"
+        if self.index is not None:
+            self.index.close()
+        if self.profile_counts:
+            extra_lines['各承运商'] = '，'.join(
+                f"{profile.name} {self.profile_counts[profile.name]}" for profile in self.rules.profiles
+                if profile.name in self.profile_counts
+            )
+        self.report.write_summary(extra_lines)
+
+_DONE = object()
+
+class BatchEngine:
+    """
+    批处理引擎（不依赖Qt）
+    接受文件夹、文件列表或路径流，按完成顺序返回每张图片的结果和各阶段耗时；
+    执行器可选单线程、多线程流水线或多进程。
+    识别选项 triage 为真时，图片先按批做质量预检，被拒绝的图片不进入执行器。
+    """
+
+    def __init__(self, scanner, options: Dict[str, Any], executor: Union[Executor, str] = None,
+                 config: Dict[str, Any] = None, result_queue_size: int = 64):
+        """
+        Args:
+            scanner: WaybillScanner 或 ScannerPool
+            options: 识别选项
+            executor: 执行器实例或名称，为None时按配置选择
+            config: 配置内容
+            result_queue_size: 未被取走的结果上限，调用方消费慢时反压执行器
+        """
+        self.scanner = scanner
+        self.options = options
+        if executor is None or isinstance(executor, str):
+            executor = create_executor(executor, config)
+        self.executor = executor
+        self.result_queue_size = result_queue_size
+        self.triage = ImageTriage.from_config(config) if options.get('triage') else None
+
+    def iter_results(self, source: Union[str, Iterable[str]],
+                     output: Optional[BatchOutput] = None) -> Iterator[ImageResult]:
+        """
+        同步迭代处理结果
+        调用方提前停止迭代（break、异常或关闭生成器）时不再送入新的图片，
+        等执行器处理完已送入的图片、线程结束后才返回，之后关闭 output 不会与执行器并发
+        Args:
+            source: 文件夹路径、文件路径列表或路径流
+            output: 可选的批处理输出，在执行器的输出环节对每个结果调用
+        Returns:
+            Iterator[ImageResult]: 按完成顺序的结果
+        """
+        paths = iter_source(source)
+        results = queue.Queue(maxsize=self.result_queue_size)
+        errors = []
+        abandoned = threading.Event()
+
+        def handle_result(result):
+            if output is not None:
+                output.handle(result)
+            # 调用方已停止迭代时不再排队，避免执行器阻塞
+            if not abandoned.is_set():
+                results.put(result)
+
+        def reject(path, reason, elapsed):
+            handle_result(ImageResult(-1, path, timings={'triage': elapsed}, rejection=reason))
+
+        def until_abandoned():
+            # 调用方停止迭代后执行器不再取到新的图片，处理完在途的图片即结束
+            for path in paths:
+                if abandoned.is_set():
+                    return
+                yield path
+
+        def run():
+            try:
+                source_paths = until_abandoned()
+                if self.triage is not None:
+                    source_paths = self.triage.filter(source_paths, reject)
+                self.executor.run(self.scanner, self.options, source_paths, handle_result)
+            except Exception as e:
+                logger.error(f"批处理失败: {str(e)}")
+                errors.append(e)
+            finally:
+                results.put(_DONE)
+
+        thread = threading.Thread(target=run, name="batch-engine", daemon=True)
+        thread.start()
+
+        finished = False
+        try:
+            while True:
+                result = results.get()
+                if result is _DONE:
+                    finished = True
+                    break
+                yield result
+        finally:
+            abandoned.set()
+            # 取走剩余结果，释放可能因队列已满而阻塞的执行器，直到执行器处理完在途的图片
+            while not finished:
+                finished = results.get() is _DONE
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+    async def aiter_results(self, source: Union[str, Iterable[str]],
+                            output: Optional[BatchOutput] = None) -> AsyncIterator[ImageResult]:
+        """
+        异步迭代处理结果，等待结果时不阻塞事件循环
+        Args:
+            source: 文件夹路径、文件路径列表或路径流
+            output: 可选的批处理输出
+        Returns:
+            AsyncIterator[ImageResult]: 按完成顺序的结果
+        """
+        loop = asyncio.get_running_loop()
+        iterator = self.iter_results(source, output)
+        while True:
+            result = await loop.run_in_executor(None, next, iterator, _DONE)
+            if result is _DONE:
+                break
+            yield result
+
+    def process(self, source: Union[str, Iterable[str]], target_folder: str,
+                source_folder: str = None, name_suffix: str = '') -> Iterator[ImageResult]:
+        """
+        处理并输出：成功的图片重命名移入 target_folder/success，结束后生成处理总结
+        Args:
+            source: 文件夹路径、文件路径列表或路径流
+            target_folder: 目标文件夹
+            source_folder: 源文件夹，source 为文件夹时可省略
+            name_suffix: 处理明细和总结文件名的后缀
+        Returns:
+            Iterator[ImageResult]: 按完成顺序的结果（已填写输出信息）
+        """
+        if source_folder is None and isinstance(source, str):
+            source_folder = source
+        output = BatchOutput(target_folder, source_folder or '', self.options, name_suffix)
+        try:
+            yield from self.iter_results(source, output)
+        finally:
+            output.close()
@@ -0,0 +1,209 @@
+import os
+import math
+import time
+import random
+import logging
+from typing import Callable, Dict, Any, List, Optional
+from .config import DEFAULT_SCAN_OPTIONS, get_estimate_config, load_config
+from .engine import BatchEngine, list_images
+
+logger = logging.getLogger(__name__)
+
+# 识别阶段的显示顺序
+STAGES = ('barcode', 'tesseract', 'tencent')
+
+def stratified_sample(paths: List[str], size: int, rng: random.Random) -> List[str]:
+    """
+    分层随机抽样：按文件类型和大小排序后等分为 size 层，每层随机取一张，
+    手机照片、扫描件等不同来源的图片按各自的比例进入样本
+    Args:
+        paths: 全部图片路径
+        size: 样本数
+        rng: 随机数生成器
+    Returns:
+        list: 打乱顺序的样本，提前结束时已完成的部分仍有代表性
+    """
+    if len(paths) <= size:
+        sample = list(paths)
+    else:
+        def sort_key(path):
+            try:
+                file_size = os.path.getsize(path)
+            except OSError:
+                file_size = 0
+            return os.path.splitext(path)[1].lower(), file_size
+
+        ordered = sorted(paths, key=sort_key)
+        total = len(ordered)
+        sample = [ordered[rng.randrange(i * total // size, (i + 1) * total // size)] for i in range(size)]
+    rng.shuffle(sample)
+    return sample
+
+class Estimate:
+    """样本的实测结果，以及按全部图片数推算的结果"""
+
+    __slots__ = ('total', 'sampled', 'hits', 'stages', 'rejected', 'errors', 'tencent_calls',
+                 'elapsed', 'startup', 'per_image')
+
+    def __init__(self, total: int):
+        """
+        Args:
+            total: 源文件夹中的全部图片数
+        """
+        self.total = total
+        self.sampled = 0
+        self.hits = 0
+        self.stages = {}
+        self.rejected = 0
+        self.errors = 0
+        self.tencent_calls = 0
+        self.elapsed = 0.0
+        # 启动耗时（引擎初始化、流水线填充）与稳定后每张图片的耗时分开推算
+        self.startup = 0.0
+        self.per_image = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.hits / self.sampled if self.sampled else 0.0
+
+    @property
+    def margin(self) -> float:
+        """识别率的95%置信区间半宽（有限总体校正）"""
+        if self.sampled < 2 or self.sampled >= self.total:
+            return 0.0
+        p = self.success_rate
+        correction = (self.total - self.sampled) / (self.total - 1)
+        return 1.96 * math.sqrt(p * (1 - p) / self.sampled * correction)
+
+    def stage_rate(self, stage: str) -> float:
+        return self.stages.get(stage, 0) / self.sampled if self.sampled else 0.0
+
+    @property
+    def projected_seconds(self) -> float:
+        return self.startup + self.per_image * self.total
+
+    @property
+    def projected_tencent_calls(self) -> int:
+        return round(self.tencent_calls / self.sampled * self.total) if self.sampled else 0
+
+    def describe(self) -> List[str]:
+        """预估报告，每项一行"""
+        if not self.sampled:
+            return [f"全部 {self.total} 张，样本中没有完成识别的图片，无法预估"]
+        lines = [
+            f"样本 {self.sampled} 张（全部 {self.total} 张），实测耗时 {self.elapsed:.1f} 秒",
+            f"预计识别率 {self.success_rate:.1%}" + (f"（±{self.margin:.1%}）" if self.margin else ''),
+            '各阶段命中 ' + '，'.join(f"{stage} {self.stage_rate(stage):.1%}" for stage in STAGES),
+            f"预计耗时 {_format_seconds(self.projected_seconds)}（每张 {self.per_image * 1000:.0f} 毫秒）",
+            f"预计腾讯云OCR调用 {self.projected_tencent_calls} 次"
+        ]
+        if self.rejected:
+            lines.append(f"预检拒绝 {self.rejected / self.sampled:.1%}")
+        if self.errors:
+            lines.append(f"读取失败 {self.errors} 张")
+        return lines
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} 秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} 分钟"
+    return f"{seconds / 3600:.1f} 小时"
+
+class BatchEstimator:
+    """
+    抽样预估：从源文件夹分层随机抽取样本，按实际的识别选项和执行器处理，
+    不移动文件、不写处理明细，推算整批的识别率、各阶段命中率、耗时和腾讯云OCR调用次数。
+    样本会真实调用腾讯云OCR（计入调用额度）
+    """
+
+    def __init__(self, source_folder: str, options: Dict[str, Any] = None, config: Dict[str, Any] = None,
+                 scanner=None):
+        """
+        Args:
+            source_folder: 待处理的源文件夹
+            options: 识别选项，为None时使用默认选项
+            config: 配置内容，为None时从配置文件读取
+            scanner: 可选的常驻扫描器，为None时创建
+        """
+        self.source_folder = source_folder
+        self.config = load_config() if config is None else config
+        self.estimate_config = get_estimate_config(self.config)
+        self.options = dict(DEFAULT_SCAN_OPTIONS)
+        self.options.update(options or {})
+        self.scanner = scanner
+
+    def run(self, sample_size: int = None, time_budget: float = None,
+            progress: Callable[[int, int], None] = None) -> Optional[Estimate]:
+        """
+        执行预估
+        Args:
+            sample_size: 样本数，为None时读取配置
+            time_budget: 最长耗时（秒），为None时读取配置
+            progress: 可选的进度回调 (已完成, 样本数)
+        Returns:
+            Estimate: 预估结果，源文件夹中没有图片时返回None
+        """
+        from .scanner import WaybillScanner
+
+        paths = list_images(self.source_folder)
+        if not paths:
+            logger.warning(f"源文件夹中没有图片: {self.source_folder}")
+            return None
+        sample_size = sample_size or self.estimate_config['sample_size']
+        if time_budget is None:
+            time_budget = self.estimate_config['time_budget']
+        rng = random.Random(self.estimate_config['seed'])
+        sample = stratified_sample(paths, sample_size, rng)
+        logger.info(f"开始抽样预估，样本 {len(sample)} 张，全部 {len(paths)} 张")
+
+        scanner = self.scanner or WaybillScanner(config=self.config)
+        scanner.start_batch()
+        engine = BatchEngine(scanner, self.options, config=self.config)
+        estimate = Estimate(len(paths))
+
+        start = time.perf_counter()
+        deadline = start + time_budget if time_budget else None
+
+        def source():
+            # 到时不再送入新的图片，已送入的图片处理完再结束
+            for path in sample:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    logger.info("抽样预估达到时间上限，按已完成的图片推算")
+                    return
+                yield path
+
+        first = last = None
+        for result in engine.iter_results(source()):
+            last = time.perf_counter()
+            if first is None:
+                first = last
+            estimate.sampled += 1
+            if result.rejection:
+                estimate.rejected += 1
+            elif result.error is not None:
+                estimate.errors += 1
+            if result.waybill:
+                estimate.hits += 1
+                stage = result.recognition.stage
+                estimate.stages[stage] = estimate.stages.get(stage, 0) + 1
+            if result.recognition and any(c.engine == 'tencent' for c in result.recognition.candidates):
+                estimate.tencent_calls += 1
+            if progress is not None:
+                progress(estimate.sampled, len(sample))
+
+        if first is None:
+            return estimate
+        estimate.elapsed = last - start
+        # 多进程执行器的调用发生在子进程中，本进程的统计为0，此时按候选中的腾讯云结果计数
+        tencent_stats = scanner.batch_stats().get('tencent') or {}
+        estimate.tencent_calls = max(estimate.tencent_calls, tencent_stats.get('calls', 0))
+        if estimate.sampled > 1:
+            estimate.per_image = (last - first) / (estimate.sampled - 1)
+            estimate.startup = max(0.0, first - start - estimate.per_image)
+        else:
+            estimate.per_image = estimate.elapsed
+
+        for line in estimate.describe():
+            logger.info(f"抽样预估: {line}")
+        return estimate
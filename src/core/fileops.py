@@ -0,0 +1,64 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+def move_exclusive(source: str, target: str) -> None:
+    """
+    移动文件，目标已存在时抛出 FileExistsError，不覆盖。
+    POSIX 的 os.rename 会直接替换已有文件（Windows 才报错），多台电脑写同一网络文件夹时会互相覆盖；
+    这里先用硬链接原子地占用目标名，不支持硬链接的文件系统改为独占创建占位文件后替换
+    Args:
+        source: 源文件
+        target: 目标路径
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        # 不支持硬链接（FAT、部分网络盘）或跨设备
+        reserve(target)
+        try:
+            os.replace(source, target)
+        except OSError:
+            _remove_quietly(target)
+            raise
+        return
+    try:
+        os.remove(source)
+    except OSError:
+        # 源文件删不掉时撤销链接，保持"移动"语义
+        _remove_quietly(target)
+        raise
+
+def move_numbered(source: str, target: str) -> str:
+    """
+    移动到 target，目标已被占用时依次尝试 -2、-3 … 后缀
+    Returns:
+        str: 实际的目标路径
+    """
+    folder, filename = os.path.split(target)
+    stem, ext = os.path.splitext(filename)
+    count = 1
+    while True:
+        try:
+            move_exclusive(source, target)
+            return target
+        except FileExistsError:
+            count += 1
+            target = numbered_path(folder, stem, ext, count)
+
+def reserve(target: str) -> None:
+    """独占创建空的占位文件，目标已存在时抛出 FileExistsError"""
+    os.close(os.open(target, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+
+def numbered_path(folder: str, stem: str, ext: str, count: int) -> str:
+    """第 count 个同名文件的路径：1 不加后缀，2 起为 -2、-3 …"""
+    return os.path.join(folder, f"{stem}{ext}" if count == 1 else f"{stem}-{count}{ext}")
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"删除文件失败 {path}: {str(e)}")
@@ -0,0 +1,134 @@
+import os
+import sys
+import logging
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def _shm_available() -> Optional[int]:
+    """/dev/shm 的可用字节数，非Linux或无法获取时返回None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        stat = os.statvfs('/dev/shm')
+    except OSError:
+        return None
+    return stat.f_bavail * stat.f_frsize
+
+class FrameHandle:
+    """共享内存中一帧图像的位置，可在进程间传递（只含名称和形状，不含像素）"""
+    __slots__ = ('name', 'slot', 'offset', 'shape', 'dtype')
+
+    def __init__(self, name: str, slot: int, offset: int, shape: tuple, dtype: str):
+        self.name = name
+        self.slot = slot
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return (self.name, self.slot, self.offset, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        self.name, self.slot, self.offset, self.shape, self.dtype = state
+
+class FramePool:
+    """
+    解码帧的共享内存池：一整块共享内存分为固定大小的槽，按环形复用。
+    解码方把图像写入空闲槽（一次复制），识别进程凭 FrameHandle 直接映射读取，
+    像素不经过序列化；识别结果返回后由解码方显式归还槽位。
+    """
+
+    def __init__(self, slots: int, slot_bytes: int):
+        """
+        Args:
+            slots: 槽数，即同时在途的帧数上限
+            slot_bytes: 每个槽的字节数，超过的帧不放入共享内存
+        """
+        self.slots = max(1, int(slots))
+        self.slot_bytes = int(slot_bytes)
+        # Linux 的共享内存在 /dev/shm（容器中常只有64MB），创建时不占空间，写满时进程会被 SIGBUS 终止
+        available = _shm_available()
+        if available is not None and self.slots * self.slot_bytes > available:
+            raise MemoryError(f"共享内存空间不足：需要 {self.slots * self.slot_bytes} 字节，可用 {available} 字节")
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._free = list(range(self.slots))
+        self._next = 0
+        self._condition = threading.Condition()
+        logger.debug("创建共享帧池 %s：%d 个槽，每槽 %.0fMB", self._shm.name, self.slots,
+                     self.slot_bytes / (1024 * 1024))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def fits(self, image: np.ndarray) -> bool:
+        """图像能否放入一个槽"""
+        return image.nbytes <= self.slot_bytes
+
+    def acquire(self, timeout: float = None) -> Optional[int]:
+        """
+        取得一个空闲槽，没有时等待归还
+        Args:
+            timeout: 最长等待秒数，为None时一直等待
+        Returns:
+            int: 槽号，超时返回None
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._free, timeout):
+                return None
+            # 按环形顺序取用，相邻的帧落在相邻的槽
+            slot = min(self._free, key=lambda s: (s - self._next) % self.slots)
+            self._free.remove(slot)
+            self._next = (slot + 1) % self.slots
+            return slot
+
+    def release(self, slot: int) -> None:
+        """归还槽位，之后该槽可以写入新的帧"""
+        with self._condition:
+            if slot not in self._free:
+                self._free.append(slot)
+                self._condition.notify()
+
+    def write(self, slot: int, image: np.ndarray) -> FrameHandle:
+        """
+        把图像写入槽
+        Args:
+            slot: acquire 得到的槽号
+            image: 解码后的图像
+        Returns:
+            FrameHandle: 供识别进程映射的句柄
+        """
+        if not self.fits(image):
+            raise ValueError(f"图像 {image.nbytes} 字节超过共享帧槽大小 {self.slot_bytes}")
+        offset = slot * self.slot_bytes
+        view = np.ndarray(image.shape, dtype=image.dtype, buffer=self._shm.buf, offset=offset)
+        view[...] = image
+        del view
+        return FrameHandle(self._shm.name, slot, offset, image.shape, image.dtype.str)
+
+    def close(self) -> None:
+        """释放共享内存"""
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except (OSError, BufferError) as e:
+            logger.warning(f"释放共享帧池失败: {str(e)}")
+
+# 识别进程中已映射的共享内存，每个帧池只映射一次
+_attached = {}
+
+def attach_frame(handle: FrameHandle) -> np.ndarray:
+    """
+    在识别进程中映射一帧图像，不复制像素；
+    返回的数组引用共享内存，识别结束后不得保留（槽位会被复用）
+    """
+    shm = _attached.get(handle.name)
+    if shm is None:
+        # 子进程与创建方共用资源跟踪器，映射不会导致共享内存被提前释放
+        shm = shared_memory.SharedMemory(name=handle.name)
+        _attached[handle.name] = shm
+    return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf, offset=handle.offset)
@@ -1,55 +1,150 @@
+import os
+import json
+import threading
 import cv2
 import numpy as np
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from PIL import Image
-from pyzbar.pyzbar import decode
-import os
-import json
-import sys
+from .barcode import BarcodeReader
+from .config import get_config_path, get_pipeline_config, get_tencent_config
+from .preprocess import deskew, upscale
+from .scoring import CandidateScorer, Recognition
 
 logger = logging.getLogger(__name__)
 
+# 解码比例对应的读取方式，JPEG 缩小解码时跳过高频系数，比解码后再缩放快
+DECODE_FLAGS = {
+    1.0: cv2.IMREAD_COLOR,
+    0.5: cv2.IMREAD_REDUCED_COLOR_2,
+    0.25: cv2.IMREAD_REDUCED_COLOR_4,
+    0.125: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# 进程内共享的腾讯云OCR管控器（按配置区分），守护进程扫描器池中的各扫描器共用批次预算和熔断状态
+_shared_tencent: Dict[str, Any] = {}
+_shared_tencent_lock = threading.Lock()
+
+def shared_tencent(tencent_config: Dict[str, Any]):
+    """
+    获取本进程内对应配置的腾讯云OCR管控器，首次调用时创建
+    Args:
+        tencent_config: 配置文件 tencent_ocr 段
+    Returns:
+        TencentGovernor: 管控器
+    """
+    from .ocr.tencent import TencentOCR
+    from .ocr.governor import TencentGovernor
+
+    key = json.dumps(tencent_config, sort_keys=True, default=str)
+    with _shared_tencent_lock:
+        if key not in _shared_tencent:
+            engine = TencentOCR(
+                tencent_config['secret_id'],
+                tencent_config['secret_key'],
+                timeout=tencent_config.get('timeout')
+            )
+            # 调用预算、延迟和熔断管控
+            usage_path = os.path.join(os.path.dirname(get_config_path()), 'tencent_usage.json')
+            _shared_tencent[key] = TencentGovernor.from_config(engine, tencent_config, usage_path)
+        return _shared_tencent[key]
+
 class ImageProcessor:
     """图像处理器"""
     
-    def __init__(self):
-        """初始化图像处理器"""
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        初始化图像处理器
+        Args:
+            config: 配置内容，为None时从配置文件读取
+        """
+        pipeline_config = get_pipeline_config(config)
+        decode_scale = float(pipeline_config['decode_scale'])
+        if decode_scale not in DECODE_FLAGS:
+            logger.warning(f"不支持的解码比例 {decode_scale}，使用原图")
+            decode_scale = 1.0
+        self.decode_scale = decode_scale
+        self.decode_flag = DECODE_FLAGS[decode_scale]
+        
+        # 条码引擎按配置顺序尝试
+        self.barcode = BarcodeReader.from_config(config)
+        
         from .ocr.tesseract import TesseractOCR
         self.tesseract = TesseractOCR()
+        # 常规档位使用的Tesseract配置，自动调优可减少尝试次数
+        passes = int(pipeline_config['tesseract_passes'] or 0)
+        self.tesseract_configs = self.tesseract.CONFIGS[:passes] if passes > 0 else self.tesseract.CONFIGS
         
         # 尝试初始化腾讯云OCR
         try:
-            from .ocr.tencent import TencentOCR
-            
-            # 获取配置文件路径
-            if getattr(sys, 'frozen', False):
-                app_dir = os.path.dirname(sys.executable)
-            else:
-                app_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            
-            config_path = os.path.join(app_dir, 'config.json')
-            
-            # 如果程序目录的配置文件不存在或无法访问，尝试用户目录
-            if not os.path.exists(config_path):
-                user_config_path = os.path.join(os.path.expanduser('~'), 'waybill_config.json')
-                if os.path.exists(user_config_path):
-                    config_path = user_config_path
-            
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    if config.get('tencent_ocr', {}).get('enabled'):
-                        self.tencent = TencentOCR(
-                            config['tencent_ocr']['secret_id'],
-                            config['tencent_ocr']['secret_key']
-                        )
-                        logger.info("腾讯云OCR初始化成功")
+            tencent_config = get_tencent_config(config)
+            if tencent_config.get('enabled'):
+                self.tencent = shared_tencent(tencent_config)
+                logger.info("腾讯云OCR初始化成功")
         except Exception as e:
             logger.warning(f"腾讯云OCR初始化失败: {str(e)}")
         
         logger.info("图像处理器初始化完成")
 
+    def get_decode_flag(self, options: Dict[str, Any] = None) -> int:
+        """
+        解码方式：识别选项中的 decode_scale（如增强档位的 1.0）优先于配置的解码比例
+        Args:
+            options: 识别选项
+        Returns:
+            int: cv2.imdecode 的读取方式
+        """
+        decode_scale = (options or {}).get('decode_scale')
+        if decode_scale is None:
+            return self.decode_flag
+        return DECODE_FLAGS.get(float(decode_scale), self.decode_flag)
+
+    def load_image(self, image_path: str, options: Dict[str, Any] = None) -> np.ndarray:
+        """
+        读取并解码图像
+        Args:
+            image_path: 图片路径
+            options: 可选的识别选项，决定解码比例
+        Returns:
+            np.ndarray: BGR格式的图像
+        """
+        # 使用正确的编码读取图像
+        image = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), self.get_decode_flag(options))
+        if image is None:
+            raise ValueError(f"无法读取图像: {image_path}")
+        return image
+
+    def decode_image(self, data: bytes, options: Dict[str, Any] = None) -> np.ndarray:
+        """
+        解码内存中的图片数据
+        Args:
+            data: 图片文件的原始字节
+            options: 可选的识别选项，决定解码比例
+        Returns:
+            np.ndarray: BGR格式的图像
+        """
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), self.get_decode_flag(options))
+        if image is None:
+            raise ValueError("无法解码图像数据")
+        return image
+
+    def start_batch(self) -> None:
+        """开始新批次，重置条码引擎统计和腾讯云OCR的批次调用计数"""
+        self.barcode.reset_stats()
+        if hasattr(self, 'tencent'):
+            self.tencent.start_batch()
+
+    def batch_stats(self) -> Dict[str, Any]:
+        """
+        本批次的引擎统计
+        Returns:
+            dict: 各引擎的调用统计，包括各条码引擎和腾讯云OCR
+        """
+        stats = {'barcode': self.barcode.stats()}
+        if hasattr(self, 'tencent'):
+            stats['tencent'] = self.tencent.stats()
+        return stats
+
     def process_image(self, image_path: str, options: Dict[str, Any]) -> Optional[str]:
         """
         处理图像
@@ -60,111 +155,181 @@ class ImageProcessor:
             str: 识别到的运单号，失败返回None
         """
         try:
-            logger.debug(f"开始处理图片: {image_path}")
-            
-            # 使用正确的编码读取图像
-            image = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
-            if image is None:
-                raise ValueError(f"无法读取图像: {image_path}")
-            
-            results = []
-            
-            # 条码识别
-            if options.get('scan_barcode') or options.get('scan_qrcode'):
-                try:
-                    codes = decode(image)
-                    for code in codes:
-                        text = code.data.decode('utf-8')
-                        results.append(text)
-                        logger.debug(f"条码识别结果: {text}")
-                except Exception as e:
-                    logger.error(f"条码识别失败: {str(e)}")
+            logger.debug("开始处理图片: %s", image_path)
+            image = self.load_image(image_path, options)
+        except Exception as e:
+            logger.error(f"处理图片失败: {str(e)}")
+            return None
+        
+        return self.recognize(image, options)
+
+    def recognize(self, image: np.ndarray, options: Dict[str, Any]) -> Optional[str]:
+        """
+        识别已解码图像中的运单号
+        Args:
+            image: BGR格式的图像
+            options: 处理选项
+        Returns:
+            str: 识别到的运单号，失败返回None
+        """
+        return self.recognize_detailed(image, options).waybill
+
+    def recognize_detailed(self, image: np.ndarray, options: Dict[str, Any]) -> Recognition:
+        """
+        识别已解码图像中的运单号，按代价从低到高逐级识别，
+        出现高置信度的合规候选即停止，不再调用更昂贵的阶段
+        Args:
+            image: BGR格式的图像
+            options: 处理选项
+        Returns:
+            Recognition: 识别结论（运单号、置信度、阶段、全部候选）
+        """
+        scorer = CandidateScorer(options)
+        candidates = []
+        
+        try:
+            if self._read_barcodes(image, options, scorer, candidates):
+                return self._conclude(scorer, candidates)
             
             # 文字识别
             if options.get('scan_text'):
                 try:
-                    # 转换为PIL图像
-                    pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-                    
-                    # 如果指定了识别区域，裁剪图片
-                    if options.get('region'):
-                        region = options['region']
-                        width, height = pil_image.size
-                        x1 = int(region['x1'] * width)
-                        y1 = int(region['y1'] * height)
-                        x2 = int(region['x2'] * width)
-                        y2 = int(region['y2'] * height)
-                        pil_image = pil_image.crop((x1, y1, x2, y2))
-                    
-                    # 先使用Tesseract OCR
-                    texts = self.tesseract.recognize(pil_image)
-                    results.extend(texts)
-                    logger.debug(f"Tesseract OCR识别结果: {texts}")
-                    
-                    # 如果Tesseract没有识别到结果，并且启用了腾讯云OCR，则使用腾讯云OCR
-                    waybill_number = self._filter_results(results, options)
-                    if not waybill_number and options.get('use_tencent') and hasattr(self, 'tencent'):
-                        try:
-                            texts = self.tencent.recognize(pil_image)
-                            logger.debug(f"腾讯云OCR识别结果: {texts}")
-                            results.extend(texts)
-                        except Exception as e:
-                            logger.error(f"腾讯云OCR识别失败: {str(e)}")
-                
+                    pil_image, ocr_image = self._ocr_images(image, options)
+                    self._recognize_text(pil_image, ocr_image, options, scorer, candidates)
                 except Exception as e:
                     logger.error(f"OCR识别失败: {str(e)}")
             
-            # 过滤结果
-            waybill_number = self._filter_results(results, options)
-            if waybill_number:
-                logger.info(f"成功识别运单号: {waybill_number}")
-                return waybill_number
-            else:
-                logger.warning("未能识别到有效运单号")
-                return None
+            return self._conclude(scorer, candidates)
             
         except Exception as e:
             logger.error(f"处理图片失败: {str(e)}")
-            return None
+            return Recognition(candidates=candidates)
 
-    def _filter_results(self, results: list, options: Dict[str, Any]) -> Optional[str]:
+    def recognize_batch(self, images: List[np.ndarray], options: Dict[str, Any]) -> List[Recognition]:
         """
-        过滤识别结果
+        一次识别多张图片：条码逐张识别，未得出结果的图片把识别区域上下拼接，
+        只调用一次Tesseract，分回各图后仍不够确定的再逐张按常规流程识别
+        只在指定了识别区域时拼接（整图拼接的页面过大），否则逐张识别
         Args:
-            results: 识别结果列表
-            options: 过滤选项
+            images: BGR格式的图像列表
+            options: 处理选项
         Returns:
-            str: 符合条件的运单号，没有找到返回None
+            list: 与 images 对应的识别结论
         """
-        try:
-            min_length = int(options.get('min_length', 8))
-            max_length = int(options.get('max_length', 12))
-            prefix = options.get('prefix', '')
-            suffix = options.get('suffix', '')
-            
-            for result in results:
-                if not result:
-                    continue
-                    
-                # 清理结果
-                result = ''.join(c for c in result if c.isalnum())
-                
-                # 检查长度
-                if len(result) < min_length or len(result) > max_length:
-                    continue
-                
-                # 检查前缀
-                if prefix and not result.upper().startswith(prefix.upper()):
-                    continue
-                
-                # 检查后缀
-                if suffix and not result.upper().endswith(suffix.upper()):
+        if len(images) < 2 or not options.get('scan_text') or not options.get('region'):
+            return [self.recognize_detailed(image, options) for image in images]
+        
+        recognitions = [None] * len(images)
+        pending = []  # (序号, 评分器, 候选, 裁剪图, 识别用图)
+        for i, image in enumerate(images):
+            scorer = CandidateScorer(options)
+            candidates = []
+            try:
+                if self._read_barcodes(image, options, scorer, candidates):
+                    recognitions[i] = self._conclude(scorer, candidates)
                     continue
-                
-                return result
-                
-            return None
-            
+                pil_image, ocr_image = self._ocr_images(image, options)
+                pending.append((i, scorer, candidates, pil_image, ocr_image))
+            except Exception as e:
+                logger.error(f"处理图片失败: {str(e)}")
+                recognitions[i] = Recognition(candidates=candidates)
+        
+        if pending:
+            stacked = self.tesseract.recognize_stacked([item[4] for item in pending],
+                                                       extract=pending[0][1].rules.extract)
+            logger.debug("拼接识别 %d 张图片", len(pending))
+            for (i, scorer, candidates, pil_image, ocr_image), texts in zip(pending, stacked):
+                try:
+                    candidates.extend(texts)
+                    found = scorer.best(candidates)
+                    if found is None or not scorer.is_confident(found[1]):
+                        self._recognize_text(pil_image, ocr_image, options, scorer, candidates)
+                except Exception as e:
+                    logger.error(f"OCR识别失败: {str(e)}")
+                recognitions[i] = self._conclude(scorer, candidates)
+        return recognitions
+
+    def _read_barcodes(self, image: np.ndarray, options: Dict[str, Any], scorer: CandidateScorer,
+                       candidates: list) -> bool:
+        """
+        条码识别，只解码勾选的码制
+        Returns:
+            bool: 已得到合规结果，不必再做文字识别
+        """
+        if not (options.get('scan_barcode') or options.get('scan_qrcode')):
+            return False
+        try:
+            candidates.extend(self.barcode.read(image, options, accept=scorer.is_confident))
         except Exception as e:
-            logger.error(f"过滤结果失败: {str(e)}")
-            return None 
\ No newline at end of file
+            logger.error(f"条码识别失败: {str(e)}")
+        return scorer.best(candidates) is not None
+
+    def _ocr_images(self, image: np.ndarray, options: Dict[str, Any]) -> Tuple[Image.Image, Image.Image]:
+        """
+        文字识别前的准备
+        Returns:
+            (裁剪后的图像, Tesseract使用的图像)
+        """
+        # 增强档位：先校正倾斜
+        if options.get('deskew'):
+            image = deskew(image)
+        
+        # 转换为PIL图像
+        pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        
+        # 如果指定了识别区域，裁剪图片
+        if options.get('region'):
+            region = options['region']
+            width, height = pil_image.size
+            x1 = int(region['x1'] * width)
+            y1 = int(region['y1'] * height)
+            x2 = int(region['x2'] * width)
+            y2 = int(region['y2'] * height)
+            pil_image = pil_image.crop((x1, y1, x2, y2))
+        
+        # 增强档位：放大后识别小字
+        ocr_image = pil_image
+        if options.get('ocr_scale', 1) > 1:
+            ocr_image = upscale(pil_image, options['ocr_scale'], options.get('ocr_max_side', 4000))
+        return pil_image, ocr_image
+
+    def _recognize_text(self, pil_image: Image.Image, ocr_image: Image.Image, options: Dict[str, Any],
+                        scorer: CandidateScorer, candidates: list) -> None:
+        """Tesseract逐张识别，结果置信度不足时升级到腾讯云OCR，候选追加到 candidates"""
+        # 增强档位尝试全部页面分割模式
+        configs = self.tesseract.ALL_CONFIGS if options.get('all_psm') else self.tesseract_configs
+        
+        # 先使用Tesseract OCR，某轮出现高置信度结果即跳过后续配置
+        texts = self.tesseract.recognize_candidates(ocr_image, accept=scorer.is_confident, configs=configs,
+                                                    extract=scorer.rules.extract)
+        del ocr_image
+        candidates.extend(texts)
+        logger.debug("Tesseract OCR识别结果: %s", texts)
+        
+        # Tesseract的结果置信度不足时，才升级到腾讯云OCR
+        found = scorer.best(candidates)
+        confident = found is not None and scorer.is_confident(found[1])
+        if not confident and options.get('use_tencent') and hasattr(self, 'tencent'):
+            try:
+                texts = self.tencent.recognize_candidates(pil_image, accept=scorer.is_confident,
+                                                        extract=scorer.rules.extract)
+                logger.debug("腾讯云OCR识别结果: %s", texts)
+                candidates.extend(texts)
+            except Exception as e:
+                logger.error(f"腾讯云OCR识别失败: {str(e)}")
+
+    def _conclude(self, scorer: CandidateScorer, candidates: list) -> Recognition:
+        """
+        挑选最终结果
+        Args:
+            scorer: 候选评分器
+            candidates: 全部候选
+        Returns:
+            Recognition: 识别结论
+        """
+        recognition = scorer.conclude(candidates)
+        if recognition.waybill:
+            logger.debug("成功识别运单号: %s（%s，置信度 %.2f）", recognition.waybill, recognition.stage, recognition.confidence)
+        else:
+            logger.debug("未能识别到有效运单号")
+        return recognition
@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime
+from typing import Dict, Any
+from .config import get_config_path, get_logging_config
+
+# 每张图片一条的结构化处理记录
+image_logger = logging.getLogger('waybill.image')
+
+# LogRecord 自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行JSON，extra 传入的字段原样写入"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    只把日志记录放入队列，消息的格式化、序列化和写文件都在监听线程中完成；
+    标准 QueueHandler 会在调用线程中先格式化消息（为了跨进程传递），这里同进程使用不需要
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging(config: Dict[str, Any] = None, console: bool = False) -> None:
+    """
+    配置异步日志：各线程只把记录放入队列，由后台线程写入滚动日志文件
+    Args:
+        config: 配置内容，为None时从配置文件读取 logging 段
+        console: 是否同时输出到控制台（命令行、守护进程模式）
+    """
+    global _listener
+
+    logging_config = get_logging_config(config)
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(logging_config['level']).upper(), logging.INFO))
+
+    if _listener is not None:
+        return
+
+    handlers = []
+    log_path = logging_config['file']
+    if not os.path.isabs(log_path):
+        log_path = os.path.join(os.path.dirname(get_config_path()), log_path)
+    try:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path,
+            maxBytes=logging_config['max_bytes'],
+            backupCount=logging_config['backup_count'],
+            encoding='utf-8'
+        )
+        if logging_config['format'] == 'json':
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s'))
+        handlers.append(file_handler)
+    except Exception as e:
+        print(f"无法创建日志文件 {log_path}: {str(e)}", file=sys.stderr)
+
+    if console and sys.stderr is not None:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.WARNING)
+        console_handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        handlers.append(console_handler)
+
+    if not handlers:
+        return
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(_LazyQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging() -> None:
+    """停止后台日志线程，写出队列中剩余的记录"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,209 @@
+import os
+import csv
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from .config import get_manifest_config
+from .waybill_index import edit_distance
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_FILENAME = '清单对账.csv'
+
+# 对账状态
+RECEIVED = '已收到'
+MISSING = '缺失'
+UNEXPECTED = '清单外'
+
+# 清单CSV中运单号列的常见列名，都没有时取第一列
+_WAYBILL_COLUMNS = ('运单号', '单号', '运单编号', 'waybill', 'waybill_no', 'tracking_no')
+
+# 识别中容易混淆的字符，比较时视为相同
+_CONFUSABLE = str.maketrans({'O': '0', 'Q': '0', 'D': '0', 'I': '1', 'L': '1', 'S': '5', 'B': '8', 'Z': '2'})
+
+def confusion_key(text: str) -> str:
+    """把易混淆字符归一后的比较键（O/0、I/1、S/5 等视为相同）"""
+    return text.upper().translate(_CONFUSABLE)
+
+def _deletions(key: str, max_distance: int) -> set:
+    """删除不超过 max_distance 个字符得到的全部字符串（含原串）"""
+    found = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        frontier = {text[:i] + text[i + 1:] for text in frontier for i in range(len(text))}
+        found |= frontier
+    return found
+
+class Manifest:
+    """
+    预期运单清单（如WMS导出的当日运单）：精确匹配用哈希集合，
+    易混淆字符归一后再查一次，仍未命中时查找编辑距离内唯一的运单号。
+    编辑距离索引按"删除邻域"建立：距离不超过k的两个字符串，各删除至多k个字符后必有相同的结果，
+    查找时只需查询文本的删除邻域，再逐个核对距离，耗时与清单大小无关
+    """
+
+    def __init__(self, waybills: List[str], max_distance: int = 1, min_fuzzy_length: int = 6):
+        """
+        Args:
+            waybills: 预期的运单号
+            max_distance: 近似匹配允许的编辑距离（易混淆字符不计）
+            min_fuzzy_length: 短于此长度的文本不做近似匹配，避免零散单词误配
+        """
+        self.max_distance = max_distance
+        self.min_fuzzy_length = min_fuzzy_length
+        # 保持清单顺序，对账报告按清单顺序列出
+        self.waybills = list(dict.fromkeys(w.upper() for w in waybills if w))
+        self._exact = set(self.waybills)
+        self._by_key = {}
+        for waybill in self.waybills:
+            self._by_key.setdefault(confusion_key(waybill), []).append(waybill)
+        # 删除邻域 -> 比较键
+        self._neighbors = {}
+        if max_distance > 0:
+            for key in self._by_key:
+                for deletion in _deletions(key, max_distance):
+                    self._neighbors.setdefault(deletion, []).append(key)
+
+    def __len__(self) -> int:
+        return len(self.waybills)
+
+    def __contains__(self, waybill: str) -> bool:
+        return waybill.upper() in self._exact
+
+    @classmethod
+    def load(cls, path: str, config: Dict[str, Any] = None) -> 'Manifest':
+        """
+        读取清单文件：CSV取运单号列（列名见 _WAYBILL_COLUMNS，没有时取第一列），
+        文本文件每行一个运单号
+        Args:
+            path: 清单文件路径
+            config: 配置内容，为None时从配置文件读取
+        Returns:
+            Manifest: 清单
+        """
+        manifest_config = get_manifest_config(config)
+        waybills = []
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            if path.lower().endswith('.csv'):
+                rows = csv.reader(f)
+                header = next(rows, [])
+                names = [name.strip().lower() for name in header]
+                column = manifest_config['column'].lower()
+                wanted = [column] if column else [name.lower() for name in _WAYBILL_COLUMNS]
+                index = next((names.index(name) for name in wanted if name in names), None)
+                if index is None:
+                    # 没有表头时第一行也是运单号
+                    index = 0
+                    rows = [header] + list(rows)
+                waybills = [row[index] for row in rows if len(row) > index]
+            else:
+                waybills = [line.split()[0] for line in f if line.split()]
+
+        waybills = [''.join(c for c in w if c.isalnum()) for w in waybills]
+        manifest = cls(waybills, manifest_config['max_distance'], manifest_config['min_fuzzy_length'])
+        logger.info(f"读取运单清单 {path}：{len(manifest)} 个运单号")
+        return manifest
+
+    def resolve(self, text: str) -> Optional[Tuple[str, int]]:
+        """
+        在清单中查找候选文本对应的运单号
+        Args:
+            text: 只含字母数字的候选文本
+        Returns:
+            (清单中的运单号, 编辑距离)，没有或有多个近似运单号时返回None
+        """
+        if not text:
+            return None
+        upper = text.upper()
+        if upper in self._exact:
+            return upper, 0
+
+        key = confusion_key(upper)
+        waybills = self._by_key.get(key)
+        if waybills is not None:
+            return (waybills[0], 0) if len(waybills) == 1 else None
+
+        if self.max_distance <= 0 or len(upper) < self.min_fuzzy_length:
+            return None
+        candidates = {candidate for deletion in _deletions(key, self.max_distance)
+                      for candidate in self._neighbors.get(deletion, ())}
+        found = sorted(
+            (distance, candidate) for candidate in candidates
+            for distance in [edit_distance(key, candidate, self.max_distance)]
+            if distance <= self.max_distance
+        )
+        if not found:
+            return None
+        # 最近的只能有一个，且没有相同距离的其他运单号
+        distance, nearest = found[0]
+        if len(found) > 1 and found[1][0] == distance:
+            return None
+        waybills = self._by_key[nearest]
+        return (waybills[0], distance) if len(waybills) == 1 else None
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def get_manifest(path: str) -> Optional[Manifest]:
+    """
+    读取清单，同一文件未修改时复用（每张图片的评分器都会调用）
+    Returns:
+        Manifest: 清单，读取失败时返回None
+    """
+    path = os.path.abspath(path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        logger.error(f"运单清单不存在 {path}: {str(e)}")
+        return None
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            manifest = Manifest.load(path)
+        except Exception as e:
+            logger.error(f"读取运单清单失败 {path}: {str(e)}")
+            manifest = None
+        _cache[path] = (mtime, manifest)
+        return manifest
+
+def reconciliation_path(target_folder: str, name_suffix: str = '') -> str:
+    """目标文件夹中对账报告的路径，后缀与处理明细一致"""
+    name, ext = os.path.splitext(RECONCILE_FILENAME)
+    return os.path.join(target_folder, f"{name}{name_suffix}{ext}")
+
+def write_reconciliation(path: str, manifest: Manifest, received: Dict[str, List[str]],
+                         index=None) -> Dict[str, int]:
+    """
+    写入清单对账报告：清单中每个运单号是否已收到回单，以及清单外的回单
+    Args:
+        path: 报告文件路径
+        manifest: 运单清单
+        received: 本批次收到的回单，运单号（大写）-> 文件路径列表
+        index: 可选的回单索引（WaybillIndex），此前批次收到的回单也计为已收到
+    Returns:
+        dict: 各状态的数量
+    """
+    counts = {RECEIVED: 0, MISSING: 0, UNEXPECTED: 0}
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['waybill', 'status', 'files'])
+        for waybill in manifest.waybills:
+            files = list(received.get(waybill, []))
+            if not files and index is not None:
+                try:
+                    files = [row['path'] for row in index.lookup(waybill) if os.path.exists(row['path'])]
+                except Exception as e:
+                    logger.error(f"查询回单索引失败 {waybill}: {str(e)}")
+            status = RECEIVED if files else MISSING
+            counts[status] += 1
+            writer.writerow([waybill, status, ';'.join(files)])
+        for waybill, files in received.items():
+            if waybill not in manifest:
+                counts[UNEXPECTED] += 1
+                writer.writerow([waybill, UNEXPECTED, ';'.join(files)])
+
+    logger.info(f"清单对账已保存到：{path}")
+    return counts
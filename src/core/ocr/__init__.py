@@ -1,8 +1,43 @@
 from abc import ABC, abstractmethod
 
+class Candidate:
+    """带置信度和位置的识别候选"""
+    __slots__ = ('text', 'confidence', 'box', 'engine')
+
+    def __init__(self, text, confidence=0.0, box=None, engine=''):
+        """
+        Args:
+            text: 识别到的文本
+            confidence: 置信度，0~1
+            box: 文本框 (x, y, w, h)，未知时为None
+            engine: 产生该候选的引擎名称
+        """
+        self.text = text
+        self.confidence = confidence
+        self.box = box
+        self.engine = engine
+
+    def to_dict(self):
+        """转换为可序列化的字典"""
+        return {
+            'text': self.text,
+            'confidence': round(self.confidence, 4),
+            'box': list(self.box) if self.box else None,
+            'engine': self.engine
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict 的结果还原"""
+        box = data.get('box')
+        return cls(data['text'], data.get('confidence', 0.0), tuple(box) if box else None, data.get('engine', ''))
+
+    def __repr__(self):
+        return f"Candidate({self.text!r}, {self.confidence:.2f}, {self.engine})"
+
 class OCREngine(ABC):
     """OCR引擎基类"""
-    
+
     @abstractmethod
     def recognize(self, image):
         """
@@ -12,4 +47,17 @@ class OCREngine(ABC):
         Returns:
             list: 识别到的文本列表
         """
-        pass 
\ No newline at end of file
+        pass
+
+    def recognize_candidates(self, image, accept=None, extract=None):
+        """
+        识别图像中的文字并给出置信度
+        Args:
+            image: OpenCV/PIL格式的图像
+            accept: 可选的判定函数，引擎有多轮识别时，某轮出现满足条件的候选即可提前结束
+            extract: 可选的提取函数，从整行文字中取出运单号（RuleSet.extract）
+        Returns:
+            list: Candidate列表
+        """
+        # 不提供置信度的引擎，置信度记为0
+        return [Candidate(text, 0.0, None, type(self).__name__) for text in self.recognize(image)]
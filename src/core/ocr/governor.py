@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Any, Iterator, List, Optional
+from . import OCREngine
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# 熔断器状态
+CLOSED = 'closed'        # 正常调用
+OPEN = 'open'            # 熔断中，不调用
+HALF_OPEN = 'half_open'  # 冷却结束，放行一次探测调用
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """跨进程的排他文件锁（锁文件为 path + '.lock'），阻塞到获得为止"""
+    with open(path + '.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            # LK_LOCK 每秒重试一次，10 次仍未获得时抛出 OSError
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class DailyUsage:
+    """
+    按自然日统计的调用次数，持久化到文件，同一文件在进程内共享计数；
+    多个进程（多进程执行器、守护进程和界面同时运行）在文件锁内重新读取后再累加，不会互相覆盖
+    """
+
+    _instances: Dict[str, 'DailyUsage'] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, path: str) -> 'DailyUsage':
+        """获取指定文件对应的计数器"""
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._counts = self._read()
+
+    def _read(self) -> Dict[str, int]:
+        """读取文件中的计数，读取失败时沿用内存中的计数"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取腾讯云调用统计失败: {str(e)}")
+        return dict(self._counts)
+
+    def count(self) -> int:
+        """今日已调用次数（含其他进程的调用）"""
+        with self._lock:
+            self._counts = self._read()
+            return self._counts.get(date.today().isoformat(), 0)
+
+    def try_increment(self, limit: int = 0) -> bool:
+        """
+        未达到上限时记录一次调用，检查与累加在同一把文件锁内完成，只保留今日的计数
+        Args:
+            limit: 每日上限，0 表示不限制
+        Returns:
+            bool: 是否已记录（未达到上限）
+        """
+        today = date.today().isoformat()
+        with self._lock:
+            try:
+                with _file_lock(self.path):
+                    self._counts = self._read()
+                    count = self._counts.get(today, 0)
+                    if limit and count >= limit:
+                        return False
+                    self._counts = {today: count + 1}
+                    # 先写临时文件再替换，不加锁读取的 count() 不会读到写了一半的文件
+                    temp_path = self.path + '.tmp'
+                    with open(temp_path, 'w', encoding='utf-8') as f:
+                        json.dump(self._counts, f)
+                    os.replace(temp_path, self.path)
+            except Exception as e:
+                logger.warning(f"保存腾讯云调用统计失败: {str(e)}")
+                count = self._counts.get(today, 0)
+                if limit and count >= limit:
+                    return False
+                self._counts = {today: count + 1}
+            return True
+
+class TencentGovernor(OCREngine):
+    """
+    腾讯云OCR调用管控
+    限制每批次和每日调用次数，跟踪延迟是否超出SLO，连续出错或超时后熔断，
+    冷却期过后放行一次探测调用；可按价格从低到高逐级调用识别接口。
+    """
+
+    def __init__(self, engine, tiers: List[str] = None, batch_budget: int = 0,
+                 daily_budget: int = 0, usage_path: str = None, latency_slo_ms: int = 3000,
+                 failure_threshold: int = 3, cooldown_seconds: int = 60, window_size: int = 50):
+        """
+        Args:
+            engine: TencentOCR实例
+            tiers: 依次尝试的识别接口，默认只用 GeneralAccurateOCR
+            batch_budget: 每批次调用上限，0 表示不限制
+            daily_budget: 每日调用上限，0 表示不限制
+            usage_path: 每日调用计数文件
+            latency_slo_ms: 延迟目标，超过视为慢调用，计入熔断
+            failure_threshold: 连续失败（出错或慢调用）多少次后熔断
+            cooldown_seconds: 熔断后多久放行探测调用
+            window_size: 延迟统计窗口大小
+        """
+        self.engine = engine
+        self.tiers = list(tiers or ['GeneralAccurateOCR'])
+        self.batch_budget = int(batch_budget)
+        self.daily_budget = int(daily_budget)
+        self.daily_usage = DailyUsage.for_path(usage_path) if usage_path else None
+        self.latency_slo = latency_slo_ms / 1000
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._probing = False
+        self._consecutive_failures = 0
+        self._disabled_reason: Optional[str] = None
+        self.start_batch()
+
+    @classmethod
+    def from_config(cls, engine, tencent_config: Dict[str, Any], usage_path: str = None) -> 'TencentGovernor':
+        """根据配置文件 tencent_ocr 段创建"""
+        return cls(
+            engine,
+            tiers=tencent_config.get('tiers'),
+            batch_budget=tencent_config.get('batch_budget', 0),
+            daily_budget=tencent_config.get('daily_budget', 0),
+            usage_path=usage_path,
+            latency_slo_ms=tencent_config.get('latency_slo_ms', 3000),
+            failure_threshold=tencent_config.get('failure_threshold', 3),
+            cooldown_seconds=tencent_config.get('cooldown_seconds', 60)
+        )
+
+    def start_batch(self) -> None:
+        """开始新批次：重置批次计数，解除上一批次因鉴权失败导致的停用"""
+        with self._lock:
+            self.batch_calls = 0
+            self.batch_failures = 0
+            self.batch_skipped = 0
+            self._disabled_reason = None
+
+    def recognize(self, image):
+        """识别图像文字"""
+        return [candidate.text for candidate in self.recognize_candidates(image)]
+
+    def recognize_candidates(self, image, accept=None, extract=None):
+        """
+        按接口层级依次调用，出现满足条件的候选即停止
+        Args:
+            image: PIL.Image 或 numpy.ndarray 格式的图像
+            accept: 可选的判定函数
+            extract: 可选的提取函数，从整行文字中取出运单号
+        Returns:
+            list: Candidate列表，被管控拦截时为空
+        """
+        candidates = []
+        for api in self.tiers:
+            if not self._allow_call():
+                break
+
+            start = time.perf_counter()
+            try:
+                tier_candidates = self.engine.request(image, api, extract)
+            except Exception as e:
+                self._record_failure(e)
+                break
+
+            self._record_success(time.perf_counter() - start)
+            candidates.extend(tier_candidates)
+
+            if accept is not None and any(accept(c) for c in tier_candidates):
+                break
+        return candidates
+
+    def _allow_call(self) -> bool:
+        """
+        检查预算和熔断状态，允许时预占一次调用。
+        熔断和批次上限在内存锁内判定；每日上限的检查与计数需要文件锁，在释放内存锁之后进行，
+        文件锁等待（如网络盘）不会阻塞其他线程的熔断判定，超出每日上限时撤回预占
+        """
+        with self._lock:
+            reason = None
+            probing = False
+            if self._disabled_reason:
+                reason = self._disabled_reason
+            elif self.batch_budget and self.batch_calls >= self.batch_budget:
+                reason = "已达到本批次调用上限"
+            elif self._state == OPEN:
+                if time.monotonic() < self._open_until:
+                    reason = "熔断中"
+                else:
+                    self._state = HALF_OPEN
+            if reason is None and self._state == HALF_OPEN:
+                # 半开状态只放行一次探测调用
+                if self._probing:
+                    reason = "熔断探测中"
+                else:
+                    self._probing = probing = True
+
+            if reason is not None:
+                self.batch_skipped += 1
+                logger.debug("跳过腾讯云OCR调用: %s", reason)
+                return False
+            self.batch_calls += 1
+
+        if self.daily_usage and not self.daily_usage.try_increment(self.daily_budget):
+            with self._lock:
+                self.batch_calls -= 1
+                self.batch_skipped += 1
+                if probing:
+                    self._probing = False
+            logger.debug("跳过腾讯云OCR调用: 已达到今日调用上限")
+            return False
+        return True
+
+    def _record_success(self, latency: float) -> None:
+        """记录成功调用；超出延迟目标的调用按失败计入熔断"""
+        with self._lock:
+            self._latencies.append(latency)
+            if latency > self.latency_slo:
+                logger.warning("腾讯云OCR调用耗时 %.0fms，超出目标 %.0fms", latency * 1000, self.latency_slo * 1000)
+                self._trip_if_needed()
+            else:
+                self._consecutive_failures = 0
+                self._probing = False
+                if self._state != CLOSED:
+                    logger.info("腾讯云OCR恢复正常，关闭熔断")
+                self._state = CLOSED
+
+    def _record_failure(self, error: Exception) -> None:
+        """记录失败调用；鉴权失败直接停用到本批次结束"""
+        code = str(getattr(error, 'code', '') or '')
+        with self._lock:
+            self.batch_failures += 1
+            if code.startswith('AuthFailure'):
+                self._probing = False
+                self._disabled_reason = f"鉴权失败（{code}）"
+                logger.error(f"腾讯云OCR鉴权失败，本批次停止调用: {str(error)}")
+                return
+            logger.error(f"腾讯云OCR识别失败: {str(error)}")
+            self._trip_if_needed()
+
+    def _trip_if_needed(self) -> None:
+        """累计连续失败，达到阈值或探测失败时打开熔断（需持有锁）"""
+        self._consecutive_failures += 1
+        if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._state = OPEN
+            self._open_until = time.monotonic() + self.cooldown_seconds
+            self._probing = False
+            logger.warning(f"腾讯云OCR连续失败 {self._consecutive_failures} 次，熔断 {self.cooldown_seconds} 秒")
+
+    def stats(self) -> Dict[str, Any]:
+        """本批次调用统计"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+            return {
+                'state': self._state,
+                'calls': self.batch_calls,
+                'failures': self.batch_failures,
+                'skipped': self.batch_skipped,
+                'daily_calls': self.daily_usage.count() if self.daily_usage else None,
+                'p95_latency_ms': round(p95 * 1000, 1)
+            }
@@ -6,7 +6,7 @@ from tencentcloud.common.profile.client_profile import ClientProfile
 from tencentcloud.common.profile.http_profile import HttpProfile
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
 from tencentcloud.ocr.v20181119 import ocr_client, models
-from . import OCREngine
+from . import OCREngine, Candidate
 import cv2
 import base64
 from PIL import Image
@@ -16,18 +16,24 @@ logger = logging.getLogger(__name__)
 class TencentOCR(OCREngine):
     """腾讯云OCR引擎"""
     
-    def __init__(self, secret_id, secret_key, region="ap-guangzhou"):
+    # 支持的识别接口，按价格从低到高排列
+    APIS = ('GeneralFastOCR', 'GeneralBasicOCR', 'GeneralAccurateOCR')
+    
+    def __init__(self, secret_id, secret_key, region="ap-guangzhou", timeout=None):
         """
         初始化腾讯云OCR
         Args:
             secret_id: 腾讯云API密钥ID
             secret_key: 腾讯云API密钥Key
             region: 地域信息
+            timeout: 请求超时（秒），为None时使用SDK默认值
         """
         try:
             cred = credential.Credential(secret_id, secret_key)
             http_profile = HttpProfile()
             http_profile.endpoint = "ocr.tencentcloudapi.com"
+            if timeout:
+                http_profile.reqTimeout = int(timeout)
             
             client_profile = ClientProfile()
             client_profile.httpProfile = http_profile
@@ -47,57 +53,99 @@ class TencentOCR(OCREngine):
         Returns:
             list: 识别到的文本列表
         """
+        return [candidate.text for candidate in self.recognize_candidates(image)]
+
+    def recognize_candidates(self, image, accept=None, api='GeneralAccurateOCR', extract=None):
+        """
+        使用腾讯云OCR识别图像文字，返回带置信度和位置的候选
+        Args:
+            image: PIL.Image 或 numpy.ndarray 格式的图像
+            accept: 未使用，腾讯云只调用一次
+            api: 使用的识别接口
+            extract: 可选的提取函数，从整行文字中取出运单号（RuleSet.extract）
+        Returns:
+            list: Candidate列表，提取到的运单号排在最前面
+        """
         try:
-            # 将PIL Image转换为OpenCV格式
-            if isinstance(image, Image.Image):
-                # 转换为RGB模式（如果不是的话）
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                # 转换为numpy数组
-                image = np.array(image)
-                # 转换颜色通道顺序从RGB到BGR
-                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            
-            # 确保图像是numpy数组格式
-            if not isinstance(image, np.ndarray):
-                raise ValueError("不支持的图像格式")
-            
-            # 将图像编码为base64
-            _, buffer = cv2.imencode('.jpg', image)
-            img_base64 = base64.b64encode(buffer).decode()
-            
-            # 创建请求
-            req = models.GeneralAccurateOCRRequest()
-            req.ImageBase64 = img_base64
-            
-            # 发送请求
-            resp = self.client.GeneralAccurateOCR(req)
-            
-            # 解析结果
-            results = []
-            waybill_number = None
-            
-            for text_detection in resp.TextDetections:
-                text = text_detection.DetectedText
-                results.append(text)
-                
-                # 提取运单号
-                if 'NO:' in text or '编号:' in text:
-                    # 提取YS开头的数字
-                    import re
-                    match = re.search(r'YS\d+', text)
-                    if match:
-                        waybill_number = match.group()
-            
-            # 如果找到运单号，将其放在结果列表的最前面
-            if waybill_number:
-                results.insert(0, waybill_number)
-            
-            return results
-            
+            return self.request(image, api, extract)
         except TencentCloudSDKException as e:
             logger.error(f"腾讯云OCR识别失败: {str(e)}")
             return []
         except Exception as e:
             logger.error(f"OCR处理失败: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+    def request(self, image, api='GeneralAccurateOCR', extract=None):
+        """
+        调用一次腾讯云识别接口，失败时抛出异常（供调用方统计错误）
+        Args:
+            image: PIL.Image 或 numpy.ndarray 格式的图像
+            api: 识别接口，GeneralFastOCR / GeneralBasicOCR / GeneralAccurateOCR
+            extract: 可选的提取函数，从整行文字中取出运单号
+        Returns:
+            list: Candidate列表，提取到的运单号排在最前面
+        """
+        if api not in self.APIS:
+            raise ValueError(f"不支持的腾讯云OCR接口: {api}")
+        
+        # 将PIL Image转换为OpenCV格式
+        if isinstance(image, Image.Image):
+            # 转换为RGB模式（如果不是的话）
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            # 转换为numpy数组
+            image = np.array(image)
+            # 转换颜色通道顺序从RGB到BGR
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        
+        # 确保图像是numpy数组格式
+        if not isinstance(image, np.ndarray):
+            raise ValueError("不支持的图像格式")
+        
+        # 将图像编码为base64
+        _, buffer = cv2.imencode('.jpg', image)
+        img_base64 = base64.b64encode(buffer).decode()
+        
+        # 创建请求
+        req = getattr(models, f"{api}Request")()
+        req.ImageBase64 = img_base64
+        
+        # 发送请求
+        resp = getattr(self.client, api)(req)
+        
+        # 解析结果
+        results = []
+        waybill_candidate = None
+        
+        for text_detection in resp.TextDetections:
+            text = text_detection.DetectedText
+            confidence = (text_detection.Confidence or 0) / 100
+            box = self._detection_box(text_detection)
+            results.append(Candidate(text, confidence, box, 'tencent'))
+            
+            # 提取运单号：整行中符合某条规则前缀的部分，取第一处
+            if extract is not None and waybill_candidate is None:
+                waybill = extract(text)
+                if waybill:
+                    waybill_candidate = Candidate(waybill, confidence, box, 'tencent')
+        
+        # 如果找到运单号，将其放在结果列表的最前面
+        if waybill_candidate:
+            results.insert(0, waybill_candidate)
+        
+        return results
+
+    @staticmethod
+    def _detection_box(text_detection):
+        """从 ItemPolygon 或 Polygon 中取出文本框 (x, y, w, h)"""
+        item = getattr(text_detection, 'ItemPolygon', None)
+        if item is not None and item.Width:
+            return (item.X, item.Y, item.Width, item.Height)
+        
+        polygon = getattr(text_detection, 'Polygon', None)
+        if polygon:
+            xs = [coord.X for coord in polygon]
+            ys = [coord.Y for coord in polygon]
+            return (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+        
+        return None
@@ -3,13 +3,58 @@ import sys
 import logging
 import pytesseract
 from PIL import Image
-from . import OCREngine
+from . import OCREngine, Candidate
 
 logger = logging.getLogger(__name__)
 
 class TesseractOCR(OCREngine):
     """Tesseract OCR引擎"""
     
+    # OCR配置列表，按顺序执行，满足提前结束条件后跳过后续配置
+    CONFIGS = [
+        {
+            'lang': 'chi_sim+eng',  # 中文简体+英文
+            'config': '--oem 3 --psm 3'  # 自动页面分割
+        },
+        {
+            'lang': 'chi_sim+eng',
+            'config': '--oem 3 --psm 6'  # 假设统一的文本块
+        },
+        {
+            'lang': 'eng',  # 仅英文模式可能对数字字母组合更准确
+            'config': '--oem 3 --psm 11'  # 稀疏文本
+        }
+    ]
+    
+    # 增强档位使用：在常规配置之后再尝试其余页面分割模式
+    ALL_CONFIGS = CONFIGS + [
+        {
+            'lang': 'chi_sim+eng',
+            'config': '--oem 3 --psm 4'  # 单列可变大小文本
+        },
+        {
+            'lang': 'eng',
+            'config': '--oem 3 --psm 6'
+        },
+        {
+            'lang': 'chi_sim+eng',
+            'config': '--oem 3 --psm 11'
+        },
+        {
+            'lang': 'eng',
+            'config': '--oem 3 --psm 12'  # 稀疏文本并检测方向
+        }
+    ]
+
+    # 拼接识别使用的配置：单列可变大小文本，适合上下排列的多段文字
+    BATCH_CONFIG = {
+        'lang': 'chi_sim+eng',
+        'config': '--oem 3 --psm 4'
+    }
+    # 拼接页中图与图之间的留白（像素）和拼接页的最大高度
+    BATCH_GAP = 48
+    BATCH_MAX_HEIGHT = 16000
+
     def __init__(self):
         """初始化Tesseract OCR"""
         try:
@@ -42,73 +87,197 @@ class TesseractOCR(OCREngine):
         Returns:
             list: 识别到的文本列表
         """
+        return [candidate.text for candidate in self.recognize_candidates(image)]
+
+    def recognize_candidates(self, image, accept=None, configs=None, extract=None):
+        """
+        使用Tesseract识别图像文字，返回带置信度和位置的候选
+        Args:
+            image: OpenCV/PIL格式的图像
+            accept: 可选的判定函数，某轮识别出现满足条件的候选时跳过后续配置
+            configs: 依次使用的识别配置，为None时使用 CONFIGS
+            extract: 可选的提取函数，从整行文字中取出运单号（RuleSet.extract）
+        Returns:
+            list: Candidate列表，运单号格式的候选排在最前面
+        """
         try:
             # 确保图像是PIL格式
             if not isinstance(image, Image.Image):
                 image = Image.fromarray(image)
             
-            # OCR配置列表
-            configs = [
-                {
-                    'lang': 'chi_sim+eng',  # 中文简体+英文
-                    'config': '--oem 3 --psm 3'  # 自动页面分割
-                },
-                {
-                    'lang': 'chi_sim+eng',
-                    'config': '--oem 3 --psm 6'  # 假设统一的文本块
-                },
-                {
-                    'lang': 'eng',  # 仅英文模式可能对数字字母组合更准确
-                    'config': '--oem 3 --psm 11'  # 稀疏文本
-                }
-            ]
-            
-            results = []
-            waybill_number = None
+            candidates = []
             
-            for config in configs:
+            for config in (configs or self.CONFIGS):
                 try:
-                    text = pytesseract.image_to_string(
+                    data = pytesseract.image_to_data(
                         image,
                         lang=config['lang'],
-                        config=config['config']
+                        config=config['config'],
+                        output_type=pytesseract.Output.DICT
                     )
-                    logger.debug(f"OCR配置 {config} 识别结果: {text}")
+                    pass_candidates = self._parse_data(data, extract)
+                    logger.debug("OCR配置 %s 识别到 %d 个候选", config['config'], len(pass_candidates))
+                    candidates.extend(pass_candidates)
                     
-                    # 分行处理
-                    for line in text.split('\n'):
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        # 清理特殊字符
-                        line = ''.join(c for c in line if c.isalnum() or c in ':-.')
-                        
-                        # 查找运单号
-                        if 'NO' in line.upper() or 'YS' in line.upper():
-                            import re
-                            match = re.search(r'YS\d{8}', line.upper())
-                            if match:
-                                waybill_number = match.group()
-                                results.insert(0, waybill_number)  # 将运单号放在最前面
-                                continue
-                        
-                        results.append(line)
+                    if accept is not None and any(accept(c) for c in pass_candidates):
+                        logger.debug("OCR配置 %s 已得到高置信度结果，跳过后续配置", config['config'])
+                        break
                         
                 except Exception as e:
-                    logger.warning(f"使用配置 {config} 识别失败: {str(e)}")
+                    logger.warning("使用配置 %s 识别失败: %s", config, e)
                     continue
             
-            # 去重并清理结果
-            cleaned_results = []
-            seen = set()
-            for result in results:
-                if result and result not in seen:
-                    seen.add(result)
-                    cleaned_results.append(result)
-            
-            return cleaned_results
+            return self._merge_candidates(candidates)
             
         except Exception as e:
             logger.error(f"Tesseract识别失败: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+    def recognize_stacked(self, images, config=None, extract=None):
+        """
+        把多张小图（识别区域裁剪）上下拼接成一页，只调用一次Tesseract，
+        再按每个词的纵坐标把结果分回各张图，分摊每次调用的启动开销
+        Args:
+            images: PIL格式的图像列表
+            config: 识别配置，为None时使用 BATCH_CONFIG
+            extract: 可选的提取函数，从整行文字中取出运单号
+        Returns:
+            list: 与 images 一一对应的 Candidate 列表，位置为各自图中的坐标
+        """
+        config = config or self.BATCH_CONFIG
+        results = [[] for _ in images]
+        for start, end in self._stack_groups(images):
+            group = images[start:end]
+            try:
+                page, offsets = self._stack(group)
+                data = pytesseract.image_to_data(
+                    page,
+                    lang=config['lang'],
+                    config=config['config'],
+                    output_type=pytesseract.Output.DICT
+                )
+            except Exception as e:
+                logger.warning("拼接识别 %d 张图片失败: %s", len(group), e)
+                continue
+            for i, part in enumerate(self._split_data(data, offsets, [image.height for image in group])):
+                results[start + i] = self._merge_candidates(self._parse_data(part, extract))
+        return results
+
+    def _stack_groups(self, images):
+        """按拼接页的高度上限分组，返回 (起, 止) 序号"""
+        groups = []
+        start = 0
+        height = 0
+        for i, image in enumerate(images):
+            height += image.height + self.BATCH_GAP
+            if i > start and height > self.BATCH_MAX_HEIGHT:
+                groups.append((start, i))
+                start = i
+                height = image.height + self.BATCH_GAP
+        if images:
+            groups.append((start, len(images)))
+        return groups
+
+    def _stack(self, images):
+        """
+        上下拼接，图与图之间留白分隔，避免两张图的文字被识别为同一行
+        Returns:
+            (拼接后的灰度图, 各张图在页中的纵向起点)
+        """
+        width = max(image.width for image in images)
+        height = sum(image.height for image in images) + self.BATCH_GAP * (len(images) + 1)
+        page = Image.new('L', (width, height), 255)
+        offsets = []
+        y = self.BATCH_GAP
+        for image in images:
+            page.paste(image.convert('L'), (0, y))
+            offsets.append(y)
+            y += image.height + self.BATCH_GAP
+        return page, offsets
+
+    @staticmethod
+    def _split_data(data, offsets, heights):
+        """
+        按词框中心的纵坐标把 image_to_data 的结果分回各张图，坐标换算为各自图中的位置
+        Returns:
+            list: 与 offsets 对应的 image_to_data 格式字典
+        """
+        keys = ('text', 'conf', 'left', 'top', 'width', 'height', 'block_num', 'par_num', 'line_num')
+        parts = [{key: [] for key in keys} for _ in offsets]
+        for i in range(len(data['text'])):
+            center = data['top'][i] + data['height'][i] / 2
+            for part, offset, height in zip(parts, offsets, heights):
+                if offset <= center < offset + height:
+                    for key in keys:
+                        part[key].append(data[key][i])
+                    part['top'][-1] -= offset
+                    break
+        return parts
+
+    def _parse_data(self, data, extract=None):
+        """
+        将 image_to_data 的逐词结果整理为候选
+        Args:
+            data: pytesseract.Output.DICT 格式的识别结果
+            extract: 可选的提取函数，从整行文字中取出运单号
+        Returns:
+            list: 单词候选、整行候选以及从行中提取的运单号候选
+        """
+        candidates = []
+        lines = {}
+        
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            confidence = float(data['conf'][i])
+            # conf 为 -1 的是页/块/行等结构条目
+            if not word or confidence < 0:
+                continue
+            
+            confidence /= 100
+            box = (data['left'][i], data['top'][i], data['width'][i], data['height'][i])
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append((word, confidence, box))
+            
+            candidates.append(Candidate(self._clean(word), confidence, box, 'tesseract'))
+        
+        for words in lines.values():
+            # 清理特殊字符
+            line = self._clean(''.join(word for word, _, _ in words))
+            if not line:
+                continue
+            
+            # 整行的置信度取最低的单词，文本框取并集
+            confidence = min(conf for _, conf, _ in words)
+            x1 = min(box[0] for _, _, box in words)
+            y1 = min(box[1] for _, _, box in words)
+            x2 = max(box[0] + box[2] for _, _, box in words)
+            y2 = max(box[1] + box[3] for _, _, box in words)
+            box = (x1, y1, x2 - x1, y2 - y1)
+            
+            # 查找运单号：整行中符合某条规则前缀的部分
+            waybill = extract(line) if extract is not None else None
+            if waybill:
+                # 将运单号放在最前面
+                candidates.insert(0, Candidate(waybill, confidence, box, 'tesseract'))
+            
+            candidates.append(Candidate(line, confidence, box, 'tesseract'))
+        
+        return candidates
+
+    @staticmethod
+    def _clean(text):
+        """清理特殊字符"""
+        return ''.join(c for c in text if c.isalnum() or c in ':-.')
+
+    @staticmethod
+    def _merge_candidates(candidates):
+        """去重，同一文本保留置信度最高的一条，顺序按首次出现"""
+        merged = {}
+        for candidate in candidates:
+            if not candidate.text:
+                continue
+            # 字典替换值时保留原有位置
+            existing = merged.get(candidate.text)
+            if existing is None or candidate.confidence > existing.confidence:
+                merged[candidate.text] = candidate
+        return list(merged.values())
@@ -0,0 +1,304 @@
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Iterable, Dict, Any, Optional
+from PIL import Image
+from .config import get_pipeline_config
+
+logger = logging.getLogger(__name__)
+
+# 阶段结束标记
+_STOP = object()
+
+def estimate_image_bytes(image_path: str) -> int:
+    """
+    根据图片头信息估算解码后占用的内存（BGR三通道）
+    Args:
+        image_path: 图片路径
+    Returns:
+        int: 估算的字节数
+    """
+    try:
+        # Image.open 只读取文件头，不会解码像素
+        with Image.open(image_path) as img:
+            width, height = img.size
+        return width * height * 3
+    except Exception:
+        # 无法读取文件头时按文件大小估算，解码阶段会给出具体错误
+        try:
+            return os.path.getsize(image_path)
+        except OSError:
+            return 0
+
+class MemoryBudget:
+    """已解码图像的内存预算"""
+
+    def __init__(self, limit_bytes: int):
+        """
+        初始化内存预算
+        Args:
+            limit_bytes: 同时驻留的解码图像字节数上限
+        """
+        self.limit_bytes = limit_bytes
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int) -> None:
+        """申请内存，超出上限时阻塞直到其他图像释放"""
+        with self._cond:
+            # 预算为空时总是放行，避免单张超大图片永远无法处理
+            while self.used_bytes > 0 and self.used_bytes + nbytes > self.limit_bytes:
+                self._cond.wait()
+            self.used_bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+
+    def release(self, nbytes: int) -> None:
+        """释放内存"""
+        with self._cond:
+            self.used_bytes -= nbytes
+            self._cond.notify_all()
+
+class PipelineItem:
+    """流水线中流转的单个文件"""
+    __slots__ = ('index', 'path', 'image', 'nbytes', 'result', 'recognition', 'error', 'timings')
+
+    def __init__(self, index: int, path: str):
+        self.index = index
+        self.path = path
+        self.image = None
+        self.nbytes = 0
+        self.result: Optional[str] = None
+        self.recognition = None  # 识别结论（Recognition），包含全部引擎候选
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+class _Stage:
+    """流水线阶段：一个有界输入队列加若干工作线程"""
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.threads = []
+        self._remaining = self.workers
+        self._lock = threading.Lock()
+
+    def worker_exited(self) -> bool:
+        """工作线程退出时调用，返回是否为最后一个退出的线程"""
+        with self._lock:
+            self._remaining -= 1
+            return self._remaining == 0
+
+class StagedPipeline:
+    """
+    分阶段处理流水线
+    读取/解码、识别、输出三个阶段各自拥有有界队列和线程数，
+    识别当前图片时预读后续文件，已解码图像的总内存受预算限制。
+    """
+
+    def __init__(self, scanner, options: Dict[str, Any], read_workers: int = 2,
+                 recognize_workers: int = 2, output_workers: int = 1,
+                 queue_size: int = 4, memory_limit_mb: int = 1024, batch_size: int = 0):
+        """
+        初始化流水线
+        Args:
+            scanner: WaybillScanner实例，需线程安全地支持 load_image / scan_image_detailed
+            options: 识别选项
+            read_workers: 读取/解码线程数
+            recognize_workers: 识别线程数
+            output_workers: 输出线程数
+            queue_size: 每个阶段队列的最大长度
+            memory_limit_mb: 已解码图像的内存上限（MB）
+            batch_size: 指定识别区域时每个识别线程一次拼接识别的图片数，0/1 表示逐张识别
+        """
+        self.scanner = scanner
+        self.options = options
+        self.queue_size = queue_size
+        self.budget = MemoryBudget(int(memory_limit_mb) * 1024 * 1024)
+        self._stop_event = threading.Event()
+
+        # 拼接识别只对识别区域的小图有意义
+        self.batch_size = int(batch_size or 0)
+        if not (options.get('region') and options.get('scan_text')):
+            self.batch_size = 0
+
+        self.read_stage = _Stage('read', read_workers, queue_size)
+        # 批量识别时识别队列至少能容纳一批
+        self.recognize_stage = _Stage('recognize', recognize_workers, max(queue_size, self.batch_size))
+        self.output_stage = _Stage('output', output_workers, queue_size)
+
+    @classmethod
+    def from_config(cls, scanner, options: Dict[str, Any], config: Dict[str, Any] = None) -> 'StagedPipeline':
+        """根据配置文件中的 pipeline 设置创建流水线"""
+        pipeline_config = get_pipeline_config(config)
+        return cls(
+            scanner,
+            options,
+            read_workers=pipeline_config['read_workers'],
+            recognize_workers=pipeline_config['recognize_workers'],
+            output_workers=pipeline_config['output_workers'],
+            queue_size=pipeline_config['queue_size'],
+            memory_limit_mb=pipeline_config['memory_limit_mb'],
+            batch_size=pipeline_config['tesseract_batch']
+        )
+
+    def stop(self) -> None:
+        """停止投递新文件，已在流水线中的文件会处理完毕"""
+        self._stop_event.set()
+
+    def run(self, image_paths: Iterable[str], handle_result: Callable[[PipelineItem], None]) -> None:
+        """
+        运行流水线，阻塞直到所有文件处理完毕
+        Args:
+            image_paths: 图片路径序列
+            handle_result: 输出阶段回调，在输出线程中对每个文件调用一次
+        """
+        self._handle_result = handle_result
+        stages = [
+            (self.read_stage, self._read_worker, self.recognize_stage),
+            (self.recognize_stage, self._recognize_worker, self.output_stage),
+            (self.output_stage, self._output_worker, None),
+        ]
+
+        for stage, target, next_stage in stages:
+            loop = self._worker_loop
+            if stage is self.recognize_stage and self.batch_size > 1:
+                loop = self._batch_worker_loop
+            for i in range(stage.workers):
+                thread = threading.Thread(
+                    target=loop,
+                    args=(stage, target, next_stage),
+                    name=f"pipeline-{stage.name}-{i}",
+                    daemon=True
+                )
+                stage.threads.append(thread)
+                thread.start()
+
+        logger.info(
+            f"流水线启动: 读取 {self.read_stage.workers}, 识别 {self.recognize_stage.workers}, "
+            f"输出 {self.output_stage.workers}, 内存上限 {self.budget.limit_bytes // (1024 * 1024)}MB"
+        )
+
+        # 投递文件，读取队列已满时阻塞（背压）
+        try:
+            for index, path in enumerate(image_paths):
+                if self._stop_event.is_set():
+                    break
+                self.read_stage.queue.put(PipelineItem(index, path))
+        finally:
+            for _ in range(self.read_stage.workers):
+                self.read_stage.queue.put(_STOP)
+
+            for stage, _, _ in stages:
+                for thread in stage.threads:
+                    thread.join()
+
+        logger.info(f"流水线结束，解码图像内存峰值 {self.budget.peak_bytes // (1024 * 1024)}MB")
+
+    def _worker_loop(self, stage: _Stage, target: Callable, next_stage: Optional[_Stage]) -> None:
+        """工作线程主循环，最后一个退出的线程负责通知下一阶段"""
+        try:
+            while True:
+                item = stage.queue.get()
+                if item is _STOP:
+                    break
+                try:
+                    target(item)
+                except Exception as e:
+                    logger.error(f"流水线阶段 {stage.name} 处理 {item.path} 失败: {str(e)}")
+                    if item.error is None:
+                        item.error = str(e)
+                if next_stage is not None:
+                    next_stage.queue.put(item)
+        finally:
+            if stage.worker_exited() and next_stage is not None:
+                for _ in range(next_stage.workers):
+                    next_stage.queue.put(_STOP)
+
+    def _batch_worker_loop(self, stage: _Stage, target: Callable, next_stage: Optional[_Stage]) -> None:
+        """识别阶段的批量主循环：等到一张图片后，不再等待，取走队列中已有的图片凑成一批"""
+        try:
+            stopping = False
+            while not stopping:
+                item = stage.queue.get()
+                if item is _STOP:
+                    break
+                items = [item]
+                while len(items) < self.batch_size:
+                    try:
+                        item = stage.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    items.append(item)
+                try:
+                    self._recognize_batch(items)
+                except Exception as e:
+                    logger.error(f"流水线阶段 {stage.name} 批量处理 {len(items)} 张图片失败: {str(e)}")
+                    for item in items:
+                        if item.error is None and item.recognition is None:
+                            item.error = str(e)
+                for item in items:
+                    next_stage.queue.put(item)
+        finally:
+            if stage.worker_exited() and next_stage is not None:
+                for _ in range(next_stage.workers):
+                    next_stage.queue.put(_STOP)
+
+    def _read_worker(self, item: PipelineItem) -> None:
+        """读取/解码阶段"""
+        start = time.perf_counter()
+        item.nbytes = estimate_image_bytes(item.path)
+        self.budget.acquire(item.nbytes)
+        try:
+            item.image = self.scanner.load_image(item.path, self.options)
+        except Exception as e:
+            self.budget.release(item.nbytes)
+            item.nbytes = 0
+            item.error = str(e)
+        item.timings['read'] = time.perf_counter() - start
+
+    def _recognize_worker(self, item: PipelineItem) -> None:
+        """识别阶段"""
+        if item.error is not None:
+            return
+        start = time.perf_counter()
+        try:
+            item.recognition = self.scanner.scan_image_detailed(item.image, self.options)
+            item.result = item.recognition.waybill
+        finally:
+            # 识别结束立即释放图像，让读取阶段继续预读
+            item.image = None
+            self.budget.release(item.nbytes)
+            item.nbytes = 0
+            item.timings['recognize'] = time.perf_counter() - start
+
+    def _recognize_batch(self, items: list) -> None:
+        """批量识别阶段，耗时平均计入每张图片"""
+        items = [item for item in items if item.error is None]
+        if not items:
+            return
+        start = time.perf_counter()
+        try:
+            recognitions = self.scanner.scan_images_detailed([item.image for item in items], self.options)
+            for item, recognition in zip(items, recognitions):
+                item.recognition = recognition
+                item.result = recognition.waybill
+        finally:
+            elapsed = (time.perf_counter() - start) / len(items)
+            for item in items:
+                item.image = None
+                self.budget.release(item.nbytes)
+                item.nbytes = 0
+                item.timings['recognize'] = elapsed
+
+    def _output_worker(self, item: PipelineItem) -> None:
+        """输出阶段"""
+        start = time.perf_counter()
+        self._handle_result(item)
+        item.timings['output'] = time.perf_counter() - start
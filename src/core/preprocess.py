@@ -0,0 +1,71 @@
+import logging
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 估算倾斜角时缩小到的长边，角度与分辨率无关，不必在原图上计算
+DESKEW_ANALYSIS_SIDE = 1000
+
+def estimate_skew(image: np.ndarray) -> float:
+    """
+    估算文字的倾斜角度
+    Args:
+        image: BGR或灰度图像
+    Returns:
+        float: 需要旋转的角度（度，逆时针为正），范围 -45~45
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    scale = DESKEW_ANALYSIS_SIDE / max(gray.shape[:2])
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # 文字为前景，取全部墨迹像素的最小外接矩形
+    binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    points = cv2.findNonZero(binary)
+    if points is None or len(points) < 50:
+        return 0.0
+
+    angle = cv2.minAreaRect(points)[2]
+    # OpenCV 不同版本返回的角度范围不同，统一到 -45~45
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    return angle
+
+def deskew(image: np.ndarray, min_angle: float = 0.5) -> np.ndarray:
+    """
+    校正文字倾斜
+    Args:
+        image: BGR图像
+        min_angle: 小于此角度（度）时不旋转
+    Returns:
+        np.ndarray: 校正后的图像，不需要校正时返回原图
+    """
+    angle = estimate_skew(image)
+    if abs(angle) < min_angle:
+        return image
+
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    logger.debug("校正倾斜 %.1f 度", angle)
+    return cv2.warpAffine(image, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+def upscale(image: Image.Image, scale: float, max_side: int) -> Image.Image:
+    """
+    放大图像以提高OCR对小字的识别率
+    Args:
+        image: PIL图像
+        scale: 放大倍数
+        max_side: 放大后长边上限，避免大图放大后识别过慢
+    Returns:
+        Image.Image: 放大后的图像，不需要放大时返回原图
+    """
+    width, height = image.size
+    scale = min(scale, max_side / max(width, height))
+    if scale <= 1:
+        return image
+    return image.resize((int(width * scale), int(height * scale)), Image.Resampling.LANCZOS)
@@ -0,0 +1,52 @@
+from typing import Dict, Any
+
+# 识别档位：首轮处理使用标准档位，失败的图片再用增强档位
+PROFILE_STANDARD = 'standard'
+PROFILE_ESCALATED = 'escalated'
+
+# 各档位覆盖的识别选项，运单号规则（长度、前后缀、字符集）不受影响
+PROFILES = {
+    PROFILE_STANDARD: {
+        'profile': PROFILE_STANDARD
+    },
+    PROFILE_ESCALATED: {
+        'profile': PROFILE_ESCALATED,
+        'scan_text': True,
+        'scan_barcode': True,
+        'scan_qrcode': True,
+        'use_tencent': True,
+        'region': None,           # 识别全图
+        'triage': False,
+        'decode_scale': 1.0,      # 按原分辨率解码，不受自动调优的缩小解码影响
+        'deskew': True,           # 文字识别前校正倾斜
+        'ocr_scale': 2.0,         # 文字识别前放大
+        'ocr_max_side': 4000,     # 放大后长边上限
+        'all_psm': True           # Tesseract 尝试全部页面分割模式
+    }
+}
+
+def apply_profile(options: Dict[str, Any], profile: str) -> Dict[str, Any]:
+    """
+    在识别选项上应用档位
+    Args:
+        options: 原识别选项
+        profile: 档位名称
+    Returns:
+        dict: 新的识别选项
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"未知的识别档位: {profile}")
+    result = dict(options)
+    result.update(PROFILES[profile])
+    return result
+
+def escalate_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    生成增强档位的识别选项：更高分辨率的文字识别、倾斜校正、全部页面分割模式，
+    启用全部识别方式（含腾讯云OCR）并识别全图
+    Args:
+        options: 首轮处理的识别选项
+    Returns:
+        dict: 新的识别选项
+    """
+    return apply_profile(options, PROFILE_ESCALATED)
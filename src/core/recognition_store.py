@@ -0,0 +1,283 @@
+import os
+import gzip
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+from .fileops import move_numbered, numbered_path
+from .ocr import Candidate
+from .scoring import CandidateScorer, Recognition
+from .sharding import ShardLayout, append_index
+from .waybill_index import WaybillIndex
+
+logger = logging.getLogger(__name__)
+
+STORE_PREFIX = 'recognition_'
+STORE_SUFFIX = '.jsonl.gz'
+
+class RecognitionStore:
+    """
+    每批次的原始识别记录
+    以gzip压缩的JSON Lines保存每张图片各引擎的全部候选（文本、置信度、位置），
+    规则调整后可直接据此重新判定，无需再次调用识别引擎。
+    """
+
+    def __init__(self, path: str, batch_info: Dict[str, Any] = None):
+        """
+        打开（追加）记录文件
+        Args:
+            path: 记录文件路径
+            batch_info: 批次信息（源文件夹、成功文件夹、识别选项等），写在文件开头
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        if batch_info is not None:
+            self._write({'type': 'batch', **batch_info})
+
+    @classmethod
+    def create(cls, target_folder: str, source_folder: str, success_folder: str,
+               options: Dict[str, Any], name_suffix: str = '',
+               output_layout: Dict[str, Any] = None) -> 'RecognitionStore':
+        """
+        在目标文件夹中为新批次创建记录文件
+        Args:
+            target_folder: 目标文件夹
+            source_folder: 源文件夹
+            success_folder: 成功文件夹
+            options: 本批次的识别选项
+            name_suffix: 文件名后缀，多台电脑写入同一目标文件夹时区分各节点
+            output_layout: success 文件夹的分片布局（ShardLayout.to_dict）
+        Returns:
+            RecognitionStore: 记录文件
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(target_folder, f"{STORE_PREFIX}{timestamp}{name_suffix}{STORE_SUFFIX}")
+        return cls(path, {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'source_folder': os.path.abspath(source_folder),
+            'success_folder': os.path.abspath(success_folder),
+            'output_layout': output_layout,
+            'options': options
+        })
+
+    def append(self, source_path: str, recognition: Optional[Recognition], output_path: str = None) -> None:
+        """
+        记录一张图片的识别结果
+        Args:
+            source_path: 原始路径
+            recognition: 识别结论，读取失败时为None
+            output_path: 重命名后的路径，未移动时为None
+        """
+        record = {
+            'type': 'image',
+            'source': os.path.abspath(source_path),
+            'output': os.path.abspath(output_path) if output_path else None,
+            'waybill': None,
+            'stage': '',
+            'profile': '',
+            'candidates': []
+        }
+        if recognition is not None:
+            record['waybill'] = recognition.waybill
+            record['stage'] = recognition.stage
+            record['profile'] = recognition.profile
+            record['candidates'] = [c.to_dict() for c in recognition.candidates]
+        self._write(record)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def close(self) -> None:
+        """关闭记录文件"""
+        with self._lock:
+            self._file.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐条读取记录，程序中断导致的不完整末尾会被忽略
+        Args:
+            path: 记录文件路径
+        Returns:
+            Iterator[dict]: 记录
+        """
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"跳过不完整的识别记录: {line[:50]}")
+            except EOFError:
+                logger.warning(f"识别记录文件未正常结束: {path}")
+
+def latest_batch_options(target_folder: str) -> Optional[Dict[str, Any]]:
+    """
+    读取目标文件夹中最近一次处理的识别选项
+    Args:
+        target_folder: 目标文件夹
+    Returns:
+        dict: 识别选项，没有识别记录时返回None
+    """
+    if not os.path.isdir(target_folder):
+        return None
+    stores = sorted(
+        name for name in os.listdir(target_folder)
+        if name.startswith(STORE_PREFIX) and name.endswith(STORE_SUFFIX)
+    )
+    # 文件名中的时间戳使按名称排序即按时间排序
+    for name in reversed(stores):
+        try:
+            for record in RecognitionStore.read(os.path.join(target_folder, name)):
+                if record.get('type') == 'batch':
+                    return record.get('options')
+                break
+        except Exception as e:
+            logger.warning(f"读取识别记录失败 {name}: {str(e)}")
+    return None
+
+class RenamePlan:
+    """重新判定后的一次文件移动"""
+    __slots__ = ('record', 'current_path', 'new_path', 'old_waybill', 'new_waybill')
+
+    def __init__(self, record, current_path, new_path, old_waybill, new_waybill):
+        self.record = record
+        self.current_path = current_path
+        self.new_path = new_path
+        self.old_waybill = old_waybill
+        self.new_waybill = new_waybill
+
+def reevaluate(store_path: str, option_overrides: Dict[str, Any] = None) -> List[RenamePlan]:
+    """
+    用新规则重新判定记录中的全部图片，规划需要的重命名
+    Args:
+        store_path: 记录文件路径
+        option_overrides: 覆盖批次原有识别选项的新规则（前缀、后缀、长度、字符集、置信度）
+    Returns:
+        list: 需要执行的移动，运单号不变的图片不在其中
+    """
+    batch = {}
+    changed = []
+    scorer = None
+    layout = None
+    batch_time = None
+
+    for record in RecognitionStore.read(store_path):
+        if record.get('type') == 'batch':
+            batch = record
+            options = dict(batch.get('options') or {})
+            options.update(option_overrides or {})
+            scorer = CandidateScorer(options)
+            # 按处理时的分片布局和日期放置文件
+            layout = ShardLayout.from_dict(batch['success_folder'], batch.get('output_layout'))
+            batch_time = datetime.fromisoformat(batch['time'])
+            continue
+
+        if scorer is None:
+            raise ValueError(f"识别记录缺少批次信息: {store_path}")
+
+        candidates = [Candidate.from_dict(c) for c in record['candidates']]
+        recognition = scorer.conclude(candidates)
+        # 运单号不变的图片保持原名，规则不变时重复执行不移动任何文件
+        if recognition.waybill != record['waybill']:
+            changed.append((record, recognition))
+
+    # 本次移走的文件空出的名称可以再分配
+    vacated = {os.path.normcase(record['output'] or record['source']) for record, _ in changed}
+    taken = set()
+
+    def available(path):
+        key = os.path.normcase(path)
+        return key not in taken and (key in vacated or not os.path.exists(path))
+
+    plans = []
+    for record, recognition in changed:
+        new_waybill = recognition.waybill
+        source = record['source']
+        current_path = record['output'] or source
+        stem, ext = os.path.splitext(source)
+
+        if new_waybill:
+            # 与处理时相同的重名规则：第二张起加 -2、-3 后缀，跳过success中已有的文件；多承运商规则时先按规则分文件夹
+            shard = os.path.join(scorer.rules.folder_for(recognition.profile), layout.shard_for(new_waybill, batch_time))
+            folder = os.path.normpath(os.path.join(batch['success_folder'], shard))
+            stem = new_waybill
+        else:
+            # 不再符合规则的图片移回源文件夹，源文件夹中已有同名文件时同样加序号
+            folder, stem = os.path.split(stem)
+
+        count = 1
+        new_path = numbered_path(folder, stem, ext, count)
+        while not available(new_path):
+            count += 1
+            new_path = numbered_path(folder, stem, ext, count)
+        taken.add(os.path.normcase(new_path))
+        plans.append(RenamePlan(record, current_path, new_path, record['waybill'], new_waybill))
+
+    return plans
+
+def apply_plan(store_path: str, plans: List[RenamePlan]) -> int:
+    """
+    执行重命名并更新记录文件
+    先把所有文件移到临时名再移到新名，避免互换名称时相互覆盖；
+    移动不覆盖已有文件，新名称被占用时改用下一个序号
+    Args:
+        store_path: 记录文件路径
+        plans: reevaluate 返回的移动计划
+    Returns:
+        int: 成功移动的文件数
+    """
+    staged = []
+    for plan in plans:
+        try:
+            temp_path = move_numbered(plan.current_path, plan.current_path + '.reeval.tmp')
+            staged.append((plan, temp_path))
+        except Exception as e:
+            logger.error(f"移动文件失败 {plan.current_path}: {str(e)}")
+
+    moved = {}
+    for plan, temp_path in staged:
+        try:
+            os.makedirs(os.path.dirname(plan.new_path), exist_ok=True)
+            plan.new_path = move_numbered(temp_path, plan.new_path)
+            moved[plan.record['source']] = plan
+            if plan.new_waybill:
+                append_index(os.path.dirname(plan.new_path), plan.new_waybill, os.path.basename(plan.new_path))
+        except Exception as e:
+            logger.error(f"移动文件失败 {plan.current_path} -> {plan.new_path}: {str(e)}")
+            try:
+                plan.current_path = move_numbered(temp_path, plan.current_path)
+            except Exception as restore_error:
+                logger.error(f"恢复文件失败 {temp_path}: {str(restore_error)}")
+
+    # 回单索引同步文件的新位置
+    index = WaybillIndex.open_default()
+    if index is not None:
+        try:
+            for plan in moved.values():
+                index.relocate(plan.current_path, plan.new_path, plan.new_waybill)
+        except Exception as e:
+            logger.error(f"更新回单索引失败: {str(e)}")
+        finally:
+            index.close()
+
+    # 重写记录文件，使其反映文件的新位置和新结论
+    records = list(RecognitionStore.read(store_path))
+    temp_store = store_path + '.tmp'
+    with gzip.open(temp_store, 'wt', encoding='utf-8') as f:
+        for record in records:
+            plan = moved.get(record.get('source'))
+            if plan is not None:
+                record['output'] = plan.new_path if plan.new_waybill else None
+                if plan.new_path != record['source'] and not plan.new_waybill:
+                    # 移回源文件夹时与已有文件重名而改了名
+                    record['source'] = plan.new_path
+                record['waybill'] = plan.new_waybill
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+    os.replace(temp_store, store_path)
+
+    logger.info(f"重新判定完成，移动 {len(moved)} 个文件")
+    return len(moved)
@@ -0,0 +1,161 @@
+import os
+import csv
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILENAME = '处理明细.csv'
+SUMMARY_FILENAME = '处理总结.txt'
+
+# 明细字段
+FIELDS = ['time', 'status', 'source', 'output', 'reason', 'stage', 'confidence', 'elapsed_ms']
+
+STATUS_SUCCESS = '成功'
+STATUS_FAIL = '失败'
+STATUS_REJECTED = '拒绝'
+
+class BatchReport:
+    """
+    边处理边写入的批次明细
+    每处理完一张图片追加一行CSV（行缓冲，外部工具可实时tail），
+    每隔一定行数或时间fsync一次；结束后由明细生成人工阅读的处理总结。
+    """
+
+    def __init__(self, target_folder: str, fsync_every: int = 100, fsync_interval: float = 2.0,
+                 name_suffix: str = ''):
+        """
+        创建明细文件
+        Args:
+            target_folder: 目标文件夹
+            fsync_every: 每写入多少行fsync一次
+            fsync_interval: 距上次fsync超过多少秒时fsync
+            name_suffix: 明细和总结文件名的后缀，同一目标文件夹再次处理时避免覆盖
+        """
+        self.target_folder = target_folder
+        self.name_suffix = name_suffix
+        self.path = os.path.join(target_folder, _with_suffix(REPORT_FILENAME, name_suffix))
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.start_time = datetime.now()
+        self.counts = {STATUS_SUCCESS: 0, STATUS_FAIL: 0, STATUS_REJECTED: 0}
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        # utf-8-sig 方便用Excel直接打开；buffering=1 为行缓冲
+        self._file = open(self.path, 'w', encoding='utf-8-sig', newline='', buffering=1)
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    @property
+    def total(self) -> int:
+        """已写入的图片数"""
+        return sum(self.counts.values())
+
+    def write(self, status: str, source: str, output: str = '', reason: str = '',
+              stage: str = '', confidence: float = None, elapsed: float = None) -> None:
+        """
+        追加一行明细
+        Args:
+            status: 成功 / 失败 / 拒绝
+            source: 原文件名
+            output: 新文件名
+            reason: 失败或拒绝原因
+            stage: 产生结果的识别阶段
+            confidence: 置信度
+            elapsed: 处理耗时（秒）
+        """
+        row = {
+            'time': datetime.now().strftime('%H:%M:%S'),
+            'status': status,
+            'source': source,
+            'output': output,
+            'reason': reason,
+            'stage': stage,
+            'confidence': f"{confidence:.2f}" if confidence is not None else '',
+            'elapsed_ms': f"{elapsed * 1000:.0f}" if elapsed is not None else ''
+        }
+        with self._lock:
+            self._writer.writerow(row)
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        """写入磁盘（需持有锁）"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """关闭明细文件"""
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def write_summary(self, extra_lines: Dict[str, Any] = None) -> str:
+        """
+        由明细生成处理总结，逐行读取，每次只保留一种状态的文件名用于排序
+        Args:
+            extra_lines: 附加在统计信息后的内容，键为标题
+        Returns:
+            str: 总结文件路径
+        """
+        self.close()
+        summary_path = os.path.join(self.target_folder, _with_suffix(SUMMARY_FILENAME, self.name_suffix))
+
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            # 写入标题和时间
+            f.write(f"处理时间：{self.start_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("-" * 40 + "\n")
+
+            # 写入详细结果，失败、拒绝在前，各读一遍明细；同一状态内按文件名排序（明细是完成顺序）
+            for status in (STATUS_FAIL, STATUS_REJECTED, STATUS_SUCCESS):
+                rows = sorted(
+                    (row['source'], row['output'] if status == STATUS_SUCCESS else row['reason'])
+                    for row in iter_report(self.path) if row['status'] == status
+                )
+                for source, detail in rows:
+                    if status == STATUS_SUCCESS:
+                        f.write(f"成功 - {source} -> {detail}\n")
+                    elif status == STATUS_REJECTED:
+                        f.write(f"拒绝 - {source} ({detail})\n")
+                    else:
+                        f.write(f"失败 - {source} ({detail})\n")
+
+            # 写入统计信息
+            f.write("-" * 40 + "\n")
+            f.write("处理完成！\n")
+            f.write(f"总数：{self.total}\n")
+            f.write(f"成功：{self.counts[STATUS_SUCCESS]}\n")
+            f.write(f"失败：{self.counts[STATUS_FAIL]}\n")
+            if self.counts[STATUS_REJECTED]:
+                f.write(f"预检拒绝：{self.counts[STATUS_REJECTED]}\n")
+            for title, value in (extra_lines or {}).items():
+                f.write(f"{title}：{value}\n")
+
+        logger.info(f"处理总结已保存到：{summary_path}")
+        return summary_path
+
+def _with_suffix(filename: str, suffix: str) -> str:
+    """在扩展名前加后缀"""
+    name, ext = os.path.splitext(filename)
+    return f"{name}{suffix}{ext}"
+
+def iter_report(path: str):
+    """
+    逐行读取明细
+    Args:
+        path: 明细文件路径
+    Returns:
+        Iterator[dict]: 每行明细
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
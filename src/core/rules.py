@@ -0,0 +1,158 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 从整行文字中提取运单号时，未设置字符集的规则按字母数字截取（整行中还有中文、标点）
+_EXTRACT_CHARSET = '[0-9A-Za-z]'
+
+class RuleProfile:
+    """一个承运商的运单号规则"""
+    __slots__ = ('name', 'prefix', 'suffix', 'min_length', 'max_length', 'charset', 'folder')
+
+    def __init__(self, name: str = '', prefix: str = '', suffix: str = '', min_length: int = 8,
+                 max_length: int = 12, charset: str = '', folder: str = None):
+        """
+        Args:
+            name: 规则名称（承运商），单一规则时为空字符串
+            prefix: 前缀（不区分大小写）
+            suffix: 后缀（不区分大小写）
+            min_length: 最小长度（含前后缀）
+            max_length: 最大长度（含前后缀）
+            charset: 允许的字符（不区分大小写），为空时不限制
+            folder: 结果放入 success 下的子文件夹，为None时使用名称
+        """
+        self.name = name
+        self.prefix = prefix or ''
+        self.suffix = suffix or ''
+        self.min_length = max(0, int(min_length))
+        self.max_length = int(max_length)
+        self.charset = charset or ''
+        self.folder = name if folder is None else folder
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RuleProfile':
+        return cls(
+            name=data.get('name', ''),
+            prefix=data.get('prefix', ''),
+            suffix=data.get('suffix', ''),
+            min_length=data.get('min_length', 8),
+            max_length=data.get('max_length', 12),
+            charset=data.get('charset', ''),
+            folder=data.get('folder')
+        )
+
+    def key(self) -> tuple:
+        return (self.name, self.prefix, self.suffix, self.min_length, self.max_length, self.charset, self.folder)
+
+    def pattern(self) -> str:
+        """整段匹配清理后文本的正则（长度、前后缀、字符集）"""
+        if self.min_length > self.max_length:
+            return '(?!)'
+        prefix = f"(?i:{re.escape(self.prefix)})" if self.prefix else ''
+        suffix = f"(?i:{re.escape(self.suffix)})" if self.suffix else ''
+        # 字符集约束整个运单号（含前后缀），与前后缀一样不区分大小写：
+        # 界面默认只勾选大写字母和数字，小写的条码内容和识别结果仍应符合
+        charset = f"(?=(?i:[{re.escape(self.charset)}])*\\Z)" if self.charset else ''
+        return f"(?=.{{{self.min_length},{self.max_length}}}\\Z){charset}{prefix}.*{suffix}"
+
+    def extract_pattern(self) -> Optional[str]:
+        """在整行文字中查找运单号的正则，没有前缀的规则无法定位，返回None"""
+        if not self.prefix:
+            return None
+        fixed = len(self.prefix) + len(self.suffix)
+        low = max(0, self.min_length - fixed)
+        high = max(low, self.max_length - fixed)
+        charset = f"(?i:[{re.escape(self.charset)}])" if self.charset else _EXTRACT_CHARSET
+        suffix = f"(?i:{re.escape(self.suffix)})" if self.suffix else ''
+        return f"(?i:{re.escape(self.prefix)}){charset}{{{low},{high}}}{suffix}"
+
+class RuleSet:
+    """
+    一组运单号规则编译成的组合匹配器：全部规则合并为一个带命名分组的正则，
+    每个候选只匹配一次即可得知符合哪条规则；多条规则都符合时按配置顺序取靠前的
+    """
+
+    def __init__(self, profiles: List[RuleProfile]):
+        """
+        Args:
+            profiles: 规则列表，按优先顺序
+        """
+        self.profiles = profiles
+        self._by_name = {profile.name: profile for profile in profiles}
+        self._matcher = re.compile('|'.join(
+            f"(?P<p{i}>{profile.pattern()})" for i, profile in enumerate(profiles)
+        ), re.DOTALL)
+
+        extract_patterns = [(i, profile.extract_pattern()) for i, profile in enumerate(profiles)]
+        extract_patterns = [(i, pattern) for i, pattern in extract_patterns if pattern]
+        self._extractor = re.compile('|'.join(
+            f"(?P<p{i}>{pattern})" for i, pattern in extract_patterns
+        )) if extract_patterns else None
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any]) -> 'RuleSet':
+        """
+        由识别选项创建：有 rule_profiles 时使用多条规则，否则使用选项中的单一规则
+        相同的规则只编译一次
+        """
+        profiles = options.get('rule_profiles')
+        if profiles:
+            keys = tuple(RuleProfile.from_dict(p).key() for p in profiles)
+        else:
+            keys = (RuleProfile(
+                prefix=options.get('prefix', ''),
+                suffix=options.get('suffix', ''),
+                min_length=options.get('min_length', 8),
+                max_length=options.get('max_length', 12),
+                charset=options.get('charset', '')
+            ).key(),)
+        return _compile(keys)
+
+    @property
+    def multiple(self) -> bool:
+        """是否为多承运商规则"""
+        return len(self.profiles) > 1 or bool(self.profiles and self.profiles[0].name)
+
+    def match(self, text: str) -> Optional[Tuple[str, str]]:
+        """
+        检查清理后的文本是否符合某条规则
+        Args:
+            text: 只含字母数字的候选文本
+        Returns:
+            (运单号, 规则名称)，都不符合返回None
+        """
+        if not text:
+            return None
+        found = self._matcher.fullmatch(text)
+        if found is None:
+            return None
+        return text, self.profiles[int(found.lastgroup[1:])].name
+
+    def extract(self, line: str) -> Optional[str]:
+        """
+        在整行识别文字中查找符合某条规则前缀的运单号（如"运单编号:YS12345678"）
+        Args:
+            line: 整行文字
+        Returns:
+            str: 运单号（大写），没有时返回None
+        """
+        if self._extractor is None or not line:
+            return None
+        found = self._extractor.search(line)
+        return found.group().upper() if found else None
+
+    def folder_for(self, name: str) -> str:
+        """规则对应的 success 子文件夹，单一规则时为空字符串"""
+        profile = self._by_name.get(name)
+        return profile.folder if profile is not None else ''
+
+@lru_cache(maxsize=32)
+def _compile(keys: tuple) -> RuleSet:
+    profiles = [RuleProfile(*key) for key in keys]
+    for profile in profiles:
+        if profile.min_length > profile.max_length:
+            logger.warning(f"运单号规则 {profile.name or '默认'} 的最小长度大于最大长度，不会匹配任何文本")
+    return RuleSet(profiles)
@@ -1,16 +1,21 @@
-import os
 import logging
 from typing import Dict, List, Tuple, Optional
 from .image_processor import ImageProcessor
+from .scoring import Recognition
 
 logger = logging.getLogger(__name__)
 
 class WaybillScanner:
     """运单扫描器"""
     
-    def __init__(self, config_path: str = 'config.json'):
-        """初始化扫描器"""
-        self.processor = ImageProcessor()
+    def __init__(self, config_path: str = 'config.json', config: Dict = None):
+        """
+        初始化扫描器
+        Args:
+            config_path: 保留参数
+            config: 配置内容，为None时从配置文件读取
+        """
+        self.processor = ImageProcessor(config)
         logger.info("扫描器初始化完成")
     
     def scan_single(self, image_path: str, options: Dict) -> Optional[str]:
@@ -23,14 +28,80 @@ class WaybillScanner:
             str: 识别到的运单号，失败返回None
         """
         try:
-            logger.debug(f"开始处理图片: {image_path}")
+            logger.debug("开始处理图片: %s", image_path)
             result = self.processor.process_image(image_path, options)
-            logger.debug(f"处理结果: {result}")
+            logger.debug("处理结果: %s", result)
             return result
         except Exception as e:
             logger.error(f"处理图片失败 {image_path}: {str(e)}")
             return None
 
+    def start_batch(self) -> None:
+        """开始新批次（重置每批次的调用预算）"""
+        self.processor.start_batch()
+
+    def batch_stats(self) -> Dict:
+        """本批次的引擎调用统计"""
+        return self.processor.batch_stats()
+
+    def load_image(self, image_path: str, options: Dict = None):
+        """
+        读取并解码图片（供流水线读取阶段调用）
+        Args:
+            image_path: 图片路径
+            options: 可选的识别选项，决定解码比例
+        Returns:
+            np.ndarray: 解码后的图像
+        """
+        return self.processor.load_image(image_path, options)
+
+    def scan_image(self, image, options: Dict) -> Optional[str]:
+        """
+        识别已解码的图片（供流水线识别阶段调用）
+        Args:
+            image: 解码后的图像
+            options: 识别选项
+        Returns:
+            str: 识别到的运单号，失败返回None
+        """
+        try:
+            result = self.processor.recognize(image, options)
+            logger.debug("处理结果: %s", result)
+            return result
+        except Exception as e:
+            logger.error(f"识别图片失败: {str(e)}")
+            return None
+
+    def scan_image_detailed(self, image, options: Dict) -> Recognition:
+        """
+        识别已解码的图片，返回包含全部候选的识别结论
+        Args:
+            image: 解码后的图像
+            options: 识别选项
+        Returns:
+            Recognition: 识别结论
+        """
+        try:
+            return self.processor.recognize_detailed(image, options)
+        except Exception as e:
+            logger.error(f"识别图片失败: {str(e)}")
+            return Recognition()
+
+    def scan_images_detailed(self, images: list, options: Dict) -> List[Recognition]:
+        """
+        一次识别多张已解码的图片（指定识别区域时拼接后调用一次Tesseract）
+        Args:
+            images: 解码后的图像列表
+            options: 识别选项
+        Returns:
+            list: 与 images 对应的识别结论
+        """
+        try:
+            return self.processor.recognize_batch(images, options)
+        except Exception as e:
+            logger.error(f"批量识别图片失败: {str(e)}")
+            return [Recognition() for _ in images]
+
     def scan_batch(self, folder_path: str, options: Dict) -> Tuple[List[Tuple[str, str]], List[str]]:
         """
         批量扫描图片
@@ -42,35 +113,23 @@ class WaybillScanner:
             (成功列表[(文件名,运单号)], 失败列表[文件名])
         """
         try:
+            from .engine import BatchEngine
+            
             logger.info(f"开始批量处理文件夹: {folder_path}")
             success_files = []
             failed_files = []
             
-            # 获取所有图片文件
-            image_files = [
-                f for f in os.listdir(folder_path)
-                if f.lower().endswith(('.png', '.jpg', '.jpeg'))
-            ]
-            
-            for filename in image_files:
-                try:
-                    image_path = os.path.join(folder_path, filename)
-                    result = self.scan_single(image_path, options)
-                    
-                    if result:
-                        success_files.append((filename, result))
-                        logger.info(f"成功识别: {filename} -> {result}")
-                    else:
-                        failed_files.append(filename)
-                        logger.warning(f"识别失败: {filename}")
-                        
-                except Exception as e:
-                    logger.error(f"处理文件失败 {filename}: {str(e)}")
-                    failed_files.append(filename)
+            for result in BatchEngine(self, options).iter_results(folder_path):
+                if result.waybill:
+                    success_files.append((result.filename, result.waybill))
+                    logger.debug("成功识别: %s -> %s", result.filename, result.waybill)
+                else:
+                    failed_files.append(result.filename)
+                    logger.debug("识别失败: %s", result.filename)
             
             logger.info(f"批量处理完成: 成功 {len(success_files)}, 失败 {len(failed_files)}")
             return success_files, failed_files
             
         except Exception as e:
             logger.error(f"批量处理失败: {str(e)}")
-            return [], []
\ No newline at end of file
+            return [], []
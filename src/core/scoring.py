@@ -0,0 +1,146 @@
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from .ocr import Candidate
+from .manifest import get_manifest
+from .rules import RuleSet
+
+logger = logging.getLogger(__name__)
+
+# 默认置信度阈值
+DEFAULT_ACCEPT_CONFIDENCE = 0.85  # 高于此值的候选直接采用，不再调用更昂贵的识别阶段
+DEFAULT_MIN_CONFIDENCE = 0.0      # 低于此值的候选即使符合规则也不采用
+
+def clean_text(text: str) -> str:
+    """只保留字母和数字"""
+    return ''.join(c for c in text if c.isalnum())
+
+def match_waybill(text: str, options: Dict[str, Any]) -> Optional[str]:
+    """
+    按运单号规则检查文本
+    Args:
+        text: 候选文本
+        options: 识别选项（长度、前缀、后缀、允许的字符，或多承运商规则 rule_profiles）
+    Returns:
+        str: 符合规则的运单号，不符合返回None
+    """
+    if not text:
+        return None
+    found = RuleSet.from_options(options).match(clean_text(text))
+    return found[0] if found else None
+
+class Recognition:
+    """单张图片的识别结论"""
+    __slots__ = ('waybill', 'confidence', 'stage', 'candidates', 'profile')
+
+    def __init__(self, waybill: Optional[str] = None, confidence: float = 0.0,
+                 stage: str = '', candidates: List[Candidate] = None, profile: str = ''):
+        """
+        Args:
+            waybill: 采用的运单号，未识别为None
+            confidence: 采用候选的置信度
+            stage: 产生该结果的识别阶段（barcode / tesseract / tencent）
+            candidates: 本次识别得到的全部候选
+            profile: 运单号符合的承运商规则名称，单一规则时为空字符串
+        """
+        self.waybill = waybill
+        self.confidence = confidence
+        self.stage = stage
+        self.candidates = candidates if candidates is not None else []
+        self.profile = profile
+
+class CandidateScorer:
+    """按规则和置信度挑选候选，并判断是否可以提前结束"""
+
+    def __init__(self, options: Dict[str, Any]):
+        """
+        Args:
+            options: 识别选项，可包含 accept_confidence / min_confidence
+        """
+        self.options = options
+        self.rules = RuleSet.from_options(options)
+        self.accept_confidence = float(options.get('accept_confidence', DEFAULT_ACCEPT_CONFIDENCE))
+        self.min_confidence = float(options.get('min_confidence', DEFAULT_MIN_CONFIDENCE))
+        # 预期运单清单：命中清单（含易混淆字符、编辑距离内唯一的近似）的候选直接采用
+        self.manifest = get_manifest(options['manifest']) if options.get('manifest') else None
+        self._resolved = {}
+
+    def match(self, candidate: Candidate) -> Optional[str]:
+        """候选符合运单号规则（或命中清单）时返回运单号"""
+        found = self.resolve(candidate)
+        return found[0] if found else None
+
+    def classify(self, candidate: Candidate) -> Optional[Tuple[str, str]]:
+        """候选符合某条运单号规则时返回 (运单号, 规则名称)"""
+        found = self.resolve(candidate)
+        return found[:2] if found else None
+
+    def resolve(self, candidate: Candidate) -> Optional[Tuple[str, str, bool]]:
+        """
+        判定候选
+        Args:
+            candidate: 候选
+        Returns:
+            (运单号, 规则名称, 是否命中清单)，都不符合返回None；
+            命中清单时运单号取清单中的写法（纠正易混淆字符和个别错字）
+        """
+        if not candidate.text:
+            return None
+        text = clean_text(candidate.text)
+        if text in self._resolved:
+            return self._resolved[text]
+
+        found = None
+        hit = self.manifest.resolve(text) if self.manifest is not None else None
+        if hit is not None:
+            waybill, distance = hit
+            matched = self.rules.match(waybill)
+            found = (waybill, matched[1] if matched else '', True)
+            if waybill != text.upper():
+                logger.debug("候选 %s 按清单纠正为 %s（距离 %d）", text, waybill, distance)
+        else:
+            matched = self.rules.match(text)
+            if matched is not None:
+                found = (matched[0], matched[1], False)
+
+        self._resolved[text] = found
+        return found
+
+    def is_confident(self, candidate: Candidate) -> bool:
+        """候选符合规则且置信度足够高，或命中清单，可以直接采用"""
+        found = self.resolve(candidate)
+        if found is None:
+            return False
+        if found[2]:
+            return candidate.confidence >= self.min_confidence
+        return candidate.confidence >= self.accept_confidence
+
+    def best(self, candidates: List[Candidate]) -> Optional[Tuple[str, Candidate]]:
+        """
+        挑选最优的合规候选：命中清单的优先，其次置信度最高
+        Args:
+            candidates: 候选列表
+        Returns:
+            (运单号, 候选)，没有合规候选返回None；同等条件下取靠前的候选
+        """
+        best = None
+        best_rank = None
+        for candidate in candidates:
+            if candidate.confidence < self.min_confidence:
+                continue
+            found = self.resolve(candidate)
+            if found is None:
+                continue
+            rank = (found[2], candidate.confidence)
+            if best is None or rank > best_rank:
+                best = (found[0], candidate)
+                best_rank = rank
+        return best
+
+    def conclude(self, candidates: List[Candidate]) -> Recognition:
+        """根据全部候选得出识别结论"""
+        found = self.best(candidates)
+        if found is None:
+            return Recognition(candidates=candidates)
+        waybill, candidate = found
+        _, profile = self.classify(candidate)
+        return Recognition(waybill, candidate.confidence, candidate.engine, candidates, profile)
@@ -0,0 +1,212 @@
+import os
+import zlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from .config import get_output_config
+
+logger = logging.getLogger(__name__)
+
+# 分片方式
+SHARD_NONE = 'none'        # 全部放在 success 下
+SHARD_DATE = 'date'        # 按处理日期
+SHARD_PREFIX = 'prefix'    # 按运单号前几位
+SHARD_HASH = 'hash'        # 按运单号哈希分桶
+SHARD_CARRIER = 'carrier'  # 按承运商（运单号前缀对应的名称）
+
+SHARD_MODES = (SHARD_NONE, SHARD_DATE, SHARD_PREFIX, SHARD_HASH, SHARD_CARRIER)
+
+# 每个分片中的索引文件，每行"运单号\t文件名"，查找时不必列出目录
+INDEX_FILENAME = '_index.tsv'
+
+class ShardLayout:
+    """
+    success 文件夹的分片布局：按日期、运单号前缀、哈希分桶或承运商分到子文件夹，
+    单个文件夹的文件数有上限，重命名和存在性检查的耗时不随归档增长；
+    每个分片维护一个只追加的索引文件
+    """
+
+    def __init__(self, success_folder: str, mode: str = SHARD_NONE, date_format: str = '%Y-%m',
+                 prefix_length: int = 4, hash_buckets: int = 256, carriers: Dict[str, str] = None):
+        """
+        Args:
+            success_folder: success 文件夹
+            mode: 分片方式，见 SHARD_MODES
+            date_format: 按日期分片时的子文件夹名格式
+            prefix_length: 按前缀分片时取运单号的前几位
+            hash_buckets: 按哈希分片时的桶数
+            carriers: 按承运商分片时运单号前缀到承运商名称的映射，按最长前缀匹配
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError(f"未知的分片方式: {mode}")
+        self.success_folder = success_folder
+        self.mode = mode
+        self.date_format = date_format
+        self.prefix_length = max(1, int(prefix_length))
+        self.hash_buckets = max(1, int(hash_buckets))
+        self.carriers = dict(carriers or {})
+        # 最长前缀优先
+        self._carrier_prefixes = sorted(self.carriers, key=len, reverse=True)
+
+        self._lock = threading.Lock()
+        self._created = set()
+        # 分片 -> {运单号: 文件数}，首次使用某个分片时从索引加载
+        self._counts = {}
+
+    @classmethod
+    def from_config(cls, success_folder: str, config: Dict[str, Any] = None) -> 'ShardLayout':
+        """根据配置文件 output 段创建"""
+        return cls.from_dict(success_folder, get_output_config(config))
+
+    @classmethod
+    def from_dict(cls, success_folder: str, data: Optional[Dict[str, Any]]) -> 'ShardLayout':
+        """根据 to_dict 的结果（识别记录中保存的布局）创建，为None时不分片"""
+        data = data or {}
+        return cls(
+            success_folder,
+            mode=data.get('shard', SHARD_NONE),
+            date_format=data.get('date_format', '%Y-%m'),
+            prefix_length=data.get('prefix_length', 4),
+            hash_buckets=data.get('hash_buckets', 256),
+            carriers=data.get('carriers')
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """布局参数，记录在识别记录中，重新判定时按同样的布局移动文件"""
+        return {
+            'shard': self.mode,
+            'date_format': self.date_format,
+            'prefix_length': self.prefix_length,
+            'hash_buckets': self.hash_buckets,
+            'carriers': self.carriers
+        }
+
+    def carrier_for(self, waybill: str) -> str:
+        """运单号对应的承运商，没有匹配的前缀时返回"其他\""""
+        upper = waybill.upper()
+        for prefix in self._carrier_prefixes:
+            if upper.startswith(prefix.upper()):
+                return self.carriers[prefix]
+        return '其他'
+
+    def shard_for(self, waybill: str, when: datetime = None) -> str:
+        """
+        运单号所在的分片
+        Args:
+            waybill: 运单号
+            when: 按日期分片时使用的时间，为None时取当前时间
+        Returns:
+            str: 相对 success 文件夹的子文件夹，不分片时为空字符串
+        """
+        if self.mode == SHARD_DATE:
+            return (when or datetime.now()).strftime(self.date_format)
+        if self.mode == SHARD_PREFIX:
+            return waybill[:self.prefix_length].upper()
+        if self.mode == SHARD_HASH:
+            # crc32 跨进程、跨电脑稳定（内置 hash 对字符串加盐）
+            width = len(f"{self.hash_buckets - 1:x}")
+            return f"{zlib.crc32(waybill.upper().encode('utf-8')) % self.hash_buckets:0{width}x}"
+        if self.mode == SHARD_CARRIER:
+            return self.carrier_for(waybill)
+        return ''
+
+    def folder(self, shard: str) -> str:
+        """分片的文件夹，首次使用时创建"""
+        folder = os.path.join(self.success_folder, shard) if shard else self.success_folder
+        if folder not in self._created:
+            os.makedirs(folder, exist_ok=True)
+            self._created.add(folder)
+        return folder
+
+    def count(self, shard: str, waybill: str) -> int:
+        """分片中已有的该运单号文件数（按索引，不列出目录）"""
+        with self._lock:
+            return self._load(shard).get(waybill, 0)
+
+    def record(self, shard: str, waybill: str, filename: str) -> None:
+        """
+        在分片索引中追加一条记录
+        Args:
+            shard: 分片
+            waybill: 运单号
+            filename: 分片中的文件名
+        """
+        with self._lock:
+            counts = self._load(shard)
+            counts[waybill] = counts.get(waybill, 0) + 1
+            append_index(self.folder(shard), waybill, filename)
+
+    def lookup(self, waybill: str) -> List[str]:
+        """
+        查找运单号的全部文件，只读索引，不列出图片目录
+        Args:
+            waybill: 运单号
+        Returns:
+            list: 仍然存在的文件路径
+        """
+        if self.mode == SHARD_DATE:
+            # 日期分片无法由运单号推出，逐个读取各分片的索引
+            try:
+                shards = [name for name in os.listdir(self.success_folder)
+                          if os.path.isfile(os.path.join(self.success_folder, name, INDEX_FILENAME))]
+            except OSError:
+                shards = []
+        else:
+            shards = [self.shard_for(waybill)]
+
+        paths = []
+        for shard in shards:
+            folder = os.path.join(self.success_folder, shard) if shard else self.success_folder
+            for indexed_waybill, filename in read_index(folder):
+                path = os.path.join(folder, filename)
+                # 重新判定移走的文件在索引中留有旧记录
+                if indexed_waybill == waybill and path not in paths and os.path.exists(path):
+                    paths.append(path)
+        return paths
+
+    def _load(self, shard: str) -> Dict[str, int]:
+        """加载分片索引中的运单号计数（调用方持有锁）"""
+        counts = self._counts.get(shard)
+        if counts is None:
+            counts = {}
+            folder = os.path.join(self.success_folder, shard) if shard else self.success_folder
+            for waybill, _ in read_index(folder):
+                counts[waybill] = counts.get(waybill, 0) + 1
+            self._counts[shard] = counts
+        return counts
+
+def append_index(folder: str, waybill: str, filename: str) -> None:
+    """
+    在分片索引中追加一条记录
+    Args:
+        folder: 分片文件夹
+        waybill: 运单号
+        filename: 分片中的文件名
+    """
+    try:
+        with open(os.path.join(folder, INDEX_FILENAME), 'a', encoding='utf-8') as f:
+            f.write(f"{waybill}\t{filename}\n")
+    except OSError as e:
+        logger.error(f"写入分片索引失败 {folder}: {str(e)}")
+
+def read_index(folder: str) -> List[tuple]:
+    """
+    读取分片索引
+    Args:
+        folder: 分片文件夹
+    Returns:
+        list: (运单号, 文件名) 列表，索引不存在时为空
+    """
+    entries = []
+    try:
+        with open(os.path.join(folder, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 2:
+                    entries.append((parts[0], parts[1]))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"读取分片索引失败 {folder}: {str(e)}")
+    return entries
@@ -0,0 +1,91 @@
+import os
+import hashlib
+import logging
+import tempfile
+from PIL import Image, ImageOps
+from .config import get_config_path
+
+logger = logging.getLogger(__name__)
+
+class ThumbnailCache:
+    """
+    缩略图磁盘缓存
+    JPEG 使用 draft 模式在解码时直接按 1/2、1/4、1/8 缩小，不解码全分辨率像素；
+    按EXIF方向旋正，与识别时 OpenCV 读取的方向一致，相对坐标可直接用于原图。
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = 2000, quality: int = 85):
+        """
+        Args:
+            cache_dir: 缓存文件夹，为None时使用配置文件旁的 thumbnails 文件夹
+            max_entries: 缓存文件数上限，超出时删除最早的
+            quality: 缩略图JPEG质量
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(get_config_path()), 'thumbnails')
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            # 程序目录不可写时改用临时目录
+            cache_dir = os.path.join(tempfile.gettempdir(), 'waybill_thumbnails')
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.quality = quality
+        self._prune()
+
+    def cache_path(self, image_path: str, max_side: int) -> str:
+        """
+        缩略图缓存路径，原图修改后自动失效
+        Args:
+            image_path: 原图路径
+            max_side: 缩略图长边上限
+        Returns:
+            str: 缓存文件路径
+        """
+        stat = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{max_side}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.jpg")
+
+    def get(self, image_path: str, max_side: int) -> str:
+        """
+        获取缩略图，缓存中没有时生成
+        Args:
+            image_path: 原图路径
+            max_side: 缩略图长边上限
+        Returns:
+            str: 缩略图文件路径
+        """
+        path = self.cache_path(image_path, max_side)
+        if os.path.exists(path):
+            return path
+
+        with Image.open(image_path) as image:
+            image.draft('RGB', (max_side, max_side))
+            thumb = ImageOps.exif_transpose(image)
+            thumb.thumbnail((max_side, max_side))
+            if thumb.mode != 'RGB':
+                thumb = thumb.convert('RGB')
+
+            # 先写临时文件再改名，避免并发读取到不完整的文件
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            thumb.save(temp_path, 'JPEG', quality=self.quality)
+            os.replace(temp_path, path)
+        return path
+
+    def _prune(self) -> None:
+        """缓存文件超出上限时删除最早的"""
+        try:
+            entries = [
+                os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                if name.endswith('.jpg')
+            ]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:len(entries) - self.max_entries]:
+                os.remove(path)
+        except Exception as e:
+            logger.warning(f"清理缩略图缓存失败: {str(e)}")
@@ -0,0 +1,231 @@
+import os
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+import cv2
+import numpy as np
+from .config import get_transcode_config
+from .fileops import move_numbered
+
+logger = logging.getLogger(__name__)
+
+# 输出格式 -> (扩展名, 质量参数)
+FORMATS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY)
+}
+
+# 转码期间原图暂存的子文件夹（位于目标文件夹中，按电脑分开），保留的原图转码完成后移入 originals
+STAGING_FOLDER = '.transcoding'
+ORIGINALS_FOLDER = 'originals'
+
+class Transcoder:
+    """
+    归档压缩：成功的回单移入 success 后，在后台线程池中按设定的最大边长、质量和格式重新编码
+    （OpenCV 编解码时释放GIL，不阻塞识别）。原图先暂存，新文件写完再原子替换到目标路径；
+    转码完成后按需把原图移入 originals 文件夹，否则删除。
+    程序中断后暂存区留下的原图由 recover 处理：已转码的清理原图，未转码的放回 success
+    """
+
+    def __init__(self, target_folder: str, image_format: str = 'jpeg', max_side: int = 2000, quality: int = 80,
+                 grayscale: bool = False, keep_original: bool = False, workers: int = 2):
+        """
+        Args:
+            target_folder: 目标文件夹，原图暂存或保留在其中
+            image_format: 输出格式，jpeg / webp
+            max_side: 长边上限（像素），0 表示不缩小
+            quality: 编码质量（1~100）
+            grayscale: 是否转为灰度
+            keep_original: 是否保留原图
+            workers: 转码线程数
+        """
+        if image_format not in FORMATS:
+            raise ValueError(f"未知的转码格式: {image_format}")
+        self.ext, quality_flag = FORMATS[image_format]
+        self.params = [quality_flag, max(1, min(100, int(quality)))]
+        self.max_side = int(max_side)
+        self.grayscale = grayscale
+        self.keep_original = keep_original
+        # 多台电脑写入同一目标文件夹时各用自己的暂存区，恢复时不会动其他电脑正在转码的原图
+        self.holding_folder = os.path.join(target_folder, STAGING_FOLDER, socket.gethostname())
+        self.originals_folder = os.path.join(target_folder, ORIGINALS_FOLDER)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="transcode")
+        self._lock = threading.Lock()
+        self.files = 0
+        self.failed = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    @classmethod
+    def from_config(cls, target_folder: str, config: Dict[str, Any] = None) -> Optional['Transcoder']:
+        """
+        根据配置文件 transcode 段创建
+        Returns:
+            Transcoder: 转码器，未启用或配置无效时返回None
+        """
+        transcode_config = get_transcode_config(config)
+        if not transcode_config['enabled']:
+            return None
+        try:
+            return cls(
+                target_folder,
+                image_format=transcode_config['format'],
+                max_side=transcode_config['max_side'],
+                quality=transcode_config['quality'],
+                grayscale=transcode_config['grayscale'],
+                keep_original=transcode_config['keep_original'],
+                workers=transcode_config['workers']
+            )
+        except Exception as e:
+            logger.error(f"归档压缩配置无效: {str(e)}")
+            return None
+
+    def submit(self, source_path: str, target_path: str, success_folder: str,
+               on_done: Callable[[str], None] = None) -> str:
+        """
+        暂存原图并提交转码，原图立即离开源文件夹
+        Args:
+            source_path: 源文件夹中的原图
+            target_path: 转码后的文件路径（扩展名为 self.ext）
+            success_folder: success 文件夹，原图按相对路径暂存
+            on_done: 转码完成后在转码线程中调用，参数为最终的文件路径
+        Returns:
+            str: 原图的暂存路径
+        """
+        relative = os.path.relpath(target_path, success_folder)
+        _, original_ext = os.path.splitext(source_path)
+        holding_path = os.path.join(self.holding_folder, os.path.splitext(relative)[0] + original_ext)
+        os.makedirs(os.path.dirname(holding_path), exist_ok=True)
+        os.rename(source_path, holding_path)
+        self._pool.submit(self._run, holding_path, target_path, on_done)
+        return holding_path
+
+    def _encode(self, data: np.ndarray) -> bytes:
+        """解码、缩小并重新编码"""
+        flag = cv2.IMREAD_GRAYSCALE if self.grayscale else cv2.IMREAD_COLOR
+        image = cv2.imdecode(data, flag)
+        if image is None:
+            raise ValueError("无法解码原图")
+        height, width = image.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(self.ext, image, self.params)
+        if not ok:
+            raise ValueError(f"编码 {self.ext} 失败")
+        return encoded.tobytes()
+
+    def _run(self, holding_path: str, target_path: str, on_done: Optional[Callable[[str], None]]) -> None:
+        final_path = target_path
+        try:
+            data = np.fromfile(holding_path, dtype=np.uint8)
+            encoded = self._encode(data)
+            # 先写临时文件再替换，中断时不会留下不完整的回单
+            temp_path = target_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(temp_path, target_path)
+            self._finish_original(holding_path)
+            with self._lock:
+                self.files += 1
+                self.bytes_before += data.nbytes
+                self.bytes_after += len(encoded)
+        except Exception as e:
+            logger.error(f"归档压缩失败 {os.path.basename(holding_path)}，保留原图: {str(e)}")
+            final_path = self._restore(holding_path, target_path)
+            with self._lock:
+                self.failed += 1
+
+        if on_done is not None:
+            try:
+                on_done(final_path)
+            except Exception as e:
+                logger.error(f"归档压缩后续处理失败: {str(e)}")
+
+    def _finish_original(self, holding_path: str) -> None:
+        """转码完成后处置暂存的原图：保留时按相对路径移入 originals，否则删除"""
+        if not self.keep_original:
+            os.remove(holding_path)
+            return
+        original_path = os.path.join(self.originals_folder, os.path.relpath(holding_path, self.holding_folder))
+        os.makedirs(os.path.dirname(original_path), exist_ok=True)
+        move_numbered(holding_path, original_path)
+
+    def _restore(self, holding_path: str, target_path: str) -> str:
+        """
+        转码失败或中断时，原图按原扩展名放回 success，与已有文件重名时加序号，并清理占位文件和临时文件
+        Returns:
+            str: 原图的最终路径，放回失败时为暂存路径
+        """
+        final_path = os.path.splitext(target_path)[0] + os.path.splitext(holding_path)[1]
+        for leftover in (target_path + '.tmp', target_path):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+        try:
+            return move_numbered(holding_path, final_path)
+        except OSError as e:
+            logger.error(f"放回原图失败 {holding_path}: {str(e)}")
+            return holding_path
+
+    def recover(self, success_folder: str) -> int:
+        """
+        处理本机上次中断后暂存区留下的原图：目标文件已写完的按设置保留或删除原图，
+        否则删除空的占位文件和未写完的临时文件，把原图放回 success
+        Args:
+            success_folder: success 文件夹
+        Returns:
+            int: 放回 success 的原图数
+        """
+        if not os.path.isdir(self.holding_folder):
+            return 0
+        restored = 0
+        for root, _, filenames in os.walk(self.holding_folder):
+            for filename in filenames:
+                holding_path = os.path.join(root, filename)
+                stem = os.path.splitext(os.path.relpath(holding_path, self.holding_folder))[0]
+                # 上次可能使用了另一种输出格式
+                targets = [os.path.join(success_folder, stem + ext) for ext, _ in FORMATS.values()]
+                try:
+                    done = next((path for path in targets if os.path.isfile(path) and os.path.getsize(path) > 0), None)
+                    if done is not None:
+                        self._finish_original(holding_path)
+                        continue
+                    for path in targets:
+                        for leftover in (path + '.tmp', path):
+                            if os.path.exists(leftover):
+                                os.remove(leftover)
+                    final_path = move_numbered(holding_path, os.path.join(success_folder, stem + os.path.splitext(filename)[1]))
+                    restored += 1
+                    logger.warning(f"恢复上次中断时未转码的原图: {final_path}")
+                except OSError as e:
+                    logger.error(f"恢复暂存的原图失败 {holding_path}: {str(e)}")
+        self._remove_empty_folders()
+        return restored
+
+    def close(self) -> None:
+        """等待全部转码完成，清理空的暂存文件夹"""
+        self._pool.shutdown(wait=True)
+        self._remove_empty_folders()
+
+    def _remove_empty_folders(self) -> None:
+        staging_folder = os.path.dirname(self.holding_folder)
+        for root, _, _ in sorted(os.walk(staging_folder), reverse=True):
+            try:
+                os.rmdir(root)
+            except OSError:
+                continue
+
+    def summary(self) -> str:
+        """总结中的一行：文件数、压缩前后大小和节省的比例"""
+        saved = self.bytes_before - self.bytes_after
+        ratio = saved / self.bytes_before if self.bytes_before else 0.0
+        line = (f"{self.files} 张，{self.bytes_before / (1024 * 1024):.1f}MB -> "
+                f"{self.bytes_after / (1024 * 1024):.1f}MB，节省 {saved / (1024 * 1024):.1f}MB（{ratio:.0%}）")
+        if self.failed:
+            line += f"，失败 {self.failed} 张"
+        return line
@@ -0,0 +1,203 @@
+import time
+import logging
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import cv2
+import numpy as np
+from .config import get_triage_config
+
+logger = logging.getLogger(__name__)
+
+class ImageTriage:
+    """
+    图像质量预检
+    在缩略图上计算清晰度（拉普拉斯方差）、对比度、墨迹覆盖率、亮度和尺寸，
+    按批用NumPy向量化计算；明显无法识别的图片直接拒绝，不进入识别阶段。
+    """
+
+    def __init__(self, min_side: int = 300, min_brightness: float = 25, min_contrast: float = 12,
+                 min_ink: float = 0.003, min_sharpness: float = 15, thumb_size: int = 512,
+                 chunk_size: int = 32):
+        """
+        Args:
+            min_side: 原图短边的最小像素数
+            min_brightness: 最低平均亮度（0~255），低于视为过暗
+            min_contrast: 最低对比度（第95与第5百分位亮度之差）
+            min_ink: 最低墨迹覆盖率（暗于中间亮度的像素比例）
+            min_sharpness: 最低清晰度（缩略图拉普拉斯方差）
+            thumb_size: 缩略图长边
+            chunk_size: 每批计算的图片数
+        """
+        self.min_side = min_side
+        self.min_brightness = min_brightness
+        self.min_contrast = min_contrast
+        self.min_ink = min_ink
+        self.min_sharpness = min_sharpness
+        self.thumb_size = thumb_size
+        self.chunk_size = max(1, int(chunk_size))
+        self.rejected_count = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any] = None) -> 'ImageTriage':
+        """根据配置文件 triage 段创建"""
+        triage_config = get_triage_config(config)
+        return cls(
+            min_side=triage_config['min_side'],
+            min_brightness=triage_config['min_brightness'],
+            min_contrast=triage_config['min_contrast'],
+            min_ink=triage_config['min_ink'],
+            min_sharpness=triage_config['min_sharpness'],
+            thumb_size=triage_config['thumb_size'],
+            chunk_size=triage_config['chunk_size']
+        )
+
+    def load_thumbnail(self, image_path: str) -> Tuple[Optional[np.ndarray], Tuple[int, int]]:
+        """
+        解码灰度缩略图
+        JPEG 使用 IMREAD_REDUCED_GRAYSCALE_4 在解码时直接缩小，不解码全分辨率像素；
+        按比例把长边缩到 thumb_size，不拉伸，清晰度和墨迹比例不受宽高比影响
+        Args:
+            image_path: 图片路径
+        Returns:
+            (缩略图, (估算的原图宽, 高))，无法解码时缩略图为None
+        """
+        data = np.fromfile(image_path, dtype=np.uint8)
+        reduced = cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if reduced is None:
+            return None, (0, 0)
+
+        height, width = reduced.shape[:2]
+        scale = self.thumb_size / max(height, width)
+        if scale < 1:
+            thumb = cv2.resize(reduced, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            thumb = reduced
+        return thumb, (width * 4, height * 4)
+
+    def stack_thumbnails(self, thumbs: List[np.ndarray]) -> np.ndarray:
+        """
+        把宽高不同的缩略图放入同一个数组，空出的部分填NaN
+        Args:
+            thumbs: 灰度缩略图，长边不超过 thumb_size
+        Returns:
+            np.ndarray: (N, S, S) 的float32数组
+        """
+        size = max(max(thumb.shape[:2]) for thumb in thumbs)
+        stack = np.full((len(thumbs), size, size), np.nan, dtype=np.float32)
+        for i, thumb in enumerate(thumbs):
+            height, width = thumb.shape[:2]
+            stack[i, :height, :width] = thumb
+        return stack
+
+    def compute_metrics(self, thumbs: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        向量化计算一批缩略图的质量指标
+        Args:
+            thumbs: stack_thumbnails 得到的 (N, S, S) 灰度缩略图，NaN为填充部分
+        Returns:
+            dict: 各指标的长度为N的数组
+        """
+        x = thumbs.astype(np.float32)
+        flat = x.reshape(len(x), -1)
+        valid = ~np.isnan(flat)
+
+        brightness = np.nanmean(flat, axis=1)
+        p5, p95 = np.nanpercentile(flat, [5, 95], axis=1)
+        contrast = p95 - p5
+
+        # 4邻域拉普拉斯，与填充部分相邻的像素为NaN，不计入方差
+        laplacian = (
+            x[:, :-2, 1:-1] + x[:, 2:, 1:-1] + x[:, 1:-1, :-2] + x[:, 1:-1, 2:]
+            - 4 * x[:, 1:-1, 1:-1]
+        )
+        sharpness = np.nan_to_num(np.nanvar(laplacian.reshape(len(x), -1), axis=1))
+
+        # 暗于最亮与最暗中点的像素视为墨迹
+        midpoint = (p5 + p95) / 2
+        ink = (flat < midpoint[:, None]).sum(axis=1) / valid.sum(axis=1)
+
+        return {
+            'brightness': brightness,
+            'contrast': contrast,
+            'sharpness': sharpness,
+            'ink': ink
+        }
+
+    def classify(self, metrics: Dict[str, np.ndarray], sizes: List[Tuple[int, int]]) -> List[Optional[str]]:
+        """
+        根据指标判断每张图片是否应拒绝
+        Args:
+            metrics: compute_metrics 的结果
+            sizes: 每张图片的原图尺寸
+        Returns:
+            list: 每张图片的拒绝原因，可以识别的为None
+        """
+        reasons = []
+        for i, (width, height) in enumerate(sizes):
+            if min(width, height) < self.min_side:
+                reasons.append(f"尺寸过小（{width}x{height}）")
+            elif metrics['brightness'][i] < self.min_brightness:
+                reasons.append(f"过暗（亮度 {metrics['brightness'][i]:.0f}）")
+            elif metrics['contrast'][i] < self.min_contrast:
+                reasons.append(f"空白或对比度过低（对比度 {metrics['contrast'][i]:.0f}）")
+            elif metrics['ink'][i] < self.min_ink:
+                reasons.append(f"空白页（墨迹 {metrics['ink'][i]:.3%}）")
+            elif metrics['sharpness'][i] < self.min_sharpness:
+                reasons.append(f"过于模糊（清晰度 {metrics['sharpness'][i]:.1f}）")
+            else:
+                reasons.append(None)
+        return reasons
+
+    def filter(self, paths: Iterable[str], reject: Callable[[str, str, float], None]) -> Iterator[str]:
+        """
+        按批预检，产出可以识别的图片路径
+        Args:
+            paths: 图片路径序列
+            reject: 拒绝时调用 reject(路径, 原因, 平均每张耗时秒数)
+        Returns:
+            Iterator[str]: 通过预检的图片路径
+        """
+        chunk = []
+        for path in paths:
+            chunk.append(path)
+            if len(chunk) >= self.chunk_size:
+                yield from self._filter_chunk(chunk, reject)
+                chunk = []
+        if chunk:
+            yield from self._filter_chunk(chunk, reject)
+
+    def _filter_chunk(self, chunk: List[str], reject: Callable[[str, str, float], None]) -> List[str]:
+        start = time.perf_counter()
+        passed = []
+        loaded_paths = []
+        thumbs = []
+        sizes = []
+
+        for path in chunk:
+            try:
+                thumb, size = self.load_thumbnail(path)
+            except Exception:
+                thumb = None
+            if thumb is None:
+                # 无法解码的图片交给识别阶段报告具体错误
+                passed.append(path)
+                continue
+            loaded_paths.append(path)
+            thumbs.append(thumb)
+            sizes.append(size)
+
+        if not thumbs:
+            return passed
+
+        reasons = self.classify(self.compute_metrics(self.stack_thumbnails(thumbs)), sizes)
+        elapsed = (time.perf_counter() - start) / len(chunk)
+
+        for path, reason in zip(loaded_paths, reasons):
+            if reason is None:
+                passed.append(path)
+            else:
+                self.rejected_count += 1
+                logger.debug("预检拒绝: %s（%s）", path, reason)
+                reject(path, reason, elapsed)
+
+        return passed
@@ -0,0 +1,224 @@
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from .config import get_config_path, get_index_config
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    id INTEGER PRIMARY KEY,
+    waybill TEXT NOT NULL,
+    waybill_key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    batch TEXT,
+    created REAL NOT NULL,
+    stage TEXT,
+    confidence REAL,
+    sha1 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_receipts_waybill_key ON receipts(waybill_key);
+CREATE INDEX IF NOT EXISTS idx_receipts_path ON receipts(path);
+CREATE INDEX IF NOT EXISTS idx_receipts_sha1 ON receipts(sha1);
+CREATE TABLE IF NOT EXISTS waybill_seq (
+    waybill_key TEXT PRIMARY KEY,
+    last INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_COLUMNS = ('waybill', 'seq', 'path', 'batch', 'created', 'stage', 'confidence', 'sha1')
+
+# 查找方式
+LOOKUP_EXACT = 'exact'
+LOOKUP_PREFIX = 'prefix'
+LOOKUP_FUZZY = 'fuzzy'
+
+def file_sha1(path: str) -> Optional[str]:
+    """计算文件内容的SHA-1，读取失败时返回None"""
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError as e:
+        logger.warning(f"计算文件哈希失败 {path}: {str(e)}")
+        return None
+    return digest.hexdigest()
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    编辑距离，超过 limit 时提前结束并返回 limit + 1
+    Args:
+        a, b: 比较的字符串
+        limit: 关心的最大距离
+    Returns:
+        int: 编辑距离
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class WaybillIndex:
+    """
+    回单索引（SQLite）：每次成功重命名记录运单号、文件路径、批次、时间、识别阶段和内容哈希，
+    支持精确、前缀和模糊查找；同一运单号的重名序号全局分配，不依赖单次处理的计数。
+    运单号按大写比较（Windows 文件名不区分大小写）
+    """
+
+    def __init__(self, path: str, hash_content: bool = True):
+        """
+        Args:
+            path: 数据库文件路径
+            hash_content: 是否记录文件内容的SHA-1
+        """
+        self.path = path
+        self.hash_content = hash_content
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 输出线程和界面线程共用一个连接，由锁串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def open_default(cls, config: Dict[str, Any] = None) -> Optional['WaybillIndex']:
+        """
+        按配置文件 index 段打开索引
+        Returns:
+            WaybillIndex: 索引，未启用或无法打开时返回None
+        """
+        index_config = get_index_config(config)
+        if not index_config['enabled']:
+            return None
+        path = index_config['path']
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(get_config_path()), path)
+        try:
+            return cls(path, index_config['hash_content'])
+        except Exception as e:
+            logger.error(f"打开回单索引失败 {path}: {str(e)}")
+            return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def allocate(self, waybill: str) -> int:
+        """
+        分配运单号的下一个序号（1 表示不加后缀，2 起对应 -2、-3 …）
+        Args:
+            waybill: 运单号
+        Returns:
+            int: 序号
+        """
+        key = waybill.upper()
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.execute('UPDATE waybill_seq SET last = last + 1 WHERE waybill_key = ?', (key,))
+                if cursor.rowcount == 0:
+                    cursor.execute('INSERT INTO waybill_seq (waybill_key, last) VALUES (?, 1)', (key,))
+                seq = cursor.execute('SELECT last FROM waybill_seq WHERE waybill_key = ?', (key,)).fetchone()[0]
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+        return seq
+
+    def add(self, waybill: str, seq: int, path: str, batch: str = None, stage: str = None,
+            confidence: float = None) -> None:
+        """
+        记录一张成功重命名的回单
+        Args:
+            waybill: 运单号
+            seq: allocate 分配的序号
+            path: 重命名后的文件路径
+            batch: 批次（识别记录文件名）
+            stage: 识别阶段
+            confidence: 置信度
+        """
+        sha1 = file_sha1(path) if self.hash_content else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO receipts (waybill, waybill_key, seq, path, batch, created, stage, confidence, sha1) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (waybill, waybill.upper(), seq, os.path.abspath(path), batch, time.time(), stage, confidence, sha1)
+            )
+
+    def relocate(self, old_path: str, new_path: Optional[str], new_waybill: Optional[str]) -> None:
+        """
+        重新判定移动文件后更新索引，new_waybill 为None（移回源文件夹）时删除记录
+        """
+        with self._lock:
+            if new_waybill:
+                self._conn.execute(
+                    'UPDATE receipts SET path = ?, waybill = ?, waybill_key = ? WHERE path = ?',
+                    (os.path.abspath(new_path), new_waybill, new_waybill.upper(), os.path.abspath(old_path))
+                )
+            else:
+                self._conn.execute('DELETE FROM receipts WHERE path = ?', (os.path.abspath(old_path),))
+
+    def lookup(self, query: str, mode: str = LOOKUP_EXACT, limit: int = 50,
+               max_distance: int = 2) -> List[Dict[str, Any]]:
+        """
+        查找回单
+        Args:
+            query: 运单号或其前缀（不区分大小写）
+            mode: exact / prefix / fuzzy
+            limit: 最多返回条数
+            max_distance: 模糊查找允许的编辑距离（识别错字、漏字）
+        Returns:
+            list: 回单记录，模糊查找按距离排序，其余按时间倒序
+        """
+        query = query.strip().upper()
+        if not query:
+            return []
+
+        select = f"SELECT {', '.join(_COLUMNS)} FROM receipts "
+        with self._lock:
+            if mode == LOOKUP_EXACT:
+                rows = self._conn.execute(select + 'WHERE waybill_key = ? ORDER BY created DESC LIMIT ?',
+                                          (query, limit)).fetchall()
+            elif mode == LOOKUP_PREFIX:
+                # 范围条件可以使用索引（LIKE 默认不区分大小写，用不上索引）
+                rows = self._conn.execute(
+                    select + 'WHERE waybill_key >= ? AND waybill_key < ? ORDER BY waybill_key, created DESC LIMIT ?',
+                    (query, query + '\uffff', limit)
+                ).fetchall()
+            elif mode == LOOKUP_FUZZY:
+                # 每个运单号在序号表中只有一行，先按长度缩小范围再算编辑距离
+                waybills = [row[0] for row in self._conn.execute(
+                    'SELECT waybill_key FROM waybill_seq WHERE length(waybill_key) BETWEEN ? AND ?',
+                    (len(query) - max_distance, len(query) + max_distance)
+                )]
+                matches = sorted(
+                    (distance, waybill) for waybill in waybills
+                    for distance in [edit_distance(query, waybill, max_distance)]
+                    if distance <= max_distance
+                )
+                rows = []
+                for _, waybill in matches:
+                    rows.extend(self._conn.execute(select + 'WHERE waybill_key = ? ORDER BY created DESC',
+                                                   (waybill,)).fetchall())
+                    if len(rows) >= limit:
+                        break
+                rows = rows[:limit]
+            else:
+                raise ValueError(f"未知的查找方式: {mode}")
+
+        return [dict(zip(_COLUMNS, row)) for row in rows]
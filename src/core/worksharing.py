@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import random
+import socket
+import logging
+import threading
+from typing import Dict, Any, Iterator, List, Optional
+from .config import get_workshare_config
+from .engine import list_images
+from .fileops import move_exclusive, move_numbered
+
+logger = logging.getLogger(__name__)
+
+# 协同目录，位于共享的源文件夹中
+CLAIMS_FOLDER = '.claims'
+# 各节点处理失败、已交还源文件夹的图片标记，其他节点不再重复识别
+ATTEMPTED_FOLDER = 'attempted'
+LEASE_EXTENSION = '.lease'
+
+def _list_images(folder: str) -> List[str]:
+    """列出图片，文件夹已被其他节点删除时返回空列表"""
+    try:
+        return list_images(folder)
+    except OSError:
+        return []
+
+class WorkShare:
+    """
+    多台电脑共同处理同一个共享源文件夹（SMB/NFS），不依赖外部服务。
+
+    协同完全依靠同一文件系统内 rename 的原子性：
+    - 认领：把图片从源文件夹改名移入 .claims/<节点>/queued，改名失败说明已被其他节点认领
+    - 开始：处理前从 queued 改名移入 active，之后其他节点不会再取走这张图片
+    - 窃取：本节点无图可领时，从积压最多的节点的 queued 取走一半；
+      租约（心跳）过期的节点视为已退出，它 queued 和 active 中的图片全部接管
+    - 交还：未识别的图片移回源文件夹，并在 .claims/attempted 留下标记；
+      标记只在本轮有效，没有其他活跃节点时加入的节点开始新的一轮，清除全部标记
+    每张图片在任一时刻只属于一个节点，不会被重复识别。
+    """
+
+    def __init__(self, inbox: str, node: str = None, config: Dict[str, Any] = None):
+        """
+        Args:
+            inbox: 共享的源文件夹
+            node: 节点名，为None时读取配置，配置为空时使用计算机名
+            config: 配置内容，为None时从配置文件读取
+        """
+        workshare_config = get_workshare_config(config)
+        self.inbox = inbox
+        self.node = node or workshare_config['node'] or socket.gethostname()
+        self.lease_seconds = workshare_config['lease_seconds']
+        self.heartbeat_seconds = workshare_config['heartbeat_seconds']
+        self.claim_batch = max(1, workshare_config['claim_batch'])
+
+        self.claims_folder = os.path.join(inbox, CLAIMS_FOLDER)
+        self.attempted_folder = os.path.join(self.claims_folder, ATTEMPTED_FOLDER)
+        self.node_folder = os.path.join(self.claims_folder, self.node)
+        self.queued_folder = os.path.join(self.node_folder, 'queued')
+        self.active_folder = os.path.join(self.node_folder, 'active')
+        self.lease_path = os.path.join(self.claims_folder, self.node + LEASE_EXTENSION)
+
+        # 打乱本节点的认领顺序，减少多个节点争抢同一张图片
+        self._random = random.Random(f"{self.node}-{os.getpid()}-{time.time()}")
+        self._pending = []
+        self._stop_event = threading.Event()
+        self._heartbeat_thread = None
+        # 心跳线程和读取共享文件夹时间都会重写租约
+        self._lease_lock = threading.Lock()
+        self.claimed_count = 0
+        self.stolen_count = 0
+        self.released_count = 0
+
+    def __enter__(self) -> 'WorkShare':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """加入协同：创建本节点目录、写入租约并开始心跳"""
+        # 没有其他活跃节点时上一轮已结束，上一轮交还的图片（可能已调整规则）本轮重新识别
+        if not self._live_nodes():
+            self._clear_attempted()
+        # 先写租约再创建节点目录，其他节点不会把刚加入的节点当作已退出
+        os.makedirs(self.attempted_folder, exist_ok=True)
+        self._write_lease()
+        os.makedirs(self.queued_folder, exist_ok=True)
+        os.makedirs(self.active_folder, exist_ok=True)
+
+        # 同名节点上次异常退出时留下的图片，重新排队
+        for path in _list_images(self.active_folder):
+            self._move(path, self.queued_folder)
+
+        self._stop_event.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="workshare-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+        logger.info(f"节点 {self.node} 加入协同处理: {self.inbox}")
+
+    def stop(self) -> None:
+        """退出协同：未开始处理的图片交还源文件夹，删除租约"""
+        self._stop_event.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+
+        for path in _list_images(self.queued_folder):
+            self._move(path, self.inbox)
+        for folder in (self.queued_folder, self.active_folder, self.node_folder):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                pass
+        try:
+            os.remove(self.lease_path)
+        except OSError:
+            pass
+        logger.info(f"节点 {self.node} 退出协同处理：认领 {self.claimed_count}，"
+                    f"接管 {self.stolen_count}，交还 {self.released_count}")
+
+    def claims(self) -> Iterator[str]:
+        """
+        逐张认领图片，直到源文件夹和其他节点都没有可领的图片
+        Returns:
+            Iterator[str]: 已进入本节点 active 的图片路径，按需认领（执行器反压时不会多领）
+        """
+        while not self._stop_event.is_set():
+            queued = _list_images(self.queued_folder)
+            if not queued and not self._claim_batch() and not self._steal():
+                break
+            for path in queued or _list_images(self.queued_folder):
+                # 从 queued 改名到 active 失败说明已被其他节点取走
+                active_path = self._move(path, self.active_folder)
+                if active_path is not None:
+                    yield active_path
+
+    def release(self, path: str) -> str:
+        """
+        交还未识别的图片：移回源文件夹并留下标记，其他节点不再重复识别
+        Args:
+            path: 本节点 active 中的图片路径
+        Returns:
+            str: 交还后的路径，移动失败时返回原路径
+        """
+        filename = os.path.basename(path)
+        marker_path = os.path.join(self.attempted_folder, filename)
+        had_marker = os.path.exists(marker_path)
+        try:
+            # 先写标记再移回，其他节点不会在两步之间认领；
+            # 标记的修改时间晚于图片，之后放入的同名新图片仍会被识别
+            with open(marker_path, 'w'):
+                pass
+        except OSError as e:
+            logger.warning(f"写入处理标记失败 {filename}: {str(e)}")
+        returned = self._move(path, self.inbox)
+        if returned is None:
+            return path
+        if os.path.basename(returned) != filename:
+            # 源文件夹中已有同名新图片，交还的图片加了序号：标记改记新名称，同名新图片仍会被识别
+            try:
+                with open(os.path.join(self.attempted_folder, os.path.basename(returned)), 'w'):
+                    pass
+                if not had_marker:
+                    os.remove(marker_path)
+            except OSError as e:
+                logger.warning(f"写入处理标记失败 {os.path.basename(returned)}: {str(e)}")
+        self.released_count += 1
+        return returned
+
+    def _live_nodes(self) -> List[str]:
+        """租约未过期的其他节点"""
+        try:
+            names = os.listdir(self.claims_folder)
+        except OSError:
+            return []
+        nodes = [name[:-len(LEASE_EXTENSION)] for name in names if name.endswith(LEASE_EXTENSION)]
+        return [node for node in nodes if node != self.node and not self._lease_expired(node)]
+
+    def _clear_attempted(self) -> None:
+        """开始新的一轮：删除上一轮的交还标记"""
+        try:
+            names = os.listdir(self.attempted_folder)
+        except OSError:
+            return
+        for name in names:
+            try:
+                os.remove(os.path.join(self.attempted_folder, name))
+            except OSError:
+                pass
+        if names:
+            logger.info(f"开始新一轮协同处理，清除上一轮的 {len(names)} 个交还标记")
+
+    def _claim_batch(self) -> int:
+        """从源文件夹认领一批图片到 queued，返回认领数量"""
+        claimed = 0
+        while claimed < self.claim_batch:
+            if not self._pending:
+                self._pending = self._list_unclaimed()
+                self._random.shuffle(self._pending)
+                if not self._pending:
+                    break
+            path = self._pending.pop()
+            # 列表可能已过时：其他节点处理失败后交还的图片不再认领
+            if self._attempted(path):
+                continue
+            if self._move(path, self.queued_folder) is not None:
+                claimed += 1
+        self.claimed_count += claimed
+        return claimed
+
+    def _list_unclaimed(self) -> List[str]:
+        """列出源文件夹中尚未被任何节点处理过的图片"""
+        try:
+            attempted = set(os.listdir(self.attempted_folder))
+        except OSError:
+            attempted = set()
+
+        return [
+            path for path in _list_images(self.inbox)
+            if os.path.basename(path) not in attempted or not self._attempted(path)
+        ]
+
+    def _attempted(self, path: str) -> bool:
+        """图片已被某个节点处理失败并交还（标记晚于图片），或已不存在"""
+        try:
+            marker = os.path.join(self.attempted_folder, os.path.basename(path))
+            return os.path.getmtime(path) <= os.path.getmtime(marker)
+        except FileNotFoundError as e:
+            return e.filename == path
+        except OSError:
+            return True
+
+    def _steal(self) -> int:
+        """
+        从其他节点取走图片：租约过期的节点全部接管，活跃节点取走 queued 中的一半
+        Returns:
+            int: 取走的数量
+        """
+        busiest = None
+        busiest_queued = []
+        for node in self._other_nodes():
+            node_folder = os.path.join(self.claims_folder, node)
+            queued = _list_images(os.path.join(node_folder, 'queued'))
+            if self._lease_expired(node):
+                active = _list_images(os.path.join(node_folder, 'active'))
+                stolen = self._take(queued + active)
+                self._remove_node(node)
+                if stolen:
+                    logger.warning(f"节点 {node} 租约已过期，接管其 {stolen} 张图片")
+                    return stolen
+            elif len(queued) > len(busiest_queued):
+                busiest, busiest_queued = node, queued
+
+        if len(busiest_queued) < 2:
+            return 0
+        stolen = self._take(busiest_queued[len(busiest_queued) // 2:])
+        if stolen:
+            logger.info(f"从节点 {busiest} 取走 {stolen} 张待处理图片")
+        return stolen
+
+    def _take(self, paths: List[str]) -> int:
+        """把其他节点的图片移入本节点 queued"""
+        taken = sum(1 for path in paths if self._move(path, self.queued_folder) is not None)
+        self.stolen_count += taken
+        return taken
+
+    def _other_nodes(self) -> List[str]:
+        """协同目录中的其他节点"""
+        try:
+            names = os.listdir(self.claims_folder)
+        except OSError:
+            return []
+        return [
+            name for name in names
+            if name not in (self.node, ATTEMPTED_FOLDER)
+            and os.path.isdir(os.path.join(self.claims_folder, name))
+        ]
+
+    def _remove_node(self, node: str) -> None:
+        """清理已退出节点的空目录和租约"""
+        node_folder = os.path.join(self.claims_folder, node)
+        for folder in (os.path.join(node_folder, 'queued'), os.path.join(node_folder, 'active'), node_folder):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                return
+        try:
+            os.remove(os.path.join(self.claims_folder, node + LEASE_EXTENSION))
+        except OSError:
+            pass
+
+    def _lease_expired(self, node: str) -> bool:
+        """
+        节点的心跳超过租约时间未更新（或租约文件已不存在）
+        比较的是共享文件夹所在服务器记录的修改时间，各电脑的时钟不一致不影响判断
+        """
+        lease_path = os.path.join(self.claims_folder, node + LEASE_EXTENSION)
+        try:
+            heartbeat = os.stat(lease_path).st_mtime
+        except OSError:
+            return True
+        return self._share_time() - heartbeat > self.lease_seconds
+
+    def _share_time(self) -> float:
+        """共享文件夹的当前时间：刷新本节点的租约（也是一次心跳），取其修改时间"""
+        try:
+            self._write_lease()
+            return os.stat(self.lease_path).st_mtime
+        except OSError as e:
+            logger.warning(f"读取共享文件夹时间失败，改用本机时间: {str(e)}")
+            return time.time()
+
+    def _write_lease(self) -> None:
+        """写入租约，先写临时文件再替换，其他节点不会读到半个文件"""
+        lease = {
+            'node': self.node,
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'heartbeat': time.time()
+        }
+        temp_path = self.lease_path + '.tmp'
+        with self._lease_lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(lease, f)
+            os.replace(temp_path, self.lease_path)
+
+    def _heartbeat(self) -> None:
+        """后台定时刷新租约"""
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            try:
+                self._write_lease()
+            except OSError as e:
+                logger.warning(f"刷新租约失败: {str(e)}")
+
+    @staticmethod
+    def _move(path: str, folder: str) -> Optional[str]:
+        """
+        原子地把文件移入文件夹，不覆盖已有文件：
+        文件夹中已有同名文件（如扫描仪刚放入的新图片）时加 -2、-3 … 后缀
+        Returns:
+            str: 新路径，文件已被其他节点移走时返回None
+        """
+        target_path = os.path.join(folder, os.path.basename(path))
+        try:
+            move_exclusive(path, target_path)
+        except FileExistsError:
+            try:
+                return move_numbered(path, target_path)
+            except OSError:
+                return None
+        except OSError:
+            return None
+        return target_path
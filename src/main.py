@@ -2,165 +2,25 @@ import sys
 import os
 import logging
 import json
+import argparse
+import multiprocessing
+from datetime import datetime
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QThread, pyqtSignal
 from ui.main_window import MainWindow
-from core.scanner import WaybillScanner
-from datetime import datetime
+from core.config import DEFAULT_PIPELINE_CONFIG, DEFAULT_RULES_CONFIG, DEFAULT_TENCENT_CONFIG, get_rules_config
+from core.log import setup_logging
+from core.profiles import PROFILES, PROFILE_ESCALATED
 
 logger = logging.getLogger(__name__)
 
-class ProcessThread(QThread):
-    """处理线程"""
-    progress_updated = pyqtSignal(int, int, str)  # 进度更新信号
-    process_finished = pyqtSignal(int, int)  # 处理完成信号
-    
-    def __init__(self, source_folder, target_folder, scanner_options):
-        super().__init__()
-        self.source_folder = source_folder
-        self.target_folder = target_folder
-        self.success_folder = os.path.join(target_folder, 'success')  # 添加成功文件夹路径
-        self.scanner_options = scanner_options
-        self.scanner = None  # 初始化时不创建scanner实例
-        
-    def prepare_folders(self):
-        """准备目标文件夹结构"""
-        try:
-            # 确保目标文件夹存在
-            os.makedirs(self.target_folder, exist_ok=True)
-            # 确保success子文件夹存在
-            os.makedirs(self.success_folder, exist_ok=True)
-            logger.info(f"创建目标文件夹结构: {self.target_folder}")
-        except Exception as e:
-            logger.error(f"创建文件夹失败: {str(e)}")
-            raise
-
-    def generate_summary(self, target_folder: str, results: list) -> None:
-        """
-        生成处理总结并保存到文件
-        Args:
-            target_folder: 目标文件夹路径
-            results: 处理结果列表，每项格式为 (状态, 原文件名, 新文件名, 原因)
-        """
-        try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            summary_path = os.path.join(target_folder, "处理总结.txt")
-            
-            success_count = sum(1 for r in results if r[0] == "成功")
-            fail_count = sum(1 for r in results if r[0] == "失败")
-            total_count = len(results)
-            
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                # 写入标题
-                f.write(f"处理时间：{current_time}\n")
-                f.write("-" * 40 + "\n")
-                
-                # 写入详细结果
-                for status, old_name, new_name, reason in sorted(results):
-                    if status == "成功":
-                        f.write(f"成功 - {old_name} -> {new_name}\n")
-                    else:
-                        f.write(f"失败 - {old_name} ({reason})\n")
-                
-                # 写入统计信息
-                f.write("-" * 40 + "\n")
-                f.write("处理完成！\n")
-                f.write(f"总数：{total_count}\n")
-                f.write(f"成功：{success_count}\n")
-                f.write(f"失败：{fail_count}\n")
-                
-            logger.info(f"处理总结已保存到：{summary_path}")
-            
-        except Exception as e:
-            logger.error(f"生成处理总结失败: {str(e)}")
-
-    def run(self):
-        try:
-            self.scanner = WaybillScanner()
-            logger.info("开始处理图片...")
-            
-            # 准备文件夹
-            self.prepare_folders()
-            
-            # 获取所有图片文件
-            image_files = [f for f in os.listdir(self.source_folder) 
-                          if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-            total = len(image_files)
-            success_count = 0
-            fail_count = 0
-            
-            # 存储处理结果
-            results = []
-            
-            logger.info(f"找到 {total} 个图片文件")
-            
-            for idx, filename in enumerate(image_files, 1):
-                try:
-                    file_path = os.path.join(self.source_folder, filename)
-                    logger.debug(f"处理文件: {filename}")
-                    
-                    # 识别运单号
-                    waybill_number = self.scanner.scan_single(file_path, self.scanner_options)
-                    logger.debug(f"识别结果: {waybill_number}")
-                    
-                    if waybill_number:
-                        # 获取文件扩展名
-                        _, ext = os.path.splitext(filename)
-                        # 新文件名
-                        new_filename = f"{waybill_number}{ext}"
-                        # 移动到success子文件夹
-                        new_path = os.path.join(self.success_folder, new_filename)
-                        
-                        # 移动并重命名文件
-                        os.rename(file_path, new_path)
-                        success_count += 1
-                        logger.info(f"成功处理文件: {filename} -> {new_filename}")
-                        
-                        # 记录成功结果
-                        results.append(("成功", filename, new_filename, ""))
-                    else:
-                        fail_count += 1
-                        logger.warning(f"未能识别运单号: {filename}")
-                        
-                        # 记录失败结果
-                        results.append(("失败", filename, "", "未识别到运单号"))
-                    
-                    # 发送进度信号
-                    self.progress_updated.emit(idx, total, filename)
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"处理文件 {filename} 时出错: {error_msg}")
-                    fail_count += 1
-                    # 记录失败结果
-                    results.append(("失败", filename, "", f"处理出错: {error_msg}"))
-            
-            # 生成处理总结
-            self.generate_summary(self.target_folder, results)
-            
-            # 发送完成信号
-            logger.info(f"处理完成: 成功 {success_count}, 失败 {fail_count}")
-            self.process_finished.emit(success_count, fail_count)
-                
-        except Exception as e:
-            logger.error(f"处理线程运行失败: {str(e)}")
-            self.process_finished.emit(0, 0)
-
-def setup_logging():
-    """设置日志"""
-    # 完全禁用日志输出
-    logging.getLogger().setLevel(logging.CRITICAL)
-
 def check_config():
     """检查配置文件"""
     config_path = 'config.json'
     if not os.path.exists(config_path):
         default_config = {
-            "tencent_ocr": {
-                "enabled": False,
-                "secret_id": "",
-                "secret_key": ""
-            }
+            "tencent_ocr": DEFAULT_TENCENT_CONFIG,
+            "pipeline": DEFAULT_PIPELINE_CONFIG,
+            "rules": DEFAULT_RULES_CONFIG
         }
         try:
             with open(config_path, 'w', encoding='utf-8') as f:
@@ -168,16 +28,230 @@ def check_config():
         except Exception as e:
             logger.error(f"创建配置文件失败: {str(e)}")
 
+def parse_args():
+    """解析命令行参数，未识别的参数留给Qt"""
+    parser = argparse.ArgumentParser(description="回单整理器")
+    parser.add_argument('--daemon', action='store_true', help="以守护进程模式运行，通过本地API接收识别任务")
+    parser.add_argument('--port', type=int, help="守护进程HTTP端口，默认读取config.json")
+    parser.add_argument('--reevaluate', metavar='RECORD', help="按新规则重新判定识别记录（recognition_*.jsonl.gz），不调用识别引擎")
+    parser.add_argument('--prefix', help="命令行处理使用的起始字符")
+    parser.add_argument('--suffix', help="命令行处理使用的结束字符")
+    parser.add_argument('--min-length', type=int, help="命令行处理使用的最小长度")
+    parser.add_argument('--max-length', type=int, help="命令行处理使用的最大长度")
+    parser.add_argument('--charset', help="命令行处理允许的字符")
+    parser.add_argument('--carriers', action='store_true',
+                        help="按 config.json rules 段的多承运商规则识别，结果按承运商分文件夹")
+    parser.add_argument('--manifest', metavar='FILE',
+                        help="预期运单清单（CSV/文本），命中清单的识别结果直接采用，处理结束后生成清单对账")
+    parser.add_argument('--reconcile', metavar='MANIFEST',
+                        help="按回单索引核对运单清单，列出已收到和缺失的回单")
+    parser.add_argument('--apply', action='store_true', help="执行重新判定得到的重命名，默认只列出计划")
+    parser.add_argument('--reprocess', nargs=2, metavar=('SOURCE', 'TARGET'),
+                        help="用增强档位处理上次留在源文件夹中的图片，沿用目标文件夹中上次的运单号规则")
+    parser.add_argument('--profile', default=PROFILE_ESCALATED, choices=list(PROFILES),
+                        help="--reprocess 使用的识别档位，默认 escalated")
+    parser.add_argument('--autotune', metavar='SOURCE',
+                        help="在源文件夹的样本上实测并发数、解码比例和Tesseract配置数，把最优设置写入config.json")
+    parser.add_argument('--estimate', metavar='SOURCE',
+                        help="抽样试处理源文件夹（不移动文件），预估整批的识别率、各阶段命中率、耗时和腾讯云OCR调用次数")
+    parser.add_argument('--sample', type=int, help="--autotune / --estimate 抽取的样本数，默认读取config.json")
+    parser.add_argument('--no-save', action='store_true', help="--autotune 只输出结果，不写入配置文件")
+    parser.add_argument('--shared', nargs=2, metavar=('SOURCE', 'TARGET'),
+                        help="与其他电脑共同处理网络共享的源文件夹，按文件认领，不重复识别")
+    parser.add_argument('--node', help="--shared 使用的节点名，默认读取config.json，为空时使用计算机名")
+    args, qt_args = parser.parse_known_args()
+    return args, [sys.argv[0]] + qt_args
+
+def rule_overrides(args):
+    """命令行中指定的运单号规则"""
+    overrides = {
+        'prefix': args.prefix,
+        'suffix': args.suffix,
+        'min_length': args.min_length,
+        'max_length': args.max_length,
+        'charset': args.charset
+    }
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+    if args.carriers:
+        overrides['rule_profiles'] = get_rules_config()['profiles']
+    elif overrides:
+        # 指定了单一规则时不再沿用上次的多承运商规则
+        overrides['rule_profiles'] = None
+    if args.manifest:
+        overrides['manifest'] = os.path.abspath(args.manifest)
+    return overrides
+
+def run_reevaluate(args):
+    """按新规则重新判定识别记录，并列出或执行重命名"""
+    from core.recognition_store import reevaluate, apply_plan
+    
+    plans = reevaluate(args.reevaluate, rule_overrides(args))
+    for plan in plans:
+        print(f"{plan.old_waybill or '未识别'} -> {plan.new_waybill or '未识别'}: {plan.current_path} -> {plan.new_path}")
+    print(f"共 {len(plans)} 个文件需要移动")
+    
+    if args.apply and plans:
+        moved = apply_plan(args.reevaluate, plans)
+        print(f"已移动 {moved} 个文件")
+    return 0
+
+def run_reprocess(args):
+    """用增强档位处理源文件夹中剩余的图片"""
+    from core.config import DEFAULT_SCAN_OPTIONS
+    from core.engine import BatchEngine
+    from core.profiles import apply_profile
+    from core.recognition_store import latest_batch_options
+    from core.report import STATUS_SUCCESS
+    from core.scanner import WaybillScanner
+    
+    source_folder, target_folder = args.reprocess
+    
+    # 沿用上次处理的运单号规则
+    options = dict(DEFAULT_SCAN_OPTIONS)
+    options.update(latest_batch_options(target_folder) or {})
+    options = apply_profile(options, args.profile)
+    
+    scanner = WaybillScanner()
+    scanner.start_batch()
+    engine = BatchEngine(scanner, options)
+    name_suffix = f"_{args.profile}_{datetime.now().strftime('%H%M%S')}"
+    
+    success = fail = 0
+    for result in engine.process(source_folder, target_folder, name_suffix=name_suffix):
+        if result.status == STATUS_SUCCESS:
+            success += 1
+            print(f"成功 - {result.filename} -> {os.path.basename(result.output_path)}")
+        else:
+            fail += 1
+    print(f"处理完成：成功 {success}，失败 {fail}")
+    return 0
+
+def run_shared(args):
+    """与其他电脑共同处理共享的源文件夹"""
+    from core.config import DEFAULT_SCAN_OPTIONS
+    from core.engine import BatchEngine, BatchOutput
+    from core.recognition_store import latest_batch_options
+    from core.report import STATUS_SUCCESS
+    from core.scanner import WaybillScanner
+    from core.worksharing import WorkShare
+    
+    source_folder, target_folder = args.shared
+    
+    # 沿用目标文件夹中上次处理的运单号规则，命令行指定的规则优先
+    options = dict(DEFAULT_SCAN_OPTIONS)
+    options.update(latest_batch_options(target_folder) or {})
+    options.update(rule_overrides(args))
+    
+    scanner = WaybillScanner()
+    scanner.start_batch()
+    engine = BatchEngine(scanner, options)
+    share = WorkShare(source_folder, args.node)
+    output = BatchOutput(target_folder, source_folder, options, f"_{share.node}", release=share.release)
+    
+    success = fail = 0
+    try:
+        with share:
+            for result in engine.iter_results(share.claims(), output):
+                if result.status == STATUS_SUCCESS:
+                    success += 1
+                    print(f"成功 - {result.filename} -> {os.path.basename(result.output_path)}")
+                else:
+                    fail += 1
+    finally:
+        output.close()
+    print(f"节点 {share.node} 处理完成：成功 {success}，失败 {fail}")
+    return 0
+
+def run_autotune(args):
+    """在源文件夹样本上自动调优，并写入配置文件"""
+    from core.autotune import Autotuner, save_tuning
+    
+    # 按命令行给出的运单号规则计算识别率
+    tuner = Autotuner(args.autotune, rule_overrides(args))
+    settings = tuner.tune(args.sample)
+    for trial in tuner.trials:
+        print(trial.describe())
+    if settings is None:
+        print("调优失败：没有可用的测试结果")
+        return 1
+    
+    print(f"最优设置: {settings}")
+    if not args.no_save:
+        print(f"已写入 {save_tuning(settings)}")
+    return 0
+
+def run_estimate(args):
+    """抽样预估整批处理的结果和耗时"""
+    from core.estimate import BatchEstimator
+    
+    estimate = BatchEstimator(args.estimate, rule_overrides(args)).run(args.sample)
+    if estimate is None:
+        print("源文件夹中没有图片")
+        return 1
+    for line in estimate.describe():
+        print(line)
+    return 0
+
+def run_reconcile(args):
+    """按回单索引核对运单清单，报告写在清单旁边"""
+    from core.manifest import Manifest, write_reconciliation, RECEIVED, MISSING
+    from core.waybill_index import WaybillIndex
+    
+    manifest = Manifest.load(args.reconcile)
+    index = WaybillIndex.open_default()
+    if index is None:
+        print("回单索引未启用，无法对账")
+        return 1
+    
+    name, _ = os.path.splitext(args.reconcile)
+    report_path = f"{name}_对账.csv"
+    try:
+        counts = write_reconciliation(report_path, manifest, {}, index)
+    finally:
+        index.close()
+    print(f"应到 {len(manifest)}，已到 {counts[RECEIVED]}，缺失 {counts[MISSING]}")
+    print(f"对账报告: {report_path}")
+    return 0
+
 def main():
     """主函数"""
-    setup_logging()
     check_config()
     
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args()
+    
+    # 异步写入滚动日志文件；命令行和守护进程模式同时在控制台输出警告
+    setup_logging(console=bool(args.reevaluate or args.reprocess or args.autotune or args.shared or args.reconcile
+                               or args.estimate or args.daemon))
+    
+    if args.reevaluate:
+        sys.exit(run_reevaluate(args))
+    
+    if args.reprocess:
+        sys.exit(run_reprocess(args))
+    
+    if args.autotune:
+        sys.exit(run_autotune(args))
+    
+    if args.estimate:
+        sys.exit(run_estimate(args))
+    
+    if args.shared:
+        sys.exit(run_shared(args))
+    
+    if args.reconcile:
+        sys.exit(run_reconcile(args))
+    
+    if args.daemon:
+        from core.daemon import run_daemon
+        sys.exit(run_daemon(args.port))
+    
+    app = QApplication(qt_args)
     window = MainWindow()
     window.show()
     
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # 打包后的程序使用多进程执行器时需要
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
@@ -2,254 +2,112 @@ import os
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QLineEdit, QCheckBox, QProgressBar, QFileDialog, QGroupBox, QSpinBox,
-    QDialog, QDialogButtonBox, QMessageBox, QApplication
+    QDialog, QMessageBox, QComboBox, QListWidget, QListWidgetItem
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
-from PyQt6.QtGui import QPixmap, QPainter, QColor, QPen
+from PyQt6.QtCore import Qt, pyqtSignal, QThread, QUrl
+from PyQt6.QtGui import QDesktopServices
 import logging
-from datetime import datetime
 import json
+from datetime import datetime
+from core.config import get_rules_config
 from core.scanner import WaybillScanner
+from core.engine import BatchEngine, BatchOutput, list_images
+from core.estimate import BatchEstimator
+from core.profiles import escalate_options
+from core.worksharing import WorkShare
+from core.sharding import ShardLayout
+from core.waybill_index import WaybillIndex, LOOKUP_EXACT, LOOKUP_PREFIX, LOOKUP_FUZZY
+from ui.region_dialog import RegionSelectDialog, sample_images
+from ui.results_view import ResultsView
 import sys
+import string
 
 logger = logging.getLogger(__name__)
 
 class ProcessThread(QThread):
     """处理线程"""
     progress_updated = pyqtSignal(int, int, str)  # 进度更新信号
-    process_finished = pyqtSignal(int, int)  # 处理完成信号
+    result_ready = pyqtSignal(object)  # 单张图片处理完成信号（ImageResult）
+    process_finished = pyqtSignal(int, int, int)  # 处理完成信号（成功、失败、预检拒绝）
     
-    def __init__(self, source_folder, target_folder, options):
+    def __init__(self, source_folder, target_folder, options, scanner=None, paths=None, name_suffix='', shared=False):
         super().__init__()
         self.source_folder = source_folder
         self.target_folder = target_folder
-        self.success_folder = os.path.join(target_folder, 'success')  # 成功文件夹路径
         self.options = options
-        self.scanner = None
-    
-    def prepare_folders(self):
-        """准备目标文件夹结构"""
-        try:
-            # 确保目标件夹存在
-            os.makedirs(self.target_folder, exist_ok=True)
-            # 确保success子文件夹存在
-            os.makedirs(self.success_folder, exist_ok=True)
-            logger.info(f"创建目标文件夹结构: {self.target_folder}")
-        except Exception as e:
-            logger.error(f"创建文件夹失败: {str(e)}")
-            raise
-
-    def generate_summary(self, results: list) -> None:
-        """
-        生成处理总结并保存到文件
-        Args:
-            results: 处理结果列表，每项格式为 (状态, 原文件名, 新文件名, 原因)
-        """
-        try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            summary_path = os.path.join(self.target_folder, "处理总结.txt")
-            
-            success_count = sum(1 for r in results if r[0] == "成功")
-            fail_count = sum(1 for r in results if r[0] == "失败")
-            total_count = len(results)
-            
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                # 写入标题和时间
-                f.write(f"处理时间：{current_time}\n")
-                f.write("-" * 40 + "\n")
-                
-                # 写入详细结果
-                for status, old_name, new_name, reason in sorted(results):
-                    if status == "成功":
-                        f.write(f"成功 - {old_name} -> {new_name}\n")
-                    else:
-                        f.write(f"失败 - {old_name} ({reason})\n")
-                
-                # 写入统计信息
-                f.write("-" * 40 + "\n")
-                f.write("处理完成！\n")
-                f.write(f"总数：{total_count}\n")
-                f.write(f"成功：{success_count}\n")
-                f.write(f"失败：{fail_count}\n")
-                
-            logger.info(f"处理总结已保存到：{summary_path}")
-            
-        except Exception as e:
-            logger.error(f"生成处理总结失败: {str(e)}")
+        self.scanner = scanner  # 由主窗口传入的常驻扫描器，为空时在线程中创建
+        self.paths = paths  # 指定要处理的图片，为空时处理源文件夹中的全部图片
+        self.name_suffix = name_suffix  # 处理明细和总结文件名的后缀
+        self.shared = shared  # 与其他电脑共同处理共享的源文件夹
 
     def run(self):
         try:
-            self.scanner = WaybillScanner()
+            if self.scanner is None:
+                self.scanner = WaybillScanner()
+            self.scanner.start_batch()
             logger.info("开始处理图片...")
             
-            # 准备文件夹
-            self.prepare_folders()
-            
             # 获取所有图片文件
-            image_files = [f for f in os.listdir(self.source_folder) 
-                          if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+            image_files = self.paths if self.paths is not None else list_images(self.source_folder)
             total = len(image_files)
-            success_count = 0
-            fail_count = 0
-            
-            # 存储处理结果
-            results = []
-            
             logger.info(f"找到 {total} 个图片文件")
             
-            # 用于记录运单号出现次数
-            waybill_count = {}
+            # 多机协同：逐张从共享源文件夹认领，失败的图片交还源文件夹；总数只是开始时的估计
+            share = WorkShare(self.source_folder) if self.shared else None
+            name_suffix = self.name_suffix
+            if share is not None and not name_suffix:
+                # 各电脑的处理明细分开写入同一目标文件夹
+                name_suffix = f"_{share.node}"
             
-            for idx, filename in enumerate(image_files, 1):
-                try:
-                    file_path = os.path.join(self.source_folder, filename)
-                    logger.debug(f"处理文件: {filename}")
-                    
-                    # 识别运单号
-                    waybill_number = self.scanner.scan_single(file_path, self.options)
-                    logger.debug(f"识别结果: {waybill_number}")
-                    
-                    if waybill_number:
-                        # 获取文件扩展名
-                        _, ext = os.path.splitext(filename)
-                        
-                        # 更新运单号计数
-                        if waybill_number in waybill_count:
-                            waybill_count[waybill_number] += 1
-                            new_filename = f"{waybill_number}-{waybill_count[waybill_number]}{ext}"
-                        else:
-                            waybill_count[waybill_number] = 1
-                            new_filename = f"{waybill_number}{ext}"
-                        
-                        # 移动到success子文件夹
-                        new_path = os.path.join(self.success_folder, new_filename)
-                        
-                        # 移动并重命名文件
-                        os.rename(file_path, new_path)
-                        success_count += 1
-                        logger.info(f"成功处理文件: {filename} -> {new_filename}")
-                        
-                        # 记录成功结果
-                        results.append(("成功", filename, new_filename, ""))
-                    else:
-                        fail_count += 1
-                        logger.warning(f"未能识别运单号: {filename}")
-                        
-                        # 记录失败结果
-                        results.append(("失败", filename, "", "未识别到运单号"))
-                    
-                    # 发送进度信号
-                    self.progress_updated.emit(idx, total, filename)
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"处理文件 {filename} 时出错: {error_msg}")
-                    fail_count += 1
-                    # 记录失败结果
-                    results.append(("失败", filename, "", f"处理出错: {error_msg}"))
+            # 准备输出（success文件夹、处理明细、识别记录）
+            output = BatchOutput(self.target_folder, self.source_folder, self.options, name_suffix,
+                                 release=share.release if share is not None else None)
             
-            # 生成处理总结
-            self.generate_summary(results)
+            try:
+                if share is not None:
+                    share.start()
+                    image_files = share.claims()
+                engine = BatchEngine(self.scanner, self.options)
+                for done, result in enumerate(engine.iter_results(image_files, output), 1):
+                    # 发送结果和进度信号
+                    self.result_ready.emit(result)
+                    self.progress_updated.emit(done, max(total, done), result.filename)
+            finally:
+                # 由处理明细生成处理总结
+                output.close()
+                if share is not None:
+                    share.stop()
+            
+            logger.info(f"引擎调用统计: {self.scanner.batch_stats()}")
             
             # 发送完成信号
-            logger.info(f"处理完成: 成功 {success_count}, 失败 {fail_count}")
-            self.process_finished.emit(success_count, fail_count)
+            logger.info(f"处理完成: 成功 {output.success_count}, 失败 {output.fail_count}, "
+                        f"预检拒绝 {output.rejected_count}")
+            self.process_finished.emit(output.success_count, output.fail_count, output.rejected_count)
                 
         except Exception as e:
             logger.error(f"处理线程运行失败: {str(e)}")
-            self.process_finished.emit(0, 0)
+            self.process_finished.emit(0, 0, 0)
 
-class RegionSelectDialog(QDialog):
-    """识别区域选择对话框"""
-    def __init__(self, image_path, parent=None):
-        super().__init__(parent)
-        self.image_path = image_path
-        self.selected_region = None
-        self.start_pos = None
-        self.current_pos = None
-        
-        self.setup_ui()
-    
-    def setup_ui(self):
-        """设置界面"""
-        self.setWindowTitle("选择识别区域")
-        self.setMinimumSize(800, 600)
-        
-        layout = QVBoxLayout(self)
-        
-        # 图片标签
-        self.image_label = QLabel()
-        self.pixmap = QPixmap(self.image_path)
-        self.image_label.setPixmap(self.pixmap)
-        layout.addWidget(self.image_label)
-        
-        # 按钮
-        buttons = QDialogButtonBox(
-            QDialogButtonBox.StandardButton.Ok |
-            QDialogButtonBox.StandardButton.Cancel
-        )
-        buttons.accepted.connect(self.accept)
-        buttons.rejected.connect(self.reject)
-        layout.addWidget(buttons)
-        
-        # 设置鼠标跟踪
-        self.image_label.setMouseTracking(True)
-        self.image_label.mousePressEvent = self.mousePressEvent
-        self.image_label.mouseMoveEvent = self.mouseMoveEvent
-        self.image_label.mouseReleaseEvent = self.mouseReleaseEvent
-    
-    def mousePressEvent(self, event):
-        """鼠标按下事件"""
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.start_pos = event.pos()
-            self.current_pos = event.pos()
-    
-    def mouseMoveEvent(self, event):
-        """鼠标移动事件"""
-        if self.start_pos:
-            self.current_pos = event.pos()
-            self.update()
+class EstimateThread(QThread):
+    """抽样预估线程"""
+    progress_updated = pyqtSignal(int, int, str)  # 进度更新信号
+    estimate_finished = pyqtSignal(object)  # 预估完成信号（Estimate，失败时为None）
     
-    def mouseReleaseEvent(self, event):
-        """鼠标释放事件"""
-        if event.button() == Qt.MouseButton.LeftButton and self.start_pos:
-            # 计算相对坐标
-            img_width = self.pixmap.width()
-            img_height = self.pixmap.height()
-            
-            x1 = min(self.start_pos.x(), self.current_pos.x()) / img_width
-            y1 = min(self.start_pos.y(), self.current_pos.y()) / img_height
-            x2 = max(self.start_pos.x(), self.current_pos.x()) / img_width
-            y2 = max(self.start_pos.y(), self.current_pos.y()) / img_height
-            
-            self.selected_region = {
-                'x1': max(0, min(1, x1)),
-                'y1': max(0, min(1, y1)),
-                'x2': max(0, min(1, x2)),
-                'y2': max(0, min(1, y2))
-            }
-            
-            self.start_pos = None
-            self.current_pos = None
-            self.update()
+    def __init__(self, source_folder, options, scanner=None):
+        super().__init__()
+        self.source_folder = source_folder
+        self.options = options
+        self.scanner = scanner
     
-    def paintEvent(self, event):
-        """绘制事件"""
-        super().paintEvent(event)
-        painter = QPainter(self)
-        
-        # 绘制选择框
-        if self.start_pos and self.current_pos:
-            pen = QPen(QColor(255, 0, 0))
-            pen.setWidth(2)
-            painter.setPen(pen)
-            
-            x = min(self.start_pos.x(), self.current_pos.x())
-            y = min(self.start_pos.y(), self.current_pos.y())
-            w = abs(self.current_pos.x() - self.start_pos.x())
-            h = abs(self.current_pos.y() - self.start_pos.y())
-            
-            painter.drawRect(x, y, w, h)
+    def run(self):
+        try:
+            estimator = BatchEstimator(self.source_folder, self.options, scanner=self.scanner)
+            estimate = estimator.run(progress=lambda done, total: self.progress_updated.emit(done, total, "抽样预估"))
+            self.estimate_finished.emit(estimate)
+        except Exception as e:
+            logger.error(f"抽样预估失败: {str(e)}")
+            self.estimate_finished.emit(None)
 
 class MainWindow(QMainWindow):
     """主窗口"""
@@ -257,6 +115,10 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.selected_region = None
         self.process_thread = None
+        self.estimate_thread = None
+        self.scanner = None  # 常驻扫描器，多次处理之间复用已初始化的引擎
+        self.last_options = None  # 上次处理的识别选项，重新识别时在此基础上增强
+        self.waybill_index = None  # 回单索引，首次查找时打开
         self.setup_ui()
     
     def setup_ui(self):
@@ -283,6 +145,10 @@ class MainWindow(QMainWindow):
         method_layout.addWidget(self.text_cb)
         recognition_layout.addLayout(method_layout)
         
+        # 图像质量预检
+        self.triage_cb = QCheckBox("预检：空白、过暗、模糊的图片直接移入 rejected，不做识别")
+        recognition_layout.addWidget(self.triage_cb)
+        
         # 腾讯云OCR设置
         tencent_group = QGroupBox("腾讯云OCR设置")
         tencent_layout = QVBoxLayout()
@@ -376,6 +242,10 @@ class MainWindow(QMainWindow):
         suffix_layout.addWidget(self.suffix_input)
         waybill_layout.addLayout(suffix_layout)
         
+        # 多承运商规则在 config.json 的 rules 段配置，一次处理混合的运单，结果按承运商分文件夹
+        self.carriers_cb = QCheckBox("多承运商规则（代替上面的规则，按承运商分文件夹）")
+        waybill_layout.addWidget(self.carriers_cb)
+        
         waybill_group.setLayout(waybill_layout)
         layout.addWidget(waybill_group)
         
@@ -401,6 +271,20 @@ class MainWindow(QMainWindow):
         target_layout.addWidget(self.target_btn)
         folder_layout.addLayout(target_layout)
         
+        # 预期运单清单（可选）：命中清单的识别结果直接采用，结束后生成清单对账
+        manifest_layout = QHBoxLayout()
+        manifest_layout.addWidget(QLabel("运单清单:"))
+        self.manifest_input = QLineEdit()
+        self.manifest_input.setPlaceholderText("可选，WMS导出的当日运单（CSV/文本）")
+        self.manifest_btn = QPushButton("浏览")
+        manifest_layout.addWidget(self.manifest_input)
+        manifest_layout.addWidget(self.manifest_btn)
+        folder_layout.addLayout(manifest_layout)
+        
+        # 多台电脑指向同一个网络共享文件夹时，按文件认领分工，不重复识别
+        self.shared_cb = QCheckBox("多台电脑共同处理此待处理文件夹（网络共享）")
+        folder_layout.addWidget(self.shared_cb)
+        
         folder_group.setLayout(folder_layout)
         layout.addWidget(folder_group)
         
@@ -417,9 +301,48 @@ class MainWindow(QMainWindow):
         progress_group.setLayout(progress_layout)
         layout.addWidget(progress_group)
         
+        # === 处理结果 ===
+        results_group = QGroupBox("处理结果")
+        results_layout = QVBoxLayout()
+        self.results_view = ResultsView()
+        self.results_view.set_requeue_enabled(False)
+        results_layout.addWidget(self.results_view)
+        results_group.setLayout(results_layout)
+        layout.addWidget(results_group, 1)
+        
+        # === 回单查询 ===
+        search_group = QGroupBox("回单查询")
+        search_layout = QVBoxLayout()
+        search_input_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("输入运单号或前缀")
+        self.search_mode_combo = QComboBox()
+        self.search_mode_combo.addItem("精确", LOOKUP_EXACT)
+        self.search_mode_combo.addItem("前缀", LOOKUP_PREFIX)
+        self.search_mode_combo.addItem("模糊", LOOKUP_FUZZY)
+        self.search_btn = QPushButton("查找")
+        search_input_layout.addWidget(self.search_input, 1)
+        search_input_layout.addWidget(self.search_mode_combo)
+        search_input_layout.addWidget(self.search_btn)
+        search_layout.addLayout(search_input_layout)
+        # 双击打开回单
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(120)
+        search_layout.addWidget(self.search_results)
+        search_group.setLayout(search_layout)
+        layout.addWidget(search_group)
+        
         # === 控制按钮 ===
+        buttons_layout = QHBoxLayout()
         self.start_btn = QPushButton("开始处理")
-        layout.addWidget(self.start_btn)
+        # 首轮处理后留在源文件夹中的图片，用增强档位再处理一次
+        self.reprocess_btn = QPushButton("增强模式处理剩余图片")
+        # 抽样试处理，不移动文件，预估整批的识别率和耗时
+        self.estimate_btn = QPushButton("抽样预估")
+        buttons_layout.addWidget(self.start_btn, 1)
+        buttons_layout.addWidget(self.estimate_btn)
+        buttons_layout.addWidget(self.reprocess_btn)
+        layout.addLayout(buttons_layout)
         
         # 设置默认值
         self.setup_defaults()
@@ -467,6 +390,7 @@ class MainWindow(QMainWindow):
         # 文件夹选择
         self.source_btn.clicked.connect(self.select_source_folder)
         self.target_btn.clicked.connect(self.select_target_folder)
+        self.manifest_btn.clicked.connect(self.select_manifest)
         
         # 识别区域设置
         self.full_image_cb.toggled.connect(self.toggle_region_selection)
@@ -475,7 +399,15 @@ class MainWindow(QMainWindow):
         
         # 开始处理
         self.start_btn.clicked.connect(self.start_process)
+        self.reprocess_btn.clicked.connect(self.reprocess_remaining)
+        self.estimate_btn.clicked.connect(self.estimate_batch)
         self.save_tencent_btn.clicked.connect(self.save_tencent_config)
+        self.results_view.requeue_requested.connect(self.requeue_images)
+        
+        # 回单查询
+        self.search_btn.clicked.connect(self.search_waybill)
+        self.search_input.returnPressed.connect(self.search_waybill)
+        self.search_results.itemDoubleClicked.connect(self.open_search_result)
     
     def select_source_folder(self):
         """选择源文件夹"""
@@ -491,6 +423,12 @@ class MainWindow(QMainWindow):
             # 确保路径使用正确的编码
             self.target_input.setText(folder)
     
+    def select_manifest(self):
+        """选择预期运单清单"""
+        path, _ = QFileDialog.getOpenFileName(self, "选择运单清单", "", "运单清单 (*.csv *.txt);;所有文件 (*)")
+        if path:
+            self.manifest_input.setText(path)
+    
     def toggle_region_selection(self, checked):
         """切换识别区域选择"""
         if self.sender() == self.full_image_cb and checked:
@@ -507,17 +445,13 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "请先选择待处理文件夹！")
             return
         
-        # 获取第一个图片文件
-        image_files = [
-            f for f in os.listdir(self.source_input.text())
-            if f.lower().endswith(('.png', '.jpg', '.jpeg'))
-        ]
+        # 从文件夹中均匀抽取样张
+        image_files = sorted(list_images(self.source_input.text()))
         if not image_files:
             QMessageBox.warning(self, "警告", "待处理文件夹中没有图片文件")
             return
         
-        image_path = os.path.join(self.source_input.text(), image_files[0])
-        dialog = RegionSelectDialog(image_path, self)
+        dialog = RegionSelectDialog(sample_images(image_files), self.selected_region, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.selected_region = dialog.selected_region
     
@@ -531,41 +465,163 @@ class MainWindow(QMainWindow):
             if not self.validate_inputs():
                 return
             
-            # 获取识别选项
-            options = {
-                'scan_text': self.text_cb.isChecked(),
-                'use_tencent': self.use_tencent_cb.isChecked(),
-                'scan_barcode': self.barcode_cb.isChecked(),
-                'scan_qrcode': self.qrcode_cb.isChecked(),
-                'min_length': self.min_length_input.value(),
-                'max_length': self.max_length_input.value(),
-                'prefix': self.prefix_input.text(),
-                'suffix': self.suffix_input.text(),
-                'region': self.selected_region if self.custom_region_cb.isChecked() else None
-            }
-            
+            options = self.get_options()
             logger.info(f"开始处理，选项: {options}")
             
-            # 禁用开始按钮
-            self.start_btn.setEnabled(False)
-            self.status_label.setText("正在处理...")
-            
-            # 创建并启动处理线程
-            self.process_thread = ProcessThread(source_folder, target_folder, options)
-            self.process_thread.progress_updated.connect(self.update_progress)
-            self.process_thread.process_finished.connect(self.process_finished)
-            self.process_thread.start()
+            self.last_options = options
+            self.results_view.clear()
+            self.run_thread(ProcessThread(source_folder, target_folder, options, self.scanner,
+                                          shared=self.shared_cb.isChecked()))
             
         except Exception as e:
             logger.error(f"启动处理失败: {str(e)}")
             QMessageBox.critical(self, "错误", f"启动处理失败: {str(e)}")
-            self.start_btn.setEnabled(True)
+            self.set_buttons_enabled(True)
+    
+    def reprocess_remaining(self):
+        """用增强档位处理源文件夹中剩余的图片（首轮未识别的图片）"""
+        try:
+            if not self.validate_inputs():
+                return
+            
+            image_files = list_images(self.source_input.text())
+            if not image_files:
+                QMessageBox.information(self, "提示", "待处理文件夹中没有剩余图片")
+                return
+            
+            options = escalate_options(self.get_options())
+            logger.info(f"增强模式处理剩余的 {len(image_files)} 张图片，选项: {options}")
+            
+            self.last_options = options
+            self.results_view.clear()
+            name_suffix = f"_增强_{datetime.now().strftime('%H%M%S')}"
+            self.run_thread(ProcessThread(
+                self.source_input.text(), self.target_input.text(), options,
+                self.scanner, paths=image_files, name_suffix=name_suffix
+            ))
+        except Exception as e:
+            logger.error(f"启动增强处理失败: {str(e)}")
+            QMessageBox.critical(self, "错误", f"启动增强处理失败: {str(e)}")
+            self.set_buttons_enabled(True)
+    
+    def estimate_batch(self):
+        """抽样试处理源文件夹，预估整批的识别率、耗时和腾讯云OCR调用次数"""
+        try:
+            if not self.validate_inputs(need_target=False):
+                return
+            
+            options = self.get_options()
+            logger.info(f"开始抽样预估，选项: {options}")
+            
+            if self.scanner is None:
+                self.scanner = WaybillScanner()
+            self.set_buttons_enabled(False)
+            self.results_view.set_requeue_enabled(False)
+            self.status_label.setText("正在抽样预估...")
+            
+            self.estimate_thread = EstimateThread(self.source_input.text(), options, self.scanner)
+            self.estimate_thread.progress_updated.connect(self.update_progress)
+            self.estimate_thread.estimate_finished.connect(self.estimate_finished)
+            self.estimate_thread.start()
+        except Exception as e:
+            logger.error(f"启动抽样预估失败: {str(e)}")
+            QMessageBox.critical(self, "错误", f"启动抽样预估失败: {str(e)}")
+            self.set_buttons_enabled(True)
+    
+    def estimate_finished(self, estimate):
+        """抽样预估完成"""
+        self.set_buttons_enabled(True)
+        self.results_view.set_requeue_enabled(True)
+        self.status_label.setText("抽样预估完成")
+        self.progress_bar.setValue(100)
+        if estimate is None:
+            QMessageBox.warning(self, "警告", "抽样预估失败，或待处理文件夹中没有图片")
+            return
+        QMessageBox.information(self, "抽样预估", "\n".join(estimate.describe()))
+    
+    def set_buttons_enabled(self, enabled):
+        """处理或预估期间禁用开始、预估和增强处理按钮"""
+        self.start_btn.setEnabled(enabled)
+        self.estimate_btn.setEnabled(enabled)
+        self.reprocess_btn.setEnabled(enabled)
+    
+    def get_options(self):
+        """根据界面设置生成识别选项（标准档位）"""
+        return {
+            'scan_text': self.text_cb.isChecked(),
+            'use_tencent': self.use_tencent_cb.isChecked(),
+            'scan_barcode': self.barcode_cb.isChecked(),
+            'scan_qrcode': self.qrcode_cb.isChecked(),
+            'min_length': self.min_length_input.value(),
+            'max_length': self.max_length_input.value(),
+            'prefix': self.prefix_input.text(),
+            'suffix': self.suffix_input.text(),
+            'charset': self.get_charset(),
+            'region': self.selected_region if self.custom_region_cb.isChecked() else None,
+            'triage': self.triage_cb.isChecked(),
+            'rule_profiles': get_rules_config()['profiles'] if self.carriers_cb.isChecked() else None,
+            'manifest': self.manifest_input.text().strip() or None
+        }
+    
+    def requeue_images(self, paths):
+        """用增强档位重新识别结果表格中选中的失败图片"""
+        try:
+            if self.process_thread is not None and self.process_thread.isRunning():
+                QMessageBox.warning(self, "警告", "正在处理中，请稍后再试")
+                return
+            if self.last_options is None:
+                return
+            
+            options = escalate_options(self.last_options)
+            logger.info(f"增强模式重新识别 {len(paths)} 张图片，选项: {options}")
+            
+            # 单独的处理明细，不覆盖首轮的结果
+            name_suffix = f"_重新识别_{datetime.now().strftime('%H%M%S')}"
+            self.run_thread(ProcessThread(
+                self.source_input.text(), self.target_input.text(), options,
+                self.scanner, paths=paths, name_suffix=name_suffix
+            ))
+        except Exception as e:
+            logger.error(f"启动重新识别失败: {str(e)}")
+            QMessageBox.critical(self, "错误", f"启动重新识别失败: {str(e)}")
+            self.set_buttons_enabled(True)
+    
+    def run_thread(self, thread):
+        """启动处理线程"""
+        # 禁用开始按钮
+        self.set_buttons_enabled(False)
+        self.results_view.set_requeue_enabled(False)
+        self.status_label.setText("正在处理...")
+        
+        # 首次处理时初始化扫描器，之后复用
+        if self.scanner is None:
+            self.scanner = WaybillScanner()
+        thread.scanner = self.scanner
+        
+        # 创建并启动处理线程
+        self.process_thread = thread
+        self.process_thread.progress_updated.connect(self.update_progress)
+        self.process_thread.result_ready.connect(self.results_view.add_result)
+        self.process_thread.process_finished.connect(self.process_finished)
+        self.process_thread.start()
+    
+    def get_charset(self):
+        """根据字符构成选项生成允许的字符集"""
+        charset = ''
+        if self.uppercase_cb.isChecked():
+            charset += string.ascii_uppercase
+        if self.lowercase_cb.isChecked():
+            charset += string.ascii_lowercase
+        if self.digits_cb.isChecked():
+            charset += string.digits
+        charset += self.custom_chars_input.text()
+        return charset
     
-    def validate_inputs(self):
-        """验证输入"""
+    def validate_inputs(self, need_target=True):
+        """验证输入，抽样预估不需要目标文件夹"""
         # 检查文件夹
-        if not self.source_input.text() or not self.target_input.text():
-            QMessageBox.warning(self, "警告", "请选择源文件夹和目标文件夹！")
+        if not self.source_input.text() or (need_target and not self.target_input.text()):
+            QMessageBox.warning(self, "警告", "请选择源文件夹和目标文件夹！" if need_target else "请选择待处理文件夹！")
             return False
         
         # 检查识别方式
@@ -600,14 +656,67 @@ class MainWindow(QMainWindow):
             progress = int((current / total) * 100)
             self.progress_bar.setValue(progress)
             self.status_label.setText(f"正在处理: {filename}")
-            QApplication.processEvents()
         except Exception as e:
             logger.error(f"更新进度失败: {str(e)}")
     
-    def process_finished(self, success_count, fail_count):
+    def search_waybill(self):
+        """在回单索引中查找运单号"""
+        try:
+            if self.waybill_index is None:
+                self.waybill_index = WaybillIndex.open_default()
+            
+            self.search_results.clear()
+            if self.waybill_index is not None:
+                records = self.waybill_index.lookup(self.search_input.text(), self.search_mode_combo.currentData())
+            else:
+                records = self.lookup_shards(self.search_input.text())
+                if records is None:
+                    QMessageBox.warning(self, "警告", "回单索引未启用或无法打开，按目标文件夹的分片索引查找需要先选择目标文件夹")
+                    return
+            for record in records:
+                created = datetime.fromtimestamp(record['created']).strftime('%Y-%m-%d %H:%M')
+                item = QListWidgetItem(f"{record['waybill']}    {created}    {record['path']}")
+                item.setData(Qt.ItemDataRole.UserRole, record['path'])
+                item.setToolTip(f"批次 {record['batch']}，识别阶段 {record['stage'] or '-'}")
+                self.search_results.addItem(item)
+            if not records:
+                self.search_results.addItem("未找到")
+        except Exception as e:
+            logger.error(f"查找回单失败: {str(e)}")
+            QMessageBox.critical(self, "错误", f"查找回单失败: {str(e)}")
+    
+    def lookup_shards(self, query):
+        """
+        回单索引未启用时，在目标文件夹 success 的分片索引中精确查找（只读索引文件，不列出图片目录）
+        Returns:
+            list: 与回单索引查找结果格式相同的记录，没有目标文件夹时返回None
+        """
+        target_folder = self.target_input.text()
+        if not target_folder:
+            return None
+        layout = ShardLayout.from_config(os.path.join(target_folder, 'success'))
+        records = []
+        for path in layout.lookup(query.strip().upper()):
+            records.append({'waybill': query.strip().upper(), 'path': path, 'created': os.path.getmtime(path),
+                            'batch': '-', 'stage': None})
+        return records
+    
+    def open_search_result(self, item):
+        """用系统默认程序打开查找到的回单"""
+        path = item.data(Qt.ItemDataRole.UserRole)
+        if not path:
+            return
+        if not os.path.exists(path):
+            QMessageBox.warning(self, "警告", f"文件已不存在: {path}")
+            return
+        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+    
+    def process_finished(self, success_count, fail_count, rejected_count=0):
         """处理完成"""
         try:
-            self.start_btn.setEnabled(True)
+            self.set_buttons_enabled(True)
+            self.results_view.set_requeue_enabled(True)
+            self.results_view.model.flush()
             self.status_label.setText("处理完成")
             self.progress_bar.setValue(100)
             
@@ -617,6 +726,7 @@ class MainWindow(QMainWindow):
                 f"处理完成！\n"
                 f"成功：{success_count}\n"
                 f"失败：{fail_count}"
+                + (f"\n预检拒绝：{rejected_count}" if rejected_count else "")
             )
         except Exception as e:
             logger.error(f"显示结果失败: {str(e)}")
@@ -649,12 +759,17 @@ class MainWindow(QMainWindow):
                 else:
                     config = {}
                 
-                # 更新腾讯云配置
-                config['tencent_ocr'] = {
+                # 更新腾讯云配置，保留调用管控等其他设置
+                tencent_config = config.get('tencent_ocr', {})
+                tencent_config.update({
                     'enabled': self.use_tencent_cb.isChecked(),
                     'secret_id': secret_id,
                     'secret_key': secret_key
-                }
+                })
+                config['tencent_ocr'] = tencent_config
+                
+                # 配置变更后下次处理时重新初始化扫描器
+                self.scanner = None
                 
                 # 尝试写入配置文件
                 try:
@@ -0,0 +1,204 @@
+import os
+import logging
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+    QDialog, QDialogButtonBox, QSizePolicy
+)
+from PyQt6.QtCore import Qt, QRect, QRectF, QPointF, QSize
+from PyQt6.QtGui import QPixmap, QPainter, QColor, QPen
+from core.thumbnails import ThumbnailCache
+
+logger = logging.getLogger(__name__)
+
+def sample_images(image_paths, count=10):
+    """
+    从图片列表中均匀抽取样张
+    Args:
+        image_paths: 图片路径列表
+        count: 样张数量
+    Returns:
+        list: 样张路径
+    """
+    if len(image_paths) <= count:
+        return list(image_paths)
+    step = len(image_paths) / count
+    return [image_paths[int(i * step)] for i in range(count)]
+
+class RegionPreview(QWidget):
+    """按窗口大小等比显示缩略图并框选区域，区域以相对坐标（0~1）保存"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pixmap = None
+        self.region = None
+        self.start_pos = None
+        self.current_pos = None
+        self.setMinimumSize(400, 300)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setMouseTracking(True)
+
+    def set_pixmap(self, pixmap):
+        """更换显示的图片，已选区域保持不变"""
+        self.pixmap = pixmap
+        self.update()
+
+    def image_rect(self) -> QRect:
+        """图片在控件中的实际显示位置（等比缩放并居中）"""
+        if self.pixmap is None or self.pixmap.isNull():
+            return QRect()
+        size = self.pixmap.size().scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        x = (self.width() - size.width()) // 2
+        y = (self.height() - size.height()) // 2
+        return QRect(x, y, size.width(), size.height())
+
+    def to_relative(self, pos):
+        """控件坐标转换为图片上的相对坐标，超出图片的部分截到边缘"""
+        rect = self.image_rect()
+        x = (pos.x() - rect.x()) / rect.width()
+        y = (pos.y() - rect.y()) / rect.height()
+        return max(0.0, min(1.0, x)), max(0.0, min(1.0, y))
+
+    def mousePressEvent(self, event):
+        """鼠标按下事件"""
+        if event.button() == Qt.MouseButton.LeftButton and not self.image_rect().isEmpty():
+            self.start_pos = event.position()
+            self.current_pos = event.position()
+
+    def mouseMoveEvent(self, event):
+        """鼠标移动事件"""
+        if self.start_pos is not None:
+            self.current_pos = event.position()
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        """鼠标释放事件"""
+        if event.button() == Qt.MouseButton.LeftButton and self.start_pos is not None:
+            x1, y1 = self.to_relative(self.start_pos)
+            x2, y2 = self.to_relative(self.current_pos)
+            # 忽略误点产生的空区域
+            if abs(x2 - x1) > 0.005 and abs(y2 - y1) > 0.005:
+                self.region = {
+                    'x1': min(x1, x2),
+                    'y1': min(y1, y2),
+                    'x2': max(x1, x2),
+                    'y2': max(y1, y2)
+                }
+            self.start_pos = None
+            self.current_pos = None
+            self.update()
+
+    def paintEvent(self, event):
+        """绘制图片和选择框"""
+        painter = QPainter(self)
+        rect = self.image_rect()
+        if rect.isEmpty():
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "无法显示图片")
+            return
+
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawPixmap(rect, self.pixmap)
+
+        pen = QPen(QColor(255, 0, 0))
+        pen.setWidth(2)
+        painter.setPen(pen)
+
+        # 拖动中的选择框
+        if self.start_pos is not None and self.current_pos is not None:
+            painter.drawRect(QRectF(self.start_pos, self.current_pos).normalized())
+        # 已选区域，换图后按相对坐标重新绘制
+        elif self.region:
+            painter.drawRect(QRectF(
+                QPointF(rect.x() + self.region['x1'] * rect.width(), rect.y() + self.region['y1'] * rect.height()),
+                QPointF(rect.x() + self.region['x2'] * rect.width(), rect.y() + self.region['y2'] * rect.height())
+            ))
+
+class RegionSelectDialog(QDialog):
+    """
+    识别区域选择对话框
+    显示屏幕大小的缩略图（缓存在磁盘），可翻看多张样张确认区域；
+    区域以相对坐标保存，与原图分辨率无关。
+    """
+    def __init__(self, image_paths, region=None, parent=None):
+        """
+        Args:
+            image_paths: 样张路径列表
+            region: 已选的区域，为None时需要重新框选
+            parent: 父窗口
+        """
+        super().__init__(parent)
+        self.image_paths = list(image_paths)
+        self.selected_region = region
+        self.index = 0
+        self.thumbnails = ThumbnailCache()
+
+        self.setup_ui()
+        self.show_image(0)
+
+    def setup_ui(self):
+        """设置界面"""
+        self.setWindowTitle("选择识别区域")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout(self)
+
+        # 预览
+        self.preview = RegionPreview()
+        self.preview.region = self.selected_region
+        layout.addWidget(self.preview)
+
+        # 翻页
+        nav_layout = QHBoxLayout()
+        self.prev_btn = QPushButton("上一张")
+        self.next_btn = QPushButton("下一张")
+        self.info_label = QLabel()
+        self.info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.prev_btn.clicked.connect(lambda: self.show_image(self.index - 1))
+        self.next_btn.clicked.connect(lambda: self.show_image(self.index + 1))
+        nav_layout.addWidget(self.prev_btn)
+        nav_layout.addWidget(self.info_label, 1)
+        nav_layout.addWidget(self.next_btn)
+        layout.addLayout(nav_layout)
+
+        # 按钮
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok |
+            QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def thumbnail_side(self):
+        """缩略图长边：与屏幕可用区域相当即可"""
+        screen = self.screen()
+        if screen is None:
+            return 1600
+        geometry = screen.availableGeometry()
+        ratio = screen.devicePixelRatio()
+        return int(max(geometry.width(), geometry.height()) * ratio)
+
+    def show_image(self, index):
+        """显示第 index 张样张"""
+        if not self.image_paths:
+            return
+        self.index = max(0, min(len(self.image_paths) - 1, index))
+        image_path = self.image_paths[self.index]
+
+        pixmap = None
+        try:
+            pixmap = QPixmap(self.thumbnails.get(image_path, self.thumbnail_side()))
+        except Exception as e:
+            logger.error(f"加载预览失败 {image_path}: {str(e)}")
+        self.preview.set_pixmap(pixmap)
+
+        self.info_label.setText(f"第 {self.index + 1} / {len(self.image_paths)} 张：{os.path.basename(image_path)}")
+        self.prev_btn.setEnabled(self.index > 0)
+        self.next_btn.setEnabled(self.index < len(self.image_paths) - 1)
+
+    def accept(self):
+        """确定时保存框选的区域"""
+        self.selected_region = self.preview.region
+        super().accept()
+
+    def sizeHint(self):
+        return QSize(1000, 750)
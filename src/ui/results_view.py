@@ -0,0 +1,343 @@
+import os
+import logging
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox,
+    QTableView, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QObject, QRunnable, QThreadPool, QTimer,
+    QAbstractTableModel, QSortFilterProxyModel, QModelIndex
+)
+from PyQt6.QtGui import QPixmap, QColor
+from core.report import STATUS_SUCCESS, STATUS_FAIL, STATUS_REJECTED
+from core.thumbnails import ThumbnailCache
+
+logger = logging.getLogger(__name__)
+
+# 表格列：(字段, 标题)
+COLUMNS = [
+    ('status', '状态'),
+    ('filename', '原文件名'),
+    ('output', '新文件名'),
+    ('stage', '识别阶段'),
+    ('confidence', '置信度'),
+    ('elapsed_ms', '耗时(ms)'),
+    ('reason', '原因')
+]
+
+STAGES = [('barcode', '条码'), ('tesseract', 'Tesseract'), ('tencent', '腾讯云'), ('', '无')]
+
+STATUS_COLORS = {
+    STATUS_SUCCESS: QColor(0, 128, 0),
+    STATUS_FAIL: QColor(200, 0, 0),
+    STATUS_REJECTED: QColor(160, 100, 0)
+}
+
+# 预览缩略图长边
+THUMBNAIL_SIDE = 320
+
+class ResultRow:
+    """表格中的一行，只保留显示需要的字段"""
+    __slots__ = ('path', 'status', 'output_path', 'stage', 'confidence', 'elapsed_ms', 'reason')
+
+    def __init__(self, result):
+        """
+        Args:
+            result: 已由 BatchOutput 填写输出信息的 ImageResult
+        """
+        recognition = result.recognition
+        self.path = result.path
+        self.status = result.status
+        self.output_path = result.output_path
+        self.stage = recognition.stage if recognition else ''
+        self.confidence = recognition.confidence if recognition and result.waybill else None
+        self.elapsed_ms = result.elapsed * 1000
+        self.reason = result.reason
+
+    @property
+    def current_path(self):
+        """文件当前所在位置：已移动的为新路径，否则为原路径"""
+        return self.output_path or self.path
+
+    def value(self, field):
+        """单元格显示的内容"""
+        if field == 'filename':
+            return os.path.basename(self.path)
+        if field == 'output':
+            return os.path.basename(self.output_path) if self.output_path else ''
+        if field == 'confidence':
+            return f"{self.confidence:.2f}" if self.confidence is not None else ''
+        if field == 'elapsed_ms':
+            return f"{self.elapsed_ms:.0f}"
+        return getattr(self, field)
+
+class ResultsModel(QAbstractTableModel):
+    """
+    处理结果表格模型
+    结果先进入缓冲区，定时批量插入，每秒上千条结果时界面仍然流畅；
+    同一文件再次处理（重新识别）时更新原有行。
+    """
+
+    def __init__(self, parent=None, flush_interval=200):
+        """
+        Args:
+            parent: 父对象
+            flush_interval: 批量插入的间隔（毫秒）
+        """
+        super().__init__(parent)
+        self.rows = []
+        self._pending = []
+        # 文件当前位置 -> 行号
+        self._index = {}
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def add_result(self, result):
+        """添加一条结果，在下次刷新时显示"""
+        self._pending.append(ResultRow(result))
+
+    def flush(self):
+        """把缓冲区中的结果写入表格"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        new_rows = []
+        for row in pending:
+            existing = self._index.pop(row.path, None)
+            if existing is None:
+                new_rows.append(row)
+                continue
+            # 重新识别的文件：更新原有行，保留最初的原文件名
+            old = self.rows[existing]
+            row.path = old.path
+            self.rows[existing] = row
+            self._index[row.current_path] = existing
+            self.dataChanged.emit(self.index(existing, 0), self.index(existing, len(COLUMNS) - 1))
+
+        if new_rows:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_rows) - 1)
+            for offset, row in enumerate(new_rows):
+                self._index[row.current_path] = first + offset
+            self.rows.extend(new_rows)
+            self.endInsertRows()
+
+    def clear(self):
+        """清空表格"""
+        self.beginResetModel()
+        self.rows = []
+        self._pending = []
+        self._index = {}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        field = COLUMNS[index.column()][0]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.value(field)
+        if role == Qt.ItemDataRole.ForegroundRole and field == 'status':
+            return STATUS_COLORS.get(row.status)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return row.current_path
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][1]
+        return None
+
+class ResultsFilterModel(QSortFilterProxyModel):
+    """按状态和识别阶段筛选"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status = None
+        self.stage = None
+
+    def set_filter(self, status, stage):
+        """
+        Args:
+            status: 显示的状态，None 表示全部
+            stage: 显示的识别阶段，None 表示全部
+        """
+        self.status = status
+        self.stage = stage
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        # 直接读取行对象，不经过 data()，十万行时筛选依然很快
+        row = self.sourceModel().rows[source_row]
+        if self.status is not None and row.status != self.status:
+            return False
+        if self.stage is not None and row.stage != self.stage:
+            return False
+        return True
+
+class _ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, str)  # 原图路径, 缩略图路径（失败为空）
+
+class _ThumbnailTask(QRunnable):
+    """在线程池中生成缩略图，不阻塞界面"""
+
+    def __init__(self, cache, image_path):
+        super().__init__()
+        self.cache = cache
+        self.image_path = image_path
+        self.signals = _ThumbnailSignals()
+
+    def run(self):
+        try:
+            thumb_path = self.cache.get(self.image_path, THUMBNAIL_SIDE)
+        except Exception as e:
+            logger.warning(f"生成缩略图失败 {self.image_path}: {str(e)}")
+            thumb_path = ''
+        self.signals.loaded.emit(self.image_path, thumb_path)
+
+class ResultsView(QWidget):
+    """处理结果视图：实时表格、筛选、选中行的缩略图，以及重新识别失败项"""
+    requeue_requested = pyqtSignal(list)  # 需要重新识别的图片当前路径
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = ResultsModel(self)
+        self.proxy = ResultsFilterModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.thumbnails = None
+        self._preview_path = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """设置界面"""
+        layout = QVBoxLayout(self)
+
+        # 筛选
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("状态:"))
+        self.status_combo = QComboBox()
+        self.status_combo.addItem("全部", None)
+        for status in (STATUS_SUCCESS, STATUS_FAIL, STATUS_REJECTED):
+            self.status_combo.addItem(status, status)
+        filter_layout.addWidget(self.status_combo)
+
+        filter_layout.addWidget(QLabel("识别阶段:"))
+        self.stage_combo = QComboBox()
+        self.stage_combo.addItem("全部", None)
+        for stage, title in STAGES:
+            self.stage_combo.addItem(title, stage)
+        filter_layout.addWidget(self.stage_combo)
+
+        self.count_label = QLabel()
+        filter_layout.addWidget(self.count_label, 1)
+
+        self.requeue_btn = QPushButton("增强模式重新识别所选失败项")
+        filter_layout.addWidget(self.requeue_btn)
+        layout.addLayout(filter_layout)
+
+        # 表格和预览
+        content_layout = QHBoxLayout()
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setWordWrap(False)
+        # 固定行高，避免大量行时逐行计算尺寸
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(22)
+        vertical_header.setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        content_layout.addWidget(self.table, 1)
+
+        self.preview_label = QLabel("选中一行查看图片")
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setFixedWidth(THUMBNAIL_SIDE)
+        content_layout.addWidget(self.preview_label)
+        layout.addLayout(content_layout)
+
+        # 信号
+        self.status_combo.currentIndexChanged.connect(self.apply_filter)
+        self.stage_combo.currentIndexChanged.connect(self.apply_filter)
+        self.table.selectionModel().currentRowChanged.connect(self.show_preview)
+        self.requeue_btn.clicked.connect(self.requeue_selected)
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.modelReset.connect(self.update_count)
+        self.update_count()
+
+    def add_result(self, result):
+        """添加一条处理结果"""
+        self.model.add_result(result)
+
+    def clear(self):
+        """开始新批次时清空"""
+        self.model.clear()
+        self.preview_label.setText("选中一行查看图片")
+
+    def apply_filter(self):
+        """按当前选择筛选"""
+        self.proxy.set_filter(self.status_combo.currentData(), self.stage_combo.currentData())
+        self.update_count()
+
+    def update_count(self, *args):
+        """更新显示行数"""
+        self.count_label.setText(f"显示 {self.proxy.rowCount()} / {self.model.rowCount()} 条")
+
+    def selected_rows(self):
+        """选中的行对象"""
+        rows = []
+        for index in self.table.selectionModel().selectedRows():
+            source = self.proxy.mapToSource(index)
+            rows.append(self.model.rows[source.row()])
+        return rows
+
+    def requeue_selected(self):
+        """把选中的失败和预检拒绝的图片交给主窗口重新识别"""
+        paths = [
+            row.current_path for row in self.selected_rows()
+            if row.status in (STATUS_FAIL, STATUS_REJECTED) and os.path.exists(row.current_path)
+        ]
+        if paths:
+            self.requeue_requested.emit(paths)
+
+    def show_preview(self, current, previous):
+        """在后台生成选中行的缩略图"""
+        if not current.isValid():
+            return
+        row = self.model.rows[self.proxy.mapToSource(current).row()]
+        self._preview_path = row.current_path
+        if not os.path.exists(row.current_path):
+            self.preview_label.setText("文件已不存在")
+            return
+
+        if self.thumbnails is None:
+            self.thumbnails = ThumbnailCache()
+        self.preview_label.setText("加载中...")
+        task = _ThumbnailTask(self.thumbnails, row.current_path)
+        task.signals.loaded.connect(self._on_thumbnail)
+        QThreadPool.globalInstance().start(task)
+
+    def _on_thumbnail(self, image_path, thumb_path):
+        # 只显示最后一次选中的图片
+        if image_path != self._preview_path:
+            return
+        if not thumb_path:
+            self.preview_label.setText("无法显示图片")
+            return
+        self.preview_label.setPixmap(QPixmap(thumb_path))
+
+    def set_requeue_enabled(self, enabled):
+        """处理中时禁用重新识别"""
+        self.requeue_btn.setEnabled(enabled)